@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+In-process LRU vs. the shared cache daemon: get/set latency, concurrent
+throughput and stored value sizes for typical address and pricing entries.
+
+    python benchmarks/bench_cache.py                          # starts a daemon on a temp socket
+    python benchmarks/bench_cache.py --url redis://127.0.0.1:6379   # against Redis
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache import LocalCache  # noqa: E402
+from services.shared_cache import RespClient, SharedCache, encode_value  # noqa: E402
+
+ADDRESS_KEY = (("heathrow", "terminal", "5"), "TW62GA")
+ADDRESS_RESULT = {
+    "candidates": [
+        {"formatted": "Heathrow Airport Terminal 5, Wallis Road, Hounslow, TW6 2GA", "postcode": "TW6 2GA",
+         "latitude": 51.4723, "longitude": -0.4878, "source": "local"},
+    ],
+}
+PRICING_KEY = ("heathrow terminal 5", "paddington station")
+PRICING_RESULT = {
+    "success": True,
+    "sourceAddress": "Heathrow Airport Terminal 5, Wallis Road, Hounslow, TW6 2GA",
+    "destinationAddress": "Paddington Station, Praed Street, London, W2 1HQ",
+    "prices": {"standard": 58, "estate": 66, "mpv": 73, "executive": 88},
+    "vehicles": [{"id": vehicle_id, "name": name, "passengers": seats, "bags": seats, "eta_minutes": 7}
+                 for vehicle_id, name, seats in ((68, "Standard", 4), (69, "Estate", 4), (70, "MPV", 6),
+                                                 (71, "Executive", 4))] * 4,
+}
+
+
+def summarize(label: str, samples_us):
+    samples_us = sorted(samples_us)
+    p50 = samples_us[len(samples_us) // 2]
+    p99 = samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.99))]
+    print(f"{label:<28} n={len(samples_us):<7} mean={statistics.mean(samples_us):>8.1f}µs "
+          f"p50={p50:>8.1f}µs p99={p99:>8.1f}µs")
+
+
+async def time_calls(call, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def throughput(cache, key, concurrency: int, seconds: float = 2.0) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await cache.get(key)
+            done += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / seconds
+
+
+async def bench(url: str, rounds: int, concurrency: int):
+    caches = {
+        "local": LocalCache("bench_local", maxsize=4096, ttl=600),
+        "shared": SharedCache("bench_shared", maxsize=4096, ttl=600,
+                              client=RespClient(url, pool_size=concurrency, timeout=1.0)),
+    }
+    for name, cache in caches.items():
+        for label, key, value in (("address", ADDRESS_KEY, ADDRESS_RESULT), ("pricing", PRICING_KEY, PRICING_RESULT)):
+            await cache.set(key, value)
+            assert await cache.get(key) == value, f"{name} cache returned a different {label} entry"
+            summarize(f"{name} set {label}", await time_calls(lambda: cache.set(key, value), rounds))
+            summarize(f"{name} get {label}", await time_calls(lambda: cache.get(key), rounds))
+        summarize(f"{name} get miss", await time_calls(lambda: cache.get(("missing",)), rounds))
+        rate = await throughput(cache, ADDRESS_KEY, concurrency)
+        print(f"{name + ' throughput':<28} {rate:>10.0f} gets/s with {concurrency} concurrent callers\n")
+    print(f"errors: {caches['shared'].stats()['errors']}")
+
+
+def sizes():
+    for label, value in (("address", ADDRESS_RESULT), ("pricing", PRICING_RESULT)):
+        pretty = len(json.dumps(value).encode())
+        stored = len(encode_value(value))
+        print(f"{label} entry: {pretty} bytes as default JSON, {stored} bytes stored")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="cache daemon or Redis URL (default: start a daemon on a temp socket)")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    sizes()
+    daemon = None
+    url = args.url
+    with tempfile.TemporaryDirectory() as tmp:
+        if not url:
+            socket_path = os.path.join(tmp, "cache.sock")
+            daemon = subprocess.Popen([sys.executable, "-m", "services.shared_cache", "serve", "--socket", socket_path],
+                                      cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      stdout=subprocess.DEVNULL)
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+            url = f"unix://{socket_path}"
+        try:
+            asyncio.run(bench(url, args.rounds, args.concurrency))
+        finally:
+            if daemon is not None:
+                daemon.terminate()
+                daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
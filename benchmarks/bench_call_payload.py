@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Per-call CPU cost of building the Ultravox call-creation body and the
+/api/config response: re-serializing the config dict each time (as before)
+vs. splicing overrides into the pre-encoded payload.
+
+    python benchmarks/bench_call_payload.py
+    python benchmarks/bench_call_payload.py --rounds 20000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.agent_config import ULTRAVOX_WEB_CALL_CONFIG  # noqa: E402
+from services.call_payload import CallPayload, config_document  # noqa: E402
+
+# What static/index.html sends
+OVERRIDES = {"model": "fixie-ai/ultravox", "voice": "a656a751-b754-4621-b571-e1298cb7e5bb", "temperature": 0.3}
+
+
+def summarize(label: str, samples_us):
+    samples_us = sorted(samples_us)
+    p50 = samples_us[len(samples_us) // 2]
+    p99 = samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.99))]
+    print(f"{label:<28} n={len(samples_us):<7} mean={statistics.mean(samples_us):>8.2f}µs "
+          f"p50={p50:>8.2f}µs p99={p99:>8.2f}µs")
+    return statistics.mean(samples_us)
+
+
+def per_call_dict():
+    # The old handle_create_ultravox_call: copy, override, then httpx's json= encoding
+    config_data = ULTRAVOX_WEB_CALL_CONFIG.copy()
+    config_data.update(OVERRIDES)
+    return json.dumps(config_data).encode("utf-8")
+
+
+def time_it(function, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5000)
+    args = parser.parse_args()
+
+    payload = CallPayload(ULTRAVOX_WEB_CALL_CONFIG)
+    spliced = json.loads(payload.body(OVERRIDES))
+    spliced.pop("metadata")  # the config version, which the old body did not carry
+    assert spliced == json.loads(per_call_dict())
+    print(f"call body: {len(per_call_dict())} bytes per call before, {len(payload.body(OVERRIDES))} after, "
+          f"{payload.tool_count} tools")
+
+    before = summarize("call body: dict + dumps", time_it(per_call_dict, args.rounds))
+    after = summarize("call body: pre-encoded", time_it(lambda: payload.body(OVERRIDES), args.rounds))
+    print(f"{'':<28} {before / after:.0f}x less CPU per call\n")
+
+    before = summarize("config: dict + dumps", time_it(
+        lambda: json.dumps(config_document(ULTRAVOX_WEB_CALL_CONFIG)).encode("utf-8"), args.rounds))
+    after = summarize("config: ETag check", time_it(lambda: payload.not_modified(payload.etag), args.rounds))
+    print(f"{'':<28} {before / after:.0f}x less CPU per revalidated request "
+          f"({len(payload.config_body)} bytes not sent)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Gazetteer and fuzzy matching latency vs. the upstream Cromwell address API.
+
+    python benchmarks/bench_gazetteer.py                 # local lookups only
+    python benchmarks/bench_gazetteer.py --upstream 20   # also time 20 upstream calls
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from services.address_matching import AddressMatcher, normalize_spoken_postcode  # noqa: E402
+from services.gazetteer import Gazetteer, build_index  # noqa: E402
+
+QUERIES = [
+    (["Heathrow Terminal 5"], None),
+    (["heathrow t2"], "TW6 1EW"),
+    (["Kings Cross"], None),
+    (["Paddington Station"], "W2 1HQ"),
+    ([], "SW1V 1JU"),
+    ([], "TW6"),
+    (["10 Downing Street"], "SW1A 2AA"),  # miss: falls through to upstream
+]
+
+# Speech-to-text style inputs for the fuzzy matching stage
+FUZZY_QUERIES = [
+    ["heath row terminal five"],
+    ["padding ton station"],
+    ["waterlo station"],
+    ["221b bakers treat"],
+    ["12 acacia avenue"],  # miss
+]
+SPOKEN_POSTCODES = ["ha one two tee aitch", "HA1 tooth", "double you two one aitch queue", "n one nine ay el"]
+
+
+def summarize(label: str, samples_us):
+    samples_us = sorted(samples_us)
+    p50 = samples_us[len(samples_us) // 2]
+    p99 = samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.99))]
+    print(f"{label:<28} n={len(samples_us):<7} mean={statistics.mean(samples_us):>10.1f}µs "
+          f"p50={p50:>10.1f}µs p99={p99:>10.1f}µs")
+
+
+def bench_local(csv_path: str, rounds: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "gazetteer.idx")
+        build_index(csv_path, index_path)
+        gazetteer = Gazetteer(index_path)
+        samples = []
+        for _ in range(rounds):
+            for lines, postcode in QUERIES:
+                start = time.perf_counter()
+                gazetteer.match_address(lines, postcode)
+                samples.append((time.perf_counter() - start) * 1e6)
+        summarize("local gazetteer", samples)
+
+        matcher = AddressMatcher(gazetteer)
+        fuzzy_samples, postcode_samples = [], []
+        for _ in range(max(1, rounds // 10)):
+            for lines in FUZZY_QUERIES:
+                start = time.perf_counter()
+                if not matcher.match_landmark(lines, None):
+                    matcher.correct_street(lines[0])
+                fuzzy_samples.append((time.perf_counter() - start) * 1e6)
+            for spoken in SPOKEN_POSTCODES:
+                start = time.perf_counter()
+                normalize_spoken_postcode(spoken)
+                postcode_samples.append((time.perf_counter() - start) * 1e6)
+        gazetteer.close()
+    summarize("fuzzy landmark/street match", fuzzy_samples)
+    summarize("spoken postcode normalize", postcode_samples)
+
+
+async def bench_upstream(count: int):
+    from routes.cromwell_routes import CROMWELL_API_BASE
+
+    samples = []
+    async with httpx.AsyncClient() as client:
+        for i in range(count):
+            lines, postcode = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            await client.post(
+                f"{CROMWELL_API_BASE}/address/validate",
+                json={"address_lines": lines, "postcode": postcode},
+                timeout=30.0,
+            )
+            samples.append((time.perf_counter() - start) * 1e6)
+    summarize("upstream /address/validate", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="data/gazetteer.csv")
+    parser.add_argument("--rounds", type=int, default=10000)
+    parser.add_argument("--upstream", type=int, default=0, help="number of upstream calls to time")
+    args = parser.parse_args()
+
+    bench_local(args.csv, args.rounds)
+    if args.upstream:
+        asyncio.run(bench_upstream(args.upstream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Load generator replaying realistic booking conversations against the tool
+endpoints, reporting p50/p95/p99 latency and requests/second per endpoint.
+
+By default it starts benchmarks/mock_upstreams.py and main:app (pointed at
+the mocks) as subprocesses, so nothing touches production:
+
+    python benchmarks/load_test.py --conversations 200 --concurrency 20
+    python benchmarks/load_test.py --duration 60 --concurrency 50 --workers 4
+
+or it can drive a service that is already running:
+
+    python benchmarks/load_test.py --target http://127.0.0.1:8000
+
+Each conversation creates an Ultravox call, validates a pickup and a
+destination, checks pricing, books, reads the booking back and asks for the
+driver's location, sending the Ultravox call ID as X-Ultravox-Call-Id like
+the real agent does. Mock latency/error distributions are configured with the
+MOCK_* variables documented in mock_upstreams.py.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mixture of landmark (gazetteer), spoken-postcode and plain street addresses
+PICKUPS = [
+    {"address_lines": ["Heathrow Terminal 5"]},
+    {"address_lines": ["Kings Cross Station"]},
+    {"address_lines": ["221B Baker Street"], "postcode": "NW1 6XE"},
+    {"address_lines": ["14 Acacia Avenue"], "postcode": "ha one two tee aitch"},
+    {"address_lines": ["3 Station Road", "HA1 2TH"]},
+    {"address_lines": "[\"7 Queens Gate\", \"Kensington\"]", "postcode": "SW7 5EH"},
+]
+DESTINATIONS = [
+    {"address_lines": ["Gatwick North Terminal"]},
+    {"address_lines": ["Paddington Station"]},
+    {"address_lines": ["10 Downing Street"], "postcode": "SW1A 2AA"},
+    {"address_lines": ["52 Chiltern Road"], "postcode": "double you two one aitch queue"},
+]
+VEHICLES = ["standard", "estate", "MPV", "executive"]
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint label"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def add(self, label: str, seconds: float, ok: bool):
+        self.samples[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+
+        def pct(values: List[float], p: float) -> float:
+            return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+        rows = {}
+        for label in sorted(self.samples):
+            values = sorted(self.samples[label])
+            rows[label] = {
+                "count": len(values),
+                "errors": self.errors[label],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(pct(values, 50), 1),
+                "p95_ms": round(pct(values, 95), 1),
+                "p99_ms": round(pct(values, 99), 1),
+            }
+        total = sum(len(values) for values in self.samples.values())
+        rows["TOTAL"] = {
+            "count": total,
+            "errors": sum(self.errors.values()),
+            "rps": round(total / elapsed, 2),
+            "elapsed_s": round(elapsed, 2),
+        }
+        return rows
+
+
+def is_error(response: httpx.Response) -> bool:
+    """Tool routes answer 200 with friendly error bodies, so look inside too"""
+    if response.status_code >= 400:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    if not isinstance(body, dict):
+        return False
+    if body.get("success") is False:
+        return True
+    return body.get("status") == "error" and body.get("booking_status") in ("system_error", "api_error", "failed")
+
+
+async def timed(client: httpx.AsyncClient, recorder: Recorder, label: str, path: str,
+                payload: dict, headers: Optional[dict] = None) -> Optional[dict]:
+    start = time.perf_counter()
+    try:
+        response = await client.post(path, json=payload, headers=headers)
+    except httpx.HTTPError:
+        recorder.add(label, time.perf_counter() - start, False)
+        return None
+    recorder.add(label, time.perf_counter() - start, not is_error(response))
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+async def conversation(client: httpx.AsyncClient, recorder: Recorder, think: float):
+    """One caller booking a cab, tool call by tool call"""
+    call = await timed(client, recorder, "POST /api/ultravox", "/api/ultravox", {"systemPrompt": "load test"})
+    call_id = (call or {}).get("callId") or f"load-{random.getrandbits(32):08x}"
+    headers = {"X-Ultravox-Call-Id": call_id}
+
+    async def step(label: str, path: str, payload: dict) -> Optional[dict]:
+        if think:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * think)
+        return await timed(client, recorder, label, path, payload, headers)
+
+    pickup = await step("validateAddress", "/cromwell/validateAddress", random.choice(PICKUPS))
+    destination = await step("validateAddress", "/cromwell/validateAddress", random.choice(DESTINATIONS))
+
+    def formatted(result: Optional[dict], fallback: str) -> str:
+        candidates = (result or {}).get("candidates") or []
+        return candidates[0].get("formatted", fallback) if candidates else fallback
+
+    source = formatted(pickup, "Heathrow Terminal 5")
+    target = formatted(destination, "Paddington Station")
+    await step("checkPricing", "/cromwell/checkPricing", {"sourceAddress": source, "destinationAddress": target})
+
+    phone = f"07{random.randint(100000000, 999999999)}"
+    booking = await step("bookCab:cabBooking", "/cromwell/bookCab", {
+        "operation": "cabBooking",
+        "passengerName": "Load Test",
+        "passengerPhone": phone,
+        "passengerEmail": "load@example.com",
+        "origin": source,
+        "destination": target,
+        "date": "2030-01-01T09:00:00",
+        "vehicleTypeId": random.choice(VEHICLES),
+        "customerPrice": "45",
+        "passengers": "2",
+    })
+    job_no = ((booking or {}).get("data") or {}).get("jobNO")
+    if not job_no:
+        return
+    await step("bookCab:getBooking", "/cromwell/bookCab", {"operation": "getBooking", "jobNO": job_no})
+    await step("bookCab:getDriverLocation", "/cromwell/bookCab", {"operation": "getDriverLocation", "jobNO": job_no})
+
+
+async def run_load(target: str, conversations: int, duration: float, concurrency: int, think: float) -> Recorder:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = iter(range(conversations)) if not deadline else None
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60.0) as client:
+        async def worker():
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif next(remaining, None) is None:
+                    return
+                await conversation(client, recorder, think)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+def wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def start_stack(mock_port: int, service_port: int, workers: int) -> List[subprocess.Popen]:
+    """Start the mock upstreams and main:app wired to them"""
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "mock_upstreams.py"), "--port", str(mock_port)],
+        cwd=ROOT,
+    )
+    wait_healthy(f"http://127.0.0.1:{mock_port}/health", mock)
+
+    mock_base = f"http://127.0.0.1:{mock_port}"
+    env = dict(
+        os.environ,
+        CROMWELL_API_BASE=f"{mock_base}/cromwell",
+        CABEE_API_BASE=f"{mock_base}/cabee",
+        PRICING_WEBHOOK_URL=f"{mock_base}/make/pricing",
+        ULTRAVOX_API_BASE=f"{mock_base}/ultravox",
+        TOOLS_BASE_URL=f"http://127.0.0.1:{service_port}",
+        CABEE_JWT_TOKEN=os.getenv("CABEE_JWT_TOKEN", "load-test-token"),
+        ULTRAVOX_API_KEY=os.getenv("ULTRAVOX_API_KEY", "load-test-key"),
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+    )
+    service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(service_port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env,
+    )
+    processes = [mock, service]
+    try:
+        wait_healthy(f"http://127.0.0.1:{service_port}/health", service)
+    except RuntimeError:
+        stop_stack(processes)
+        raise
+    return processes
+
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(rows: Dict[str, Dict[str, float]]):
+    print(f"{'endpoint':<28} {'count':>7} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, row in rows.items():
+        if label == "TOTAL":
+            continue
+        print(f"{label:<28} {row['count']:>7} {row['errors']:>7} {row['rps']:>9.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    total = rows["TOTAL"]
+    print(f"{'TOTAL':<28} {total['count']:>7} {total['errors']:>7} {total['rps']:>9.2f}   "
+          f"({total['elapsed_s']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running service (default: start mocks + main:app)")
+    parser.add_argument("--conversations", type=int, default=100, help="conversations to replay")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent conversations")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds between tool calls")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting main:app")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=8100, help="port for main:app when started here")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    target = args.target
+    if not target:
+        processes = start_stack(args.mock_port, args.port, args.workers)
+        target = f"http://127.0.0.1:{args.port}"
+    try:
+        recorder = asyncio.run(run_load(target, args.conversations, args.duration, args.concurrency, args.think))
+    finally:
+        stop_stack(processes)
+
+    rows = recorder.report()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
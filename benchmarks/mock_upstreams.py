@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Cromwell address API, the Make.com pricing webhook,
+the Cabee Job API and the Ultravox calls API, for load testing without
+touching production.
+
+    python benchmarks/mock_upstreams.py --port 9100
+
+then point the service at it:
+
+    CROMWELL_API_BASE=http://127.0.0.1:9100/cromwell
+    CABEE_API_BASE=http://127.0.0.1:9100/cabee
+    PRICING_WEBHOOK_URL=http://127.0.0.1:9100/make/pricing
+    ULTRAVOX_API_BASE=http://127.0.0.1:9100/ultravox
+
+Each upstream's behaviour is configurable from the environment:
+
+    MOCK_<UPSTREAM>_LATENCY_MS   median latency (default per upstream below)
+    MOCK_<UPSTREAM>_JITTER       lognormal sigma around the median (default 0.5)
+    MOCK_<UPSTREAM>_ERROR_RATE   fraction of requests answered with a 503 (default 0)
+    MOCK_MAKE_ACCEPTED_RATE      fraction of quotes answered "Accepted" and
+                                 delivered later to callbackUrl (default 0)
+    MOCK_MAKE_CALLBACK_MS        delay before that callback (default 1500)
+
+where <UPSTREAM> is CROMWELL, MAKE, CABEE or ULTRAVOX.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Body, FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, PlainTextResponse  # noqa: E402
+
+DEFAULT_LATENCY_MS = {"cromwell": 120, "make": 900, "cabee": 250, "ultravox": 400}
+
+
+class Profile:
+    """Latency and error distribution of one mocked upstream"""
+
+    def __init__(self, upstream: str):
+        prefix = f"MOCK_{upstream.upper()}_"
+        self.latency_ms = float(os.getenv(prefix + "LATENCY_MS", DEFAULT_LATENCY_MS[upstream]))
+        self.jitter = float(os.getenv(prefix + "JITTER", 0.5))
+        self.error_rate = float(os.getenv(prefix + "ERROR_RATE", 0.0))
+
+    async def simulate(self) -> Optional[JSONResponse]:
+        """Sleep for a sampled latency; return an error response if this request should fail"""
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms * random.lognormvariate(0.0, self.jitter) / 1000)
+        if random.random() < self.error_rate:
+            return JSONResponse({"error": "mock upstream failure"}, status_code=503)
+        return None
+
+
+PROFILES = {upstream: Profile(upstream) for upstream in DEFAULT_LATENCY_MS}
+MAKE_ACCEPTED_RATE = float(os.getenv("MOCK_MAKE_ACCEPTED_RATE", 0.0))
+MAKE_CALLBACK_MS = float(os.getenv("MOCK_MAKE_CALLBACK_MS", 1500))
+
+app = FastAPI(title="Cromwell Cars mock upstreams")
+jobs: Dict[str, Dict[str, Any]] = {}
+job_numbers = itertools.count(100)
+callback_tasks: Set[asyncio.Task] = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _quote(source: str, destination: str) -> Dict[str, Any]:
+    base = 25 + (len(source) + len(destination)) % 40
+    return {
+        "success": True,
+        "sourceAddress": source,
+        "destinationAddress": destination,
+        "prices": {"standard": base, "estate": base + 8, "mpv": base + 15, "executive": base + 30},
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "jobs": len(jobs)}
+
+
+@app.post("/cromwell/address/validate")
+async def validate_address(payload: Dict[str, Any] = Body(...)):
+    error = await PROFILES["cromwell"].simulate()
+    if error:
+        return error
+    lines = [str(line) for line in payload.get("address_lines") or []]
+    postcode = payload.get("postcode") or "SW1A 1AA"
+    if any("nowhere" in line.lower() for line in lines):
+        return JSONResponse({"detail": "Address not found"}, status_code=404)
+    formatted = ", ".join(lines + ["London", postcode])
+    return {"candidates": [{"formatted": formatted, "postcode": postcode, "latitude": 51.5, "longitude": -0.12}]}
+
+
+async def _deliver_callback(callback_url: str, correlation_id: str, quote: Dict[str, Any]):
+    await asyncio.sleep(MAKE_CALLBACK_MS / 1000)
+    async with httpx.AsyncClient() as client:
+        await client.post(callback_url, json=dict(quote, correlationId=correlation_id))
+
+
+@app.post("/make/pricing")
+async def pricing_webhook(payload: Dict[str, Any] = Body(...)):
+    error = await PROFILES["make"].simulate()
+    if error:
+        return error
+    quote = _quote(payload.get("sourceAddress", ""), payload.get("destinationAddress", ""))
+    callback_url = payload.get("callbackUrl")
+    if callback_url and random.random() < MAKE_ACCEPTED_RATE:
+        task = asyncio.create_task(_deliver_callback(callback_url, payload.get("correlationId"), quote))
+        callback_tasks.add(task)
+        task.add_done_callback(callback_tasks.discard)
+        return PlainTextResponse("Accepted")
+    return quote
+
+
+@app.post("/cabee/Job/CreateOnlineJob")
+async def create_job(payload: Dict[str, Any] = Body(...)):
+    error = await PROFILES["cabee"].simulate()
+    if error:
+        return error
+    job_no = f"A2{next(job_numbers)}"
+    job = dict(payload, id=len(jobs) + 1, jobNO=job_no)
+    jobs[job_no] = job
+    return job
+
+
+@app.get("/cabee/Job/GetOnlineJobs")
+async def get_jobs(jobNO: Optional[str] = None, phoneNumber: Optional[str] = None):
+    error = await PROFILES["cabee"].simulate()
+    if error:
+        return error
+    matches = [job for job in jobs.values()
+               if (jobNO and job["jobNO"] == jobNO) or (phoneNumber and job.get("passengerPhone") == phoneNumber)]
+    if not matches:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    return matches
+
+
+@app.put("/cabee/Job/UpdateJob")
+async def update_job(payload: Dict[str, Any] = Body(...)):
+    error = await PROFILES["cabee"].simulate()
+    if error:
+        return error
+    job = next((job for job in jobs.values() if str(job["jobNO"]) == str(payload.get("id"))), None)
+    if job is None:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    job.update({k: v for k, v in payload.items() if k != "id"})
+    return job
+
+
+@app.post("/cabee/Job/CancelJob")
+async def cancel_job(jobNo: Optional[str] = None, mobile: Optional[str] = None):
+    error = await PROFILES["cabee"].simulate()
+    if error:
+        return error
+    job = jobs.pop(jobNo, None) if jobNo else None
+    if job is None and mobile:
+        job = next((jobs.pop(no) for no, j in list(jobs.items()) if j.get("passengerPhone") == mobile), None)
+    return PlainTextResponse("Job cancelled" if job else "Job not found")
+
+
+@app.get("/cabee/Job/GetDriverCurrentLocationForJob/{job_no}")
+async def driver_location(job_no: str):
+    error = await PROFILES["cabee"].simulate()
+    if error:
+        return error
+    if job_no not in jobs:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    return {"latitude": 51.5 + random.uniform(-0.05, 0.05), "longitude": -0.12 + random.uniform(-0.05, 0.05),
+            "updated": _now()}
+
+
+@app.post("/ultravox/calls")
+async def create_call(request: Request):
+    error = await PROFILES["ultravox"].simulate()
+    if error:
+        return error
+    config = await request.json()
+    call_id = str(uuid.uuid4())
+    return JSONResponse({
+        "callId": call_id,
+        "created": _now(),
+        "ended": None,
+        "model": config.get("model", "fixie-ai/ultravox"),
+        "systemPrompt": config.get("systemPrompt", ""),
+        "temperature": config.get("temperature", 0.3),
+        "joinUrl": f"wss://mock.ultravox.invalid/calls/{call_id}",
+    }, status_code=201)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Replay captured tool traffic (see services/capture.py) through the tool routes
+against the recorded upstream responses, for deterministic performance
+regression runs built from real traffic.
+
+    CAPTURE_PATH=captures/traffic.jsonl.gz python run.py      # record
+    python benchmarks/replay_capture.py captures/traffic.jsonl.gz             # 1x speed
+    python benchmarks/replay_capture.py captures/traffic.jsonl.gz --speed 10  # 10x faster
+    python benchmarks/replay_capture.py captures/traffic.jsonl.gz --speed 0   # no waiting at all
+
+Requests are sent in-process to main:app at their recorded offsets divided by
+--speed, each upstream answers with its recorded response after its recorded
+latency divided by --speed, and pricing callbacks are replayed with the live
+correlation IDs. The report shows latency per endpoint and how many outcomes
+differ from the recording.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+os.environ.pop("CAPTURE_PATH", None)
+os.environ.setdefault("CABEE_JWT_TOKEN", "replay-token")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+from load_test import Recorder, print_report  # noqa: E402
+from services import capture, http_clients, metrics  # noqa: E402
+from services.resilience import TIMEOUT_MAX  # noqa: E402
+
+
+def label_for(record: Dict[str, Any]) -> str:
+    route = record["r"].rsplit("/", 1)[-1]
+    operation = (record.get("b") or {}).get("operation")
+    return f"{route}:{operation}" if operation else route
+
+
+async def replay(path: str, speed: float, concurrency: int) -> Dict[str, Any]:
+    requests, exchanges, results = capture.load_capture(path)
+    if not requests:
+        raise SystemExit(f"No tool requests in {path}")
+
+    transports: Dict[str, capture.ReplayTransport] = {}
+
+    def build_client(upstream: str) -> httpx.AsyncClient:
+        transports[upstream] = capture.ReplayTransport(upstream, exchanges, speed)
+        return httpx.AsyncClient(
+            transport=http_clients.ResilientTransport(upstream, transports[upstream]), timeout=TIMEOUT_MAX
+        )
+
+    http_clients._build_client = build_client
+    os.chdir(ROOT)
+    import main
+
+    await main.on_startup()
+    recorder = Recorder()
+    mismatches: Dict[str, int] = defaultdict(int)
+    limit = asyncio.Semaphore(concurrency)
+    first = requests[0]["t"]
+    started = time.perf_counter()
+    callback_token = os.getenv("PRICING_CALLBACK_TOKEN")
+
+    async def live_correlation(recorded_id: str, timeout: float = 10.0):
+        # At high speeds a callback can come due before its quote request has been replayed
+        deadline = time.perf_counter() + timeout
+        make = transports.get("make")
+        while make is not None and time.perf_counter() < deadline:
+            if recorded_id in make.correlations:
+                return make.correlations[recorded_id]
+            await asyncio.sleep(0.005)
+        return None
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://replay",
+                                 timeout=120.0) as client:
+        async def send(record: Dict[str, Any]):
+            if speed > 0:
+                delay = (record["t"] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            body = record.get("b") or {}
+            headers = {}
+            if record["r"].endswith("/pricingCallback"):
+                live = await live_correlation(body.get("correlationId"))
+                body = dict(body, correlationId=live or body.get("correlationId"))
+                if callback_token:
+                    headers["X-Callback-Token"] = callback_token
+            elif record.get("c"):
+                headers["X-Ultravox-Call-Id"] = record["c"]
+            async with limit:
+                capture.bind_replay_request(record["id"])
+                start = time.perf_counter()
+                try:
+                    response = await client.post(record["r"], json=body, headers=headers)
+                except httpx.HTTPError:
+                    recorder.add(label_for(record), time.perf_counter() - start, False)
+                    return
+                recorder.add(label_for(record), time.perf_counter() - start, response.status_code < 500)
+            recorded = results.get(record["id"])
+            if recorded is not None:
+                try:
+                    outcome = metrics.outcome_of(response.json())
+                except ValueError:
+                    outcome = f"http_{response.status_code}"
+                if outcome != recorded["o"]:
+                    mismatches[label_for(record)] += 1
+
+        await asyncio.gather(*(send(record) for record in requests))
+    recorder.finished = time.perf_counter()
+    await main.on_shutdown()
+
+    return {
+        "report": recorder.report(),
+        "outcome_mismatches": dict(mismatches),
+        "upstreams": {
+            name: {"matched": t.matched, "fallbacks": t.fallbacks, "missing": t.missing}
+            for name, t in transports.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="capture file written with CAPTURE_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (0 = no delays)")
+    parser.add_argument("--concurrency", type=int, default=100, help="max requests in flight")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(args.capture, args.speed, args.concurrency))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print_report(result["report"])
+    print(f"\noutcomes differing from the recording: {result['outcome_mismatches'] or 'none'}")
+    for name, counts in result["upstreams"].items():
+        print(f"upstream {name:<10} matched={counts['matched']} fallbacks={counts['fallbacks']} "
+              f"missing={counts['missing']}")
+
+
+if __name__ == "__main__":
+    main()
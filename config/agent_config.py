@@ -4,6 +4,15 @@ from typing import List, Dict, Any
 # Get tools base URL from environment
 TOOLS_BASE_URL = os.getenv("TOOLS_BASE_URL", "http://localhost:8000")
 
+# Ultravox fills this header with the call ID on every tool request, which lets
+# the tool routes tie the lookups of one conversation together
+CALL_ID_HEADER = "X-Ultravox-Call-Id"
+CALL_ID_PARAMETER = {
+    "name": CALL_ID_HEADER,
+    "location": "PARAMETER_LOCATION_HEADER",
+    "knownValue": "KNOWN_PARAM_CALL_ID",
+}
+
 # Cromwell Cars Agent Configuration - Independent from Twilio
 SYSTEM_PROMPT = """
 ### Persona & Tone
@@ -110,7 +119,7 @@ You MUST follow this exact sequence. Do NOT skip steps or proceed to booking wit
 **Task 3: Provide Driver Location**
 1.  **Get Job Number:** Ask for job number or retrieve it.
 2.  **Check Location:** Use the getDriverLocation tool.
-3.  **Share Status:** Relay driver location information to the user.
+3.  **Share Status:** Relay driver location information to the user. If the response includes data.etaMinutes, say roughly how far away the driver is (e.g. "Your driver is about six minutes away") rather than reading out coordinates.
 
 **Task 4: Cancel a Booking**
 1.  **Get Job Number:** Ask for job number or retrieve it.
@@ -150,6 +159,7 @@ def get_selected_tools() -> List[Dict[str, Any]]:
                         "required": True,
                     },
                 ],
+                "automaticParameters": [CALL_ID_PARAMETER],
                 "http": {
                     "baseUrlPattern": f"{TOOLS_BASE_URL}/cromwell/checkPricing",
                     "httpMethod": "POST",
@@ -297,6 +307,7 @@ def get_selected_tools() -> List[Dict[str, Any]]:
                         "required": False,
                     },
                 ],
+                "automaticParameters": [CALL_ID_PARAMETER],
                 "http": {
                     "baseUrlPattern": f"{TOOLS_BASE_URL}/cromwell/bookCab",
                     "httpMethod": "POST",
@@ -337,6 +348,7 @@ def get_selected_tools() -> List[Dict[str, Any]]:
                         "required": False,
                     }
                 ],
+                "automaticParameters": [CALL_ID_PARAMETER],
                 "http": {
                     "baseUrlPattern": f"{TOOLS_BASE_URL}/cromwell/validateAddress",
                     "httpMethod": "POST"
@@ -0,0 +1,225 @@
+"""
+Versioned agent configurations, hot-swapped without a restart.
+
+With AGENT_CONFIG_DIR set, agent configs (system prompt, model, voice,
+temperature, tools) are read from versioned JSON files in that directory
+instead of the built-in config in agent_config.py:
+
+    agent-configs/
+        2026-10-01.json
+        2026-10-17.json
+        ACTIVE              # optional: name of the version to use
+
+The active version is AGENT_CONFIG_VERSION if set, else the one named in
+ACTIVE, else the lexically greatest file name. The directory is polled every
+AGENT_CONFIG_POLL seconds; when the active version (or its file) changes the
+new config is validated, the call payload is re-encoded once, and both are
+swapped in with a single assignment, so every request sees either the old or
+the new version. An invalid file is logged and the current version kept.
+
+"${TOOLS_BASE_URL}" in any string is replaced with TOOLS_BASE_URL. Seed a
+store from the built-in config with:
+
+    python -m config.agent_store export agent-configs 2026-10-17
+    python -m config.agent_store check agent-configs
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.agent_config import TOOLS_BASE_URL, ULTRAVOX_WEB_CALL_CONFIG
+from services import call_payload
+
+AGENT_CONFIG_DIR = os.getenv("AGENT_CONFIG_DIR")
+AGENT_CONFIG_VERSION = os.getenv("AGENT_CONFIG_VERSION")
+AGENT_CONFIG_POLL = float(os.getenv("AGENT_CONFIG_POLL", 5))
+
+ACTIVE_FILE = "ACTIVE"
+TOOLS_BASE_URL_PLACEHOLDER = "${TOOLS_BASE_URL}"
+REQUIRED_FIELDS = ("systemPrompt", "model", "voice", "temperature", "selectedTools")
+
+logger = logging.getLogger(__name__)
+
+
+class AgentConfigError(ValueError):
+    """An agent config version that cannot be used"""
+
+
+def _substitute(value: Any, old: str, new: str) -> Any:
+    if isinstance(value, str):
+        return value.replace(old, new)
+    if isinstance(value, dict):
+        return {key: _substitute(item, old, new) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, old, new) for item in value]
+    return value
+
+
+def validate(config: Any) -> Dict[str, Any]:
+    if not isinstance(config, dict):
+        raise AgentConfigError("agent config must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS if field not in config]
+    if missing:
+        raise AgentConfigError(f"missing fields: {', '.join(missing)}")
+    if not isinstance(config["systemPrompt"], str) or not config["systemPrompt"].strip():
+        raise AgentConfigError("systemPrompt must be a non-empty string")
+    if not isinstance(config["selectedTools"], list):
+        raise AgentConfigError("selectedTools must be a list")
+    return config
+
+
+def load_version(directory: str, version: str) -> Dict[str, Any]:
+    """Read and validate one version, with TOOLS_BASE_URL filled in"""
+    path = os.path.join(directory, f"{version}.json")
+    try:
+        with open(path, encoding="utf-8") as source:
+            config = json.load(source)
+    except (OSError, ValueError) as e:
+        raise AgentConfigError(f"{path}: {e}") from e
+    return _substitute(validate(config), TOOLS_BASE_URL_PLACEHOLDER, TOOLS_BASE_URL)
+
+
+def list_versions(directory: str) -> List[str]:
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+
+class AgentConfigStore:
+    """The active agent config version, reloaded when the store changes"""
+
+    def __init__(self, directory: Optional[str] = AGENT_CONFIG_DIR, pinned: Optional[str] = AGENT_CONFIG_VERSION,
+                 poll: float = AGENT_CONFIG_POLL):
+        self.directory = directory
+        self.pinned = pinned
+        self.poll = poll
+        self.version = call_payload.BUILTIN_VERSION
+        # (version, mtime, size) of the file last loaded or rejected
+        self._signature: Optional[Tuple[str, int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def active_version(self) -> Optional[str]:
+        if self.pinned:
+            return self.pinned
+        try:
+            with open(os.path.join(self.directory, ACTIVE_FILE), encoding="utf-8") as source:
+                named = source.read().strip()
+            if named:
+                return named
+        except OSError:
+            pass
+        versions = list_versions(self.directory)
+        return versions[-1] if versions else None
+
+    def refresh(self) -> bool:
+        """Load the active version if it changed; returns whether a new version was swapped in"""
+        if not self.directory:
+            return False
+        version = self.active_version()
+        if version is None:
+            return False
+        try:
+            stat = os.stat(os.path.join(self.directory, f"{version}.json"))
+            signature = (version, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = (version, 0, 0)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            config = load_version(self.directory, version)
+        except AgentConfigError as e:
+            self.errors += 1
+            self.last_error = str(e)
+            logger.error("Agent config %s rejected, keeping %s: %s", version, self.version, e)
+            return False
+        call_payload.rebuild(config, version)
+        self.version = version
+        self.reloads += 1
+        self.last_error = None
+        logger.info("Agent config %s active (%d tools)", version, len(config["selectedTools"]),
+                    extra={"agent_config_version": version})
+        return True
+
+    def start(self):
+        """Load the active version and watch for changes (FastAPI startup hook)"""
+        if not self.directory:
+            return
+        self.refresh()
+        if self.poll > 0:
+            self._task = asyncio.create_task(self._watch(), name="agent-config-watch")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Agent config reload failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "active": self.version,
+            "pinned": self.pinned,
+            "available": list_versions(self.directory) if self.directory else [],
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+agent_store = AgentConfigStore()
+
+
+def export_builtin(directory: str, version: str) -> str:
+    """Write the built-in config as a version file"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{version}.json")
+    config = _substitute(ULTRAVOX_WEB_CALL_CONFIG, TOOLS_BASE_URL, TOOLS_BASE_URL_PLACEHOLDER)
+    with open(path, "w", encoding="utf-8") as out:
+        json.dump(config, out, indent=2, ensure_ascii=False)
+        out.write("\n")
+    return path
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) == 3 and argv[0] == "export":
+        print(f"Wrote {export_builtin(argv[1], argv[2])}")
+        return 0
+    if len(argv) in (2, 3) and argv[0] == "check":
+        versions = argv[2:] or list_versions(argv[1])
+        status = 0
+        for version in versions:
+            try:
+                config = load_version(argv[1], version)
+                print(f"{version}: ok ({len(config['selectedTools'])} tools, {len(config['systemPrompt'])} chars)")
+            except AgentConfigError as e:
+                print(f"{version}: {e}")
+                status = 1
+        return status
+    print("Usage: python -m config.agent_store export <dir> <version>")
+    print("       python -m config.agent_store check <dir> [version]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
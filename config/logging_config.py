@@ -0,0 +1,170 @@
+"""
+Structured, non-blocking logging.
+
+Logging calls only interpolate the message and put the record on an in-memory
+queue; a background QueueListener thread does the JSON encoding and the stdout
+I/O, so a tool call never waits on the terminal. Records carry the current
+tool call's ``call_id``, the Ultravox ``conversation_id`` and any
+``extra={...}`` fields, and are written as one JSON object per line (or plain
+text with LOG_FORMAT=text for local development).
+
+Pass payloads as ``lazy_json(payload)`` arguments at debug level: they are
+only serialized when debug logging is actually enabled.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from services.tracing import conversation_id_var
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+QUIET_LOGGERS = ("httpx", "httpcore", "hpack")
+
+# Tool call currently being handled; set by the route handlers
+call_id_var: ContextVar[Optional[str]] = ContextVar("call_id", default=None)
+
+# LogRecord attributes that are not user-supplied extra fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "call_id", "conversation_id",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def bind_call_id(call_id: Optional[str]):
+    """Attach call_id to every record logged from the current task"""
+    call_id_var.set(call_id)
+
+
+class lazy_json:
+    """Log argument that is pretty-printed only if the record is emitted"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        try:
+            return json.dumps(self.value, indent=2, default=str)
+        except (TypeError, ValueError):
+            return repr(self.value)
+
+
+class CallIdFilter(logging.Filter):
+    """Copy the current call_id and conversation_id onto the record while still on the caller's task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "call_id"):
+            record.call_id = call_id_var.get()
+        if not hasattr(record, "conversation_id"):
+            record.conversation_id = conversation_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, call_id, message and extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "call_id": getattr(record, "call_id", None),
+            "conversation_id": getattr(record, "conversation_id", None),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(call_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "call_id", None) is None:
+            record.call_id = "-"
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """Route all logging through a queue to a background writer thread (idempotent)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(CallIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(LOG_LEVEL)
+    # The upstream request URLs carry job and phone numbers; the routes log what matters
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records, stop the writer thread and log synchronously from then on"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        handler.addFilter(CallIdFilter())
+        root.addHandler(handler)
+    _listener = None
+    _queue_handler = None
+
+
+def logging_stats() -> dict:
+    """Queue depth and dropped record count"""
+    if _queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "level": LOG_LEVEL,
+        "format": LOG_FORMAT,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+    }
@@ -1,17 +1,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from config.logging_config import setup_logging, shutdown_logging
+setup_logging()
+
 # Import routers
-from routes.ultravox_routes import router as ultravox_router
-from routes.cromwell_routes import router as cromwell_router
+from routes.ultravox_routes import router as ultravox_router, post_call
+from routes.cromwell_routes import router as cromwell_router, find_journaled_booking, submit_journaled_booking
+from routes.status_routes import router as status_router
+from services import capture, http_clients, metrics, shared_cache
+from services.booking_journal import booking_journal
+from services.call_pool import warm_pool
+from services.draining import drain
+from services.location_feed import location_feed
+from services.gazetteer import load_gazetteer, close_gazetteer
+from services.address_matching import load_matcher
+from config.agent_store import agent_store
 
 app = FastAPI(
     title="Cromwell Cars Web Dispatcher",
@@ -34,6 +44,31 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Include routers
 app.include_router(ultravox_router, prefix="/api")
 app.include_router(cromwell_router, prefix="/cromwell")
+app.include_router(status_router, prefix="/status")
+
+@app.on_event("startup")
+async def on_startup():
+    """Create shared upstream resources"""
+    await http_clients.startup()
+    load_matcher(load_gazetteer())
+    capture.start()
+    agent_store.start()
+    warm_pool.start(post_call)
+    booking_journal.start(submit_journaled_booking, find_journaled_booking)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Finish in-flight booking writes, then release shared upstream resources"""
+    await drain.wait()
+    await booking_journal.stop()
+    await location_feed.stop()
+    await agent_store.stop()
+    await warm_pool.stop()
+    await http_clients.shutdown()
+    await shared_cache.close_clients()
+    close_gazetteer()
+    capture.stop()
+    shutdown_logging()
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -41,23 +76,16 @@ async def read_root():
     with open("static/index.html", "r") as f:
         return HTMLResponse(content=f.read())
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-tool latency histograms, outcomes and in-flight gauges"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "cromwell-web-dispatcher"}
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
-    host = os.getenv("HOST", "0.0.0.0")
-    
-    print(f"🚀 Starting Cromwell Cars Web Dispatcher on {host}:{port}")
-    print(f"📱 Web interface: http://{host}:{port}")
-    print(f"🔧 API docs: http://{host}:{port}/docs")
-    
-    uvicorn.run(
-        "main:app",
-        host=host,
-        port=port,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    import run
+    run.main()
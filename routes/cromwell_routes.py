@@ -1,16 +1,119 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 import httpx
+import asyncio
 import os
 import json
+import logging
+import time
 from datetime import datetime
+from config.logging_config import bind_call_id, lazy_json
+from services import admission, capture, http_clients, metrics
+from services.addresses import (
+    address_key, find_postcode, flatten_address_lines, journey_key, normalize_phone, normalize_postcode, normalize_text
+)
+from services.booking_journal import BookingRejected, booking_journal, clean_reference
+from services.cache import make_cache
+from services.draining import drain
+from services.geo import coordinates, eta_minutes, haversine_km
+from services.location_feed import location_feed
+from services.pending_quotes import pending_quotes
+from services.singleflight import SingleFlight
+from services.tracing import bind_conversation, conversation_id_var
+from config.agent_config import TOOLS_BASE_URL
+from services.gazetteer import get_gazetteer
+from services.address_matching import get_matcher, normalize_spoken_postcode
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Cromwell Cars API Configuration
-CROMWELL_API_BASE = 'https://online.ontimechauffeurs.co.uk/api'
-CABEE_API_BASE = 'https://capi.cabee-est.com/api'
+# Cromwell Cars API Configuration (overridable, e.g. to point at benchmarks/mock_upstreams.py)
+CROMWELL_API_BASE = os.getenv("CROMWELL_API_BASE", 'https://online.ontimechauffeurs.co.uk/api')
+CABEE_API_BASE = os.getenv("CABEE_API_BASE", 'https://capi.cabee-est.com/api')
+PRICING_WEBHOOK_URL = os.getenv("PRICING_WEBHOOK_URL", 'https://hook.eu2.make.com/7k8jjdhuqbuyywi3mkuwmm9rd6t1fpzi')
+
+# Address validation cache (positive results, plus shorter-lived 404s)
+ADDRESS_CACHE_TTL = float(os.getenv("ADDRESS_CACHE_TTL", 3600))
+ADDRESS_CACHE_NEGATIVE_TTL = float(os.getenv("ADDRESS_CACHE_NEGATIVE_TTL", 120))
+address_cache = make_cache(
+    "address_validation",
+    maxsize=int(os.getenv("ADDRESS_CACHE_SIZE", 2048)),
+    ttl=ADDRESS_CACHE_TTL,
+)
+
+# Pricing quote cache, optionally warmed once both journey addresses are validated
+PRICING_PREFETCH = os.getenv("PRICING_PREFETCH", "false").lower() == "true"
+pricing_cache = make_cache(
+    "pricing_quotes",
+    maxsize=int(os.getenv("PRICING_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("PRICING_CACHE_TTL", 600)),
+)
+# Conversation -> {"journey": its last two validated addresses, "aliases": {form the model may
+# use (normalized text, or postcode) -> validated address}}, so checkPricing keys its quote the
+# way the prefetch did. Shared across workers too, since a conversation's tool calls can land on any of them
+conversation_addresses = make_cache("conversation_addresses", maxsize=4096, ttl=3600)
+background_tasks: Set[asyncio.Task] = set()
+
+# Driver locations for a few seconds, so repeated getDriverLocation calls in a conversation share one poll
+DRIVER_LOCATION_CACHE_TTL = float(os.getenv("DRIVER_LOCATION_CACHE_TTL", 5))
+driver_locations = make_cache("driver_locations", maxsize=2048, ttl=max(DRIVER_LOCATION_CACHE_TTL, 0.001))
+# Coordinates of validated addresses and of each booked job's pickup, for driver ETAs
+address_coordinates = make_cache("address_coordinates", maxsize=8192, ttl=ADDRESS_CACHE_TTL)
+pickup_locations = make_cache("pickup_locations", maxsize=4096, ttl=86400)
+
+# getBooking results by ("job", cleaned job number) and ("phone", normalized phone), filled from
+# creates and lookups and dropped on update/cancel, so a read-before-write costs one upstream call
+BOOKING_CACHE_TTL = float(os.getenv("BOOKING_CACHE_TTL", 120))
+booking_lookups = make_cache(
+    "booking_lookups",
+    maxsize=int(os.getenv("BOOKING_CACHE_SIZE", 2048)),
+    ttl=BOOKING_CACHE_TTL,
+)
+# When each booking_lookups key was last dropped, so a getBooking already in flight at the time
+# (on any worker) does not cache what it read from before the update or cancellation
+booking_invalidations = make_cache(
+    "booking_invalidations",
+    maxsize=int(os.getenv("BOOKING_CACHE_SIZE", 2048)),
+    ttl=BOOKING_CACHE_TTL,
+)
+
+# Repeats of a cabBooking (model retries after a timeout) within this window get the first result.
+# Also holds ("job", job number) -> fingerprint and ("phone", phone) -> fingerprints, so updating
+# or cancelling a booking ends its deduplication and the same trip can be booked again.
+BOOKING_DEDUP_WINDOW = float(os.getenv("BOOKING_DEDUP_WINDOW", 900))
+created_bookings = make_cache(
+    "created_bookings",
+    maxsize=int(os.getenv("BOOKING_DEDUP_SIZE", 4096)),
+    ttl=BOOKING_DEDUP_WINDOW,
+)
+# Fingerprints kept per phone for a cancellation by phone number
+BOOKING_DEDUP_PHONE_JOBS = 20
+
+# Identical concurrent lookups share one upstream request
+address_flights = SingleFlight("address_validation")
+pricing_flights = SingleFlight("pricing")
+booking_flights = SingleFlight("booking_reads")
+# Concurrent duplicate cabBookings wait for the one CreateOnlineJob already in flight
+booking_creations = SingleFlight("booking_creation")
+
+# How long checkPricing waits for an asynchronous Make.com callback after "Accepted"
+PRICING_CALLBACK_WAIT = float(os.getenv("PRICING_CALLBACK_WAIT", 8.0))
+PRICING_CALLBACK_TOKEN = os.getenv("PRICING_CALLBACK_TOKEN")
+
+# bookCab operations; anything else is reported as "invalid" in the metrics
+BOOKING_OPERATIONS = ("cabBooking", "getBooking", "updateBooking", "cancelBooking", "getDriverLocation")
+# Operations that change a booking upstream; shutdown drains these instead of cutting them off
+BOOKING_WRITES = ("cabBooking", "updateBooking", "cancelBooking")
+# Admission order under load: creating and cancelling a booking before anything else
+BOOKING_PRIORITIES = {
+    "cabBooking": admission.CRITICAL,
+    "cancelBooking": admission.CRITICAL,
+    "updateBooking": admission.HIGH,
+    "getBooking": admission.NORMAL,
+    "getDriverLocation": admission.LOW,
+}
 
 # Pydantic models
 class AddressValidationRequest(BaseModel):
@@ -51,17 +154,27 @@ def generate_call_id():
     return f"call_{int(datetime.now().timestamp())}_{os.urandom(4).hex()}"
 
 @router.post("/validateAddress")
-async def validate_address(request: AddressValidationRequest):
+async def validate_address(request: AddressValidationRequest, x_ultravox_call_id: Optional[str] = Header(None)):
+    """Validate UK addresses, remembering them per conversation for pricing prefetch"""
+    
+    bind_conversation(x_ultravox_call_id)
+    capture.record_request("/cromwell/validateAddress", request.dict(), x_ultravox_call_id)
+    result = await metrics.instrument("/cromwell/validateAddress", None, admission.admit(
+        "validateAddress", admission.NORMAL, lambda: handle_validate_address(request),
+        lambda: {"success": False, "error": "System temporarily unavailable", "candidates": []}
+    ))
+    await note_validated_address(x_ultravox_call_id, request, result)
+    await remember_coordinates(result)
+    return result
+
+async def handle_validate_address(request: AddressValidationRequest):
     """Validate UK addresses using Cromwell Cars API with auto-retry on parameter errors"""
     
-    call_id = generate_call_id()
-    timestamp = datetime.now().isoformat()
+    bind_call_id(generate_call_id())
     
     try:
-        print(f"\n🔍 ===== ADDRESS VALIDATION TOOL CALLED =====")
-        print(f"📅 Timestamp: {timestamp}")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"📥 INCOMING REQUEST: {request.dict()}")
+        logger.info("Address validation called", extra={"tool": "validateAddress"})
+        logger.debug("Incoming request: %s", lazy_json(request.dict()))
         
         # Parse address_lines if it's a string (auto-correct common AI mistakes)
         address_lines = request.address_lines
@@ -69,112 +182,69 @@ async def validate_address(request: AddressValidationRequest):
             try:
                 # Try to parse as JSON first
                 address_lines = json.loads(address_lines)
-                print(f"🔧 PARSED JSON STRING TO ARRAY: {request.address_lines} → {address_lines}")
+                logger.info("Parsed address_lines JSON string: %s → %s", request.address_lines, address_lines)
             except json.JSONDecodeError:
                 # If not JSON, treat as single address line
                 address_lines = [address_lines]
-                print(f"🔧 CONVERTED STRING TO ARRAY: {request.address_lines} → {address_lines}")
+                logger.info("Converted address_lines string to array: %s → %s", request.address_lines, address_lines)
         
         # Ensure it's a proper list
         if not isinstance(address_lines, list):
             address_lines = [str(address_lines)]
-            print(f"🔧 FORCED TO ARRAY: {address_lines}")
+            logger.info("Forced address_lines to array: %s", address_lines)
         
-        request_payload = {
-            "address_lines": address_lines,
-            "postcode": request.postcode,
-        }
+        # Turn spoken or misheard postcodes ("ha one two tee aitch") into canonical form
+        postcode = request.postcode
+        if postcode:
+            spoken_postcode = normalize_spoken_postcode(postcode)
+            if spoken_postcode and spoken_postcode != postcode:
+                logger.info("Normalized spoken postcode: %s → %s", postcode, spoken_postcode)
+                postcode = spoken_postcode
+        elif address_lines and isinstance(address_lines[-1], str):
+            spoken_postcode = normalize_spoken_postcode(address_lines[-1])
+            if spoken_postcode and len(spoken_postcode) > 4:
+                logger.info("Postcode found in address lines: %s → %s", address_lines[-1], spoken_postcode)
+                postcode = spoken_postcode
+                address_lines = address_lines[:-1]
         
-        print(f"🌐 CALLING CROMWELL ADDRESS API:")
-        print(f"   URL: {CROMWELL_API_BASE}/address/validate")
-        print(f"   Payload: {json.dumps(request_payload, indent=2)}")
+        cache_key = address_key(address_lines, postcode)
+        cached = await address_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Address cache hit", extra={"source": "cache"})
+            return cached
+        
+        # Answer well-known landmarks and postcodes from the local gazetteer
+        gazetteer = get_gazetteer()
+        if gazetteer is not None:
+            local_candidates = gazetteer.match_address(address_lines, postcode)
+            if local_candidates:
+                logger.info("Local gazetteer match: %s", local_candidates[0].get('formatted'), extra={"source": "gazetteer"})
+                return {"candidates": local_candidates}
+        
+        # Tolerate misheard landmark and street names before going upstream
+        matcher = get_matcher()
+        if matcher is not None:
+            fuzzy_candidates = matcher.match_landmark(address_lines, postcode)
+            if fuzzy_candidates:
+                logger.info("Fuzzy landmark match: %s (score %s)", fuzzy_candidates[0].get('formatted'),
+                            fuzzy_candidates[0].get('match_score'), extra={"source": "fuzzy"})
+                return {"candidates": fuzzy_candidates}
+            corrected_lines = [
+                matcher.correct_street(line) if isinstance(line, str) else line
+                for line in address_lines
+            ]
+            if corrected_lines != address_lines:
+                logger.info("Corrected street names: %s → %s", address_lines, corrected_lines)
+                address_lines = corrected_lines
+        
+        # Identical concurrent lookups share one upstream request
+        return await address_flights.do(
+            cache_key,
+            lambda: request_address_validation(address_lines, postcode, cache_key)
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{CROMWELL_API_BASE}/address/validate",
-                headers={"Content-Type": "application/json"},
-                json=request_payload,
-                timeout=30.0
-            )
-            
-            print(f"📡 API Response Status: {response.status_code}")
-            
-            # Handle 422 validation errors by auto-correcting and retrying
-            if response.status_code == 422:
-                error_text = response.text
-                print(f"⚠️ VALIDATION ERROR (422) - AUTO-CORRECTING: {error_text}")
-                
-                # Try alternative format - flatten address lines if they contain arrays
-                if "list_type" in error_text and "address_lines" in error_text:
-                    # Extract address components and flatten
-                    flattened_lines = []
-                    for line in address_lines:
-                        if isinstance(line, list):
-                            flattened_lines.extend([str(item) for item in line])
-                        else:
-                            flattened_lines.append(str(line))
-                    
-                    corrected_payload = {
-                        "address_lines": flattened_lines,
-                        "postcode": request.postcode,
-                    }
-                    
-                    print(f"🔄 RETRYING WITH CORRECTED PAYLOAD: {json.dumps(corrected_payload, indent=2)}")
-                    
-                    # Retry with corrected format
-                    retry_response = await client.post(
-                        f"{CROMWELL_API_BASE}/address/validate",
-                        headers={"Content-Type": "application/json"},
-                        json=corrected_payload,
-                        timeout=30.0
-                    )
-                    
-                    if retry_response.is_success:
-                        result = retry_response.json()
-                        print(f"✅ AUTO-CORRECTION SUCCESSFUL")
-                        print(f"📤 API RESPONSE DATA: {json.dumps(result, indent=2)}")
-                        return result
-                    else:
-                        print(f"❌ RETRY ALSO FAILED: {retry_response.status_code}")
-                        response = retry_response  # Use retry response for final error handling
-            
-            if not response.is_success:
-                error_text = response.text
-                print(f"❌ API Error: {response.status_code} - {error_text}")
-                
-                # Only show user-friendly errors for non-recoverable issues
-                if response.status_code == 404:
-                    return {
-                        "success": False,
-                        "error": "Address not found",
-                        "candidates": []
-                    }
-                else:
-                    # For other errors, return a generic message
-                    return {
-                        "success": False,
-                        "error": "Unable to validate address at the moment",
-                        "candidates": []
-                    }
-            
-            result = response.json()
-            print(f"📤 API RESPONSE DATA: {json.dumps(result, indent=2)}")
-            print(f"✅ ADDRESS VALIDATION SUCCESS")
-            print(f"🔍 Found {len(result.get('candidates', []))} address candidates")
-            
-            if result.get('candidates') and len(result['candidates']) > 0:
-                print(f"📍 TOP ADDRESS CANDIDATE:")
-                print(f"   Formatted: {result['candidates'][0].get('formatted')}")
-                print(f"   Postcode: {result['candidates'][0].get('postcode')}")
-            
-            print(f"🔍 ===== ADDRESS VALIDATION COMPLETE =====\n")
-            return result
-            
     except httpx.RequestError as e:
-        print(f"❌ ===== ADDRESS VALIDATION ERROR =====")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"💥 REQUEST ERROR: {str(e)}")
-        print(f"❌ ===== ADDRESS VALIDATION ERROR END =====\n")
+        logger.warning("Address validation request error: %s", e)
         
         # Return user-friendly error instead of HTTP exception
         return {
@@ -182,11 +252,8 @@ async def validate_address(request: AddressValidationRequest):
             "error": "Network error during address validation",
             "candidates": []
         }
-    except Exception as e:
-        print(f"❌ ===== ADDRESS VALIDATION ERROR =====")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"💥 UNEXPECTED ERROR: {str(e)}")
-        print(f"❌ ===== ADDRESS VALIDATION ERROR END =====\n")
+    except Exception:
+        logger.exception("Address validation failed")
         
         # Return user-friendly error instead of HTTP exception
         return {
@@ -195,83 +262,134 @@ async def validate_address(request: AddressValidationRequest):
             "candidates": []
         }
 
-@router.post("/checkPricing")
-async def check_pricing(request: PricingRequest):
-    """Check pricing using Make.com webhook"""
+async def request_address_validation(address_lines: List[Any], postcode: Optional[str], cache_key: Any):
+    """Call the Cromwell address API (with 422 auto-correction) and cache the outcome"""
     
-    call_id = generate_call_id()
-    timestamp = datetime.now().isoformat()
+    request_payload = {
+        "address_lines": address_lines,
+        "postcode": postcode,
+    }
     
-    try:
-        print(f"\n💰 ===== PRICING TOOL CALLED =====")
-        print(f"📅 Timestamp: {timestamp}")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"📥 INCOMING REQUEST: {request.dict()}")
-        
-        pricing_data = {
-            "operation": "checkPricing",
-            "companyId": "99",
-            "sourceAddress": request.sourceAddress,
-            "destinationAddress": request.destinationAddress
-        }
-        
-        print(f"🌐 CALLING MAKE.COM WEBHOOK:")
-        print(f"   URL: https://hook.eu2.make.com/7k8jjdhuqbuyywi3mkuwmm9rd6t1fpzi")
-        print(f"   Payload: {json.dumps(pricing_data, indent=2)}")
+    logger.info("Calling Cromwell address API", extra={"upstream": "cromwell"})
+    logger.debug("Address API payload: %s", lazy_json(request_payload))
+    
+    client = http_clients.get_client("cromwell")
+    response = await client.post(
+        f"{CROMWELL_API_BASE}/address/validate",
+        headers={"Content-Type": "application/json"},
+        json=request_payload,
+        extensions={"hedge": True}
+    )
+    
+    logger.info("Address API responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    # Handle 422 validation errors by auto-correcting and retrying
+    if response.status_code == 422:
+        error_text = response.text
+        logger.warning("Address API validation error (422), auto-correcting: %s", error_text)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://hook.eu2.make.com/7k8jjdhuqbuyywi3mkuwmm9rd6t1fpzi",
-                headers={"Content-Type": "application/json"},
-                json=pricing_data,
-                timeout=30.0
-            )
+        # Try alternative format - flatten address lines if they contain arrays
+        if "list_type" in error_text and "address_lines" in error_text:
+            # Extract address components and flatten
+            flattened_lines = flatten_address_lines(address_lines)
             
-            print(f"📡 Make.com Response Status: {response.status_code}")
-            print(f"📋 Content-Type: {response.headers.get('content-type')}")
+            corrected_payload = {
+                "address_lines": flattened_lines,
+                "postcode": postcode,
+            }
             
-            if not response.is_success:
-                print(f"❌ Make.com API Error: {response.status_code}")
-                return {
-                    "success": False,
-                    "error": "Unable to get pricing at the moment",
-                    "status": "api_error"
-                }
+            logger.info("Retrying address validation with flattened address lines")
+            logger.debug("Corrected payload: %s", lazy_json(corrected_payload))
             
-            # Handle both JSON and text responses
-            content_type = response.headers.get('content-type', '')
+            # Retry with corrected format
+            retry_response = await client.post(
+                f"{CROMWELL_API_BASE}/address/validate",
+                headers={"Content-Type": "application/json"},
+                json=corrected_payload,
+                extensions={"idempotent": True}
+            )
             
-            if 'application/json' in content_type:
-                result = response.json()
-                print(f"📤 Make.com JSON Response: {json.dumps(result, indent=2)}")
+            if retry_response.is_success:
+                result = retry_response.json()
+                logger.info("Address auto-correction succeeded")
+                logger.debug("Address API response: %s", lazy_json(result))
+                await address_cache.set(cache_key, result)
+                return result
             else:
-                text_result = response.text
-                print(f"📤 Make.com Text Response: {text_result}")
-                
-                if "Accepted" in text_result:
-                    result = {
-                        "success": True,
-                        "message": "Pricing request accepted and processing",
-                        "status": "accepted",
-                        "webhook_response": text_result
-                    }
-                    print(f"✅ PRICING REQUEST ACCEPTED")
-                else:
-                    result = {
-                        "success": False,
-                        "error": "Unexpected response format",
-                        "response": text_result
-                    }
-                    print(f"⚠️ UNEXPECTED RESPONSE FORMAT")
-            
-            print(f"💰 ===== PRICING TOOL COMPLETE =====\n")
+                logger.warning("Address auto-correction retry failed: %s", retry_response.status_code)
+                response = retry_response  # Use retry response for final error handling
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Address API error: %s - %s", response.status_code, error_text)
+        
+        # Only show user-friendly errors for non-recoverable issues
+        if response.status_code == 404:
+            result = {
+                "success": False,
+                "error": "Address not found",
+                "candidates": []
+            }
+            await address_cache.set(cache_key, result, ttl=ADDRESS_CACHE_NEGATIVE_TTL)
             return result
-            
+        else:
+            # For other errors, return a generic message
+            return {
+                "success": False,
+                "error": "Unable to validate address at the moment",
+                "candidates": []
+            }
+    
+    result = response.json()
+    logger.debug("Address API response: %s", lazy_json(result))
+    candidates = (result.get('candidates') or []) if isinstance(result, dict) else []
+    logger.info(
+        "Address validation found %d candidates", len(candidates),
+        extra={"source": "upstream", "top_candidate": candidates[0].get('formatted') if candidates else None}
+    )
+    
+    # An empty candidate list is a miss too, so keep it only briefly
+    await address_cache.set(cache_key, result, ttl=None if candidates else ADDRESS_CACHE_NEGATIVE_TTL)
+    return result
+
+@router.post("/checkPricing")
+async def check_pricing(request: PricingRequest, x_ultravox_call_id: Optional[str] = Header(None)):
+    """Check pricing using Make.com webhook"""
+    
+    bind_conversation(x_ultravox_call_id)
+    capture.record_request("/cromwell/checkPricing", request.dict(), x_ultravox_call_id)
+    return await metrics.instrument("/cromwell/checkPricing", None, admission.admit(
+        "checkPricing", admission.NORMAL, lambda: handle_check_pricing(request),
+        lambda: {"success": False, "error": "System temporarily unavailable", "status": "system_error"}
+    ))
+
+async def handle_check_pricing(request: PricingRequest):
+    """Answer a quote from cache, a callback or the Make.com webhook"""
+    
+    bind_call_id(generate_call_id())
+    
+    try:
+        logger.info("Pricing called", extra={"tool": "checkPricing"})
+        logger.debug("Incoming request: %s", lazy_json(request.dict()))
+        
+        quote_key = await pricing_key(request.sourceAddress, request.destinationAddress)
+        cached = await pricing_cache.get(quote_key)
+        if cached is not None:
+            logger.info("Pricing cache hit", extra={"source": "cache"})
+            return cached
+        
+        # Joins a speculative prefetch or an identical request already in flight
+        if pricing_flights.in_flight(quote_key):
+            logger.info("Joining in-flight pricing request")
+        result = await pricing_flights.do(
+            quote_key,
+            lambda: request_pricing(request.sourceAddress, request.destinationAddress, quote_key)
+        )
+        logger.info("Pricing complete")
+        return result
+        
     except httpx.RequestError as e:
-        print(f"❌ ===== PRICING TOOL ERROR =====")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"💥 REQUEST ERROR: {str(e)}")
-        print(f"❌ ===== PRICING TOOL ERROR END =====\n")
+        logger.warning("Pricing request error: %s", e)
         
         # Return user-friendly error instead of HTTP exception
         return {
@@ -279,11 +397,8 @@ async def check_pricing(request: PricingRequest):
             "error": "Unable to get pricing at the moment",
             "status": "network_error"
         }
-    except Exception as e:
-        print(f"❌ ===== PRICING TOOL ERROR =====")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"💥 UNEXPECTED ERROR: {str(e)}")
-        print(f"❌ ===== PRICING TOOL ERROR END =====\n")
+    except Exception:
+        logger.exception("Pricing failed")
         
         # Return user-friendly error instead of HTTP exception
         return {
@@ -292,29 +407,263 @@ async def check_pricing(request: PricingRequest):
             "status": "system_error"
         }
 
+async def request_pricing(source_address: str, destination_address: str, quote_key: Optional[tuple] = None):
+    """Post a quote request to the Make.com webhook, caching priced responses under quote_key"""
+    
+    quote_key = quote_key or journey_key(source_address, destination_address)
+    # Register before posting so a fast callback cannot arrive before we listen
+    correlation_id, quote_future = await pending_quotes.create(quote_key)
+    
+    pricing_data = {
+        "operation": "checkPricing",
+        "companyId": "99",
+        "sourceAddress": source_address,
+        "destinationAddress": destination_address,
+        "correlationId": correlation_id,
+        "callbackUrl": f"{TOOLS_BASE_URL}/cromwell/pricingCallback"
+    }
+    
+    logger.info("Calling Make.com pricing webhook", extra={"upstream": "make", "correlation_id": correlation_id})
+    logger.debug("Pricing payload: %s", lazy_json(pricing_data))
+    
+    client = http_clients.get_client("make")
+    try:
+        # A repeated quote request is harmless, so it keeps the adaptive timeout
+        response = await client.post(
+            PRICING_WEBHOOK_URL,
+            headers={"Content-Type": "application/json"},
+            json=pricing_data,
+            extensions={"idempotent": True}
+        )
+    except Exception:
+        pending_quotes.discard(correlation_id)
+        raise
+    
+    logger.info(
+        "Make.com responded %s (%s)", response.status_code, response.headers.get('content-type'),
+        extra={"status_code": response.status_code}
+    )
+    
+    if not response.is_success:
+        logger.warning("Make.com API error: %s", response.status_code)
+        pending_quotes.discard(correlation_id)
+        return {
+            "success": False,
+            "error": "Unable to get pricing at the moment",
+            "status": "api_error"
+        }
+    
+    # Handle both JSON and text responses
+    content_type = response.headers.get('content-type', '')
+    
+    if 'application/json' in content_type:
+        pending_quotes.discard(correlation_id)
+        result = response.json()
+        logger.debug("Make.com JSON response: %s", lazy_json(result))
+        # Only real quotes are worth keeping
+        if not (isinstance(result, dict) and result.get("success") is False):
+            await pricing_cache.set(quote_key, result)
+    else:
+        text_result = response.text
+        logger.debug("Make.com text response: %s", text_result)
+        
+        if "Accepted" in text_result:
+            logger.info("Pricing request accepted, waiting up to %ss for callback", PRICING_CALLBACK_WAIT)
+            try:
+                # Shielded so a late callback still resolves (and caches) the quote
+                result = await pending_quotes.wait(correlation_id, quote_future, PRICING_CALLBACK_WAIT)
+                logger.info("Pricing callback received")
+                logger.debug("Pricing callback quote: %s", lazy_json(result))
+                return result
+            except asyncio.TimeoutError:
+                logger.info("No pricing callback yet", extra={"correlation_id": correlation_id})
+            except asyncio.CancelledError:
+                # Only an expired pending quote is expected here; real cancellation propagates
+                if not quote_future.cancelled():
+                    raise
+            result = {
+                "success": True,
+                "message": "Pricing request accepted and processing",
+                "status": "accepted",
+                "webhook_response": text_result,
+                "correlationId": correlation_id
+            }
+        else:
+            pending_quotes.discard(correlation_id)
+            result = {
+                "success": False,
+                "error": "Unexpected response format",
+                "response": text_result
+            }
+            logger.warning("Unexpected Make.com response format")
+    
+    return result
+
+@router.post("/pricingCallback")
+async def pricing_callback(payload: Dict[str, Any] = Body(...), x_callback_token: Optional[str] = Header(None)):
+    """Receive a finished quote from Make.com for an earlier "Accepted" pricing request"""
+    
+    if PRICING_CALLBACK_TOKEN and x_callback_token != PRICING_CALLBACK_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+    capture.record_request("/cromwell/pricingCallback", payload)
+    
+    correlation_id = payload.get("correlationId")
+    if not correlation_id:
+        raise HTTPException(status_code=400, detail="correlationId is required")
+    
+    quote = {k: v for k, v in payload.items() if k != "correlationId"}
+    quote_key = await pending_quotes.resolve(correlation_id, quote)
+    logger.info(
+        "Pricing callback %s", "matched" if quote_key else "unknown",
+        extra={"correlation_id": correlation_id}
+    )
+    if quote_key is None:
+        return {"status": "unknown_correlation_id"}
+    
+    if quote.get("success") is not False:
+        await pricing_cache.set(quote_key, quote)
+    return {"status": "received"}
+
+async def prefetch_pricing(source_address: str, destination_address: str):
+    """Background quote request that warms the pricing cache"""
+    
+    quote_key = journey_key(source_address, destination_address)
+    # Speculative, so the first to be shed if the pricing webhook is saturated
+    admission.set_priority(admission.LOW)
+    try:
+        logger.info("Prefetching pricing: %s → %s", source_address, destination_address)
+        await pricing_flights.do(quote_key, lambda: request_pricing(source_address, destination_address))
+    except Exception as e:
+        logger.warning("Pricing prefetch failed: %s", e)
+
+async def remember_coordinates(result: Any):
+    """Keep the coordinates of validated addresses, so a booking from one can get driver ETAs"""
+    
+    if not isinstance(result, dict):
+        return
+    for candidate in (result.get("candidates") or [])[:3]:
+        point = coordinates(candidate)
+        if point is not None and candidate.get("formatted"):
+            await address_coordinates.set(normalize_text(candidate["formatted"]), point)
+
+async def remember_pickup(job_no: Optional[str], origin: Optional[str]):
+    """Record a new job's pickup coordinates, if its origin is a validated address"""
+    
+    if not job_no or not origin:
+        return
+    point = await address_coordinates.get(normalize_text(origin))
+    if point is not None:
+        await pickup_locations.set(job_no.replace("-", ""), {"point": point, "address": origin})
+
+async def pricing_key(source_address: str, destination_address: str) -> tuple:
+    """
+    Quote cache key for a checkPricing call. Addresses the conversation has
+    validated are keyed by their validated form, as the prefetch keyed them,
+    whether the model sends that form, what it asked to validate, or any
+    address with the same postcode.
+    """
+    
+    conversation_id = conversation_id_var.get()
+    known = await conversation_addresses.get(conversation_id) if PRICING_PREFETCH and conversation_id else None
+    if known:
+        aliases = known["aliases"]
+        source_address, destination_address = (
+            aliases.get(normalize_text(address)) or aliases.get(find_postcode(address)) or address
+            for address in (source_address, destination_address)
+        )
+    return journey_key(source_address, destination_address)
+
+async def note_validated_address(conversation_id: Optional[str], request: AddressValidationRequest, result: Any):
+    """Remember a conversation's validated addresses and prefetch pricing once there are two"""
+    
+    if not PRICING_PREFETCH or not conversation_id or not isinstance(result, dict):
+        return
+    candidates = result.get("candidates") or []
+    if not candidates or not candidates[0].get("formatted"):
+        return
+    
+    formatted = candidates[0]["formatted"]
+    known = await conversation_addresses.get(conversation_id) or {"journey": [], "aliases": {}}
+    lines = flatten_address_lines(request.address_lines)
+    forms = [normalize_text(text) for text in (formatted, " ".join(lines), " ".join(lines + [request.postcode or ""]))]
+    postcode = normalize_postcode(candidates[0].get("postcode")) or find_postcode(formatted)
+    if formatted in known["journey"] and all(known["aliases"].get(form) == formatted for form in forms):
+        return
+    # Validation order follows the call flow: pickup first, then destination
+    addresses = known["journey"] if formatted in known["journey"] else (known["journey"] + [formatted])[-2:]
+    aliases = {form: address for form, address in known["aliases"].items() if address in addresses}
+    aliases.update((form, formatted) for form in forms if form)
+    if postcode:
+        # Two journey addresses in one postcode: the postcode alone cannot tell them apart
+        aliases[postcode] = formatted if aliases.get(postcode) in (None, formatted) else ""
+    await conversation_addresses.set(conversation_id, {"journey": addresses, "aliases": aliases})
+    if len(addresses) < 2:
+        return
+    
+    quote_key = journey_key(*addresses)
+    if pricing_flights.in_flight(quote_key) or await pricing_cache.get(quote_key) is not None:
+        return
+    task = asyncio.create_task(prefetch_pricing(*addresses))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
 @router.post("/bookCab")
-async def book_cab(request: BookingRequest):
+async def book_cab(request: BookingRequest, x_ultravox_call_id: Optional[str] = Header(None)):
     """Handle all booking operations using Cabee APIs"""
     
+    bind_conversation(x_ultravox_call_id)
+    capture.record_request("/cromwell/bookCab", request.dict(), x_ultravox_call_id)
+    operation = request.operation if request.operation in BOOKING_OPERATIONS else "invalid"
+    
+    def handler():
+        work = handle_book_cab(request)
+        return drain.protect(work) if operation in BOOKING_WRITES else work
+    
+    return await metrics.instrument("/cromwell/bookCab", operation, admission.admit(
+        "bookCab", BOOKING_PRIORITIES.get(operation, admission.NORMAL), handler,
+        lambda: {"status": "error", "booking_status": "system_error",
+                 "error": "System temporarily unavailable", "data": None}
+    ))
+
+async def handle_book_cab(request: BookingRequest):
+    """Dispatch a booking operation to its handler"""
+    
     call_id = generate_call_id()
-    timestamp = datetime.now().isoformat()
+    bind_call_id(call_id)
     jwt_token = get_jwt_token()
     
     try:
-        print(f"\n🚖 ===== BOOKING TOOL CALLED =====")
-        print(f"📅 Timestamp: {timestamp}")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"📥 INCOMING REQUEST: {request.dict()}")
-        print(f"🎯 OPERATION: {request.operation}")
+        logger.info("Booking called: %s", request.operation, extra={"tool": "bookCab", "operation": request.operation})
+        logger.debug("Incoming request: %s", lazy_json(request.dict()))
+        
+        reference = request.jobNO
+        if request.operation != "cabBooking" and request.jobNO:
+            provisional = await booking_journal.lookup(request.jobNO)
+            if provisional is not None and provisional["status"] == "created":
+                logger.info("Provisional reference %s is job %s", request.jobNO, provisional["job_no"])
+                request.jobNO = provisional["job_no"]
+            elif provisional is not None and request.operation in ("updateBooking", "cancelBooking"):
+                try:
+                    return await handle_provisional_booking(request, provisional)
+                finally:
+                    await forget_booking(request, reference)
+            elif provisional is not None:
+                return await handle_provisional_booking(request, provisional)
         
         if request.operation == "cabBooking":
             return await handle_create_booking(request, jwt_token, call_id)
         elif request.operation == "getBooking":
             return await handle_get_booking(request, jwt_token, call_id)
         elif request.operation == "updateBooking":
-            return await handle_update_booking(request, jwt_token, call_id)
+            try:
+                return await handle_update_booking(request, jwt_token, call_id)
+            finally:
+                await forget_booking(request, reference)
         elif request.operation == "cancelBooking":
-            return await handle_cancel_booking(request, jwt_token, call_id)
+            try:
+                return await handle_cancel_booking(request, jwt_token, call_id)
+            finally:
+                await forget_booking(request, reference)
         elif request.operation == "getDriverLocation":
             return await handle_get_driver_location(request, jwt_token, call_id)
         else:
@@ -327,12 +676,8 @@ async def book_cab(request: BookingRequest):
             
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"❌ ===== BOOKING TOOL ERROR =====")
-        print(f"🆔 Call ID: {call_id}")
-        print(f"🎯 Failed Operation: {request.operation}")
-        print(f"💥 UNEXPECTED ERROR: {str(e)}")
-        print(f"❌ ===== BOOKING TOOL ERROR END =====\n")
+    except Exception:
+        logger.exception("Booking operation %s failed", request.operation)
         
         # Return user-friendly error instead of HTTP exception
         return {
@@ -345,8 +690,6 @@ async def book_cab(request: BookingRequest):
 async def handle_create_booking(request: BookingRequest, jwt_token: str, call_id: str):
     """Handle cab booking creation"""
     
-    print(f"\n📝 === CREATE BOOKING OPERATION ===")
-    
     # Vehicle type mapping
     vehicle_type_mapping = {
         'standard': 68,
@@ -369,11 +712,9 @@ async def handle_create_booking(request: BookingRequest, jwt_token: str, call_id
     # Use the user-provided phone number, prioritize passengerPhone over Phone
     user_phone = request.passengerPhone or request.Phone
     if not user_phone:
-        print(f"⚠️ WARNING: No phone number provided, using fallback")
+        logger.warning("No phone number provided, using fallback")
         user_phone = '03000000000'
     
-    print(f"📞 Using phone number: {user_phone}")
-    
     booking_data = {
         "id": 0,
         "jobNO": "string",
@@ -399,73 +740,233 @@ async def handle_create_booking(request: BookingRequest, jwt_token: str, call_id
         "destination": request.destination
     }
     
-    print(f"🌐 CALLING CABEE CREATE BOOKING API:")
-    print(f"   URL: {CABEE_API_BASE}/Job/CreateOnlineJob")
-    print(f"   Vehicle Type Mapping: \"{request.vehicleTypeId}\" → {numeric_vehicle_type_id}")
-    print(f"   Phone Number Used: {user_phone}")
-    print(f"   Payload: {json.dumps(booking_data, indent=2)}")
+    # In write-behind mode the booking is journaled and sent to Cabee in the background
+    create = queue_booking if booking_journal.enabled else create_booking
+    if BOOKING_DEDUP_WINDOW <= 0:
+        return await create(request, booking_data, jwt_token)
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{CABEE_API_BASE}/Job/CreateOnlineJob",
-            headers={
-                "accept": "text/plain",
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {jwt_token}"
-            },
-            json=booking_data,
-            timeout=30.0
-        )
-        
-        print(f"📡 Cabee Response Status: {response.status_code}")
-        
-        if not response.is_success:
-            error_text = response.text
-            print(f"❌ CREATE BOOKING ERROR: {response.status_code} - {error_text}")
-            
-            # Return user-friendly error instead of HTTP exception
-            return {
-                "status": "error",
-                "booking_status": "failed",
-                "error": "Unable to create booking at the moment",
-                "data": None
-            }
-        
-        result = response.json()
-        print(f"📤 CREATE BOOKING SUCCESS: {json.dumps(result, indent=2)}")
-        print(f"✅ New Job Number: {result.get('jobNO')}")
+    fingerprint = booking_fingerprint(request, user_phone, numeric_vehicle_type_id)
+    stored = await created_bookings.get(fingerprint)
+    if stored is not None:
+        logger.info("Duplicate booking request, returning booking %s", stored["data"]["jobNO"],
+                    extra={"job_no": stored["data"]["jobNO"]})
+        return stored
+    if booking_creations.in_flight(fingerprint):
+        logger.info("Duplicate booking request, waiting for the booking already being created")
+    return await booking_creations.do(fingerprint, lambda: create(request, booking_data, jwt_token, fingerprint))
+
+def booking_fingerprint(request: BookingRequest, phone: str, vehicle_type_id: int) -> tuple:
+    """What makes two cabBooking calls the same booking"""
+    return (
+        conversation_id_var.get() or "",
+        normalize_phone(phone),
+        normalize_text(request.origin or ""),
+        normalize_text(request.destination or ""),
+        (request.date or "").strip(),
+        vehicle_type_id,
+    )
+
+async def create_booking(request: BookingRequest, booking_data: Dict[str, Any], jwt_token: str,
+                         fingerprint: Optional[tuple] = None):
+    """Create the job upstream, remembering a confirmed booking under its fingerprint"""
+    
+    user_phone = booking_data["passengerPhone"]
+    logger.info(
+        "Calling Cabee create booking API (vehicle type %r → %s)", request.vehicleTypeId, booking_data["vehicleTypeId"],
+        extra={"upstream": "cabee"}
+    )
+    logger.debug("Create booking payload: %s", lazy_json(booking_data))
+    
+    client = http_clients.get_client("cabee")
+    response = await client.post(
+        f"{CABEE_API_BASE}/Job/CreateOnlineJob",
+        headers={
+            "accept": "text/plain",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {jwt_token}"
+        },
+        json=booking_data
+    )
+    
+    logger.info("Create booking responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Create booking error: %s - %s", response.status_code, error_text)
         
-        response_data = {
-            "status": "success",
-            "booking_status": "confirmed",
-            "error": None,
-            "data": {
-                "jobNO": result.get("jobNO"),
-                "bookingId": result.get("id"),
-                "passengerName": result.get("passengerName"),
-                "customerPrice": result.get("customerPrice"),
-                "date": result.get("date"),
-                "origin": result.get("origin"),
-                "destination": result.get("destination"),
-                "vehicleType": request.vehicleTypeId,
-                "phoneNumber": user_phone
-            }
+        # Return user-friendly error instead of HTTP exception
+        return {
+            "status": "error",
+            "booking_status": "failed",
+            "error": "Unable to create booking at the moment",
+            "data": None
         }
-        
-        print(f"📤 SENDING RESPONSE TO AI: {json.dumps(response_data, indent=2)}")
-        return response_data
+    
+    result = response.json()
+    logger.info("Booking created: %s", result.get('jobNO'), extra={"job_no": result.get('jobNO')})
+    logger.debug("Create booking response: %s", lazy_json(result))
+    
+    response_data = {
+        "status": "success",
+        "booking_status": "confirmed",
+        "error": None,
+        "data": {
+            "jobNO": result.get("jobNO"),
+            "bookingId": result.get("id"),
+            "passengerName": result.get("passengerName"),
+            "customerPrice": result.get("customerPrice"),
+            "date": result.get("date"),
+            "origin": result.get("origin"),
+            "destination": result.get("destination"),
+            "vehicleType": request.vehicleTypeId,
+            "phoneNumber": user_phone
+        }
+    }
+    
+    if fingerprint is not None:
+        await remember_created_booking(fingerprint, response_data)
+    await remember_pickup(result.get("jobNO"), request.origin)
+    # The new job answers a getBooking by its number; a lookup by phone no longer lists all its jobs
+    await remember_bookings({"status": "success", "booking_status": "found", "error": None, "data": [result]})
+    await drop_booking_lookup(("phone", normalize_phone(user_phone)))
+    logger.debug("Sending response to AI: %s", lazy_json(response_data))
+    return response_data
+
+async def queue_booking(request: BookingRequest, booking_data: Dict[str, Any], jwt_token: str,
+                        fingerprint: Optional[tuple] = None):
+    """Journal the booking and confirm it with a provisional reference straight away"""
+    
+    response_data = await booking_journal.enqueue(booking_data, {
+        "passengerName": booking_data["passengerName"],
+        "customerPrice": booking_data["customerPrice"],
+        "date": booking_data["date"],
+        "origin": booking_data["origin"],
+        "destination": booking_data["destination"],
+        "vehicleType": request.vehicleTypeId,
+        "phoneNumber": booking_data["passengerPhone"],
+    })
+    if fingerprint is not None:
+        await remember_created_booking(fingerprint, response_data)
+    logger.debug("Sending response to AI: %s", lazy_json(response_data))
+    return response_data
+
+async def remember_created_booking(fingerprint: tuple, response_data: Dict[str, Any]):
+    """Keep a confirmed booking under its fingerprint, and the fingerprint under its job and phone"""
+    
+    await created_bookings.set(fingerprint, response_data)
+    await created_bookings.set(("job", clean_reference(response_data["data"]["jobNO"])), fingerprint)
+    phone_key = ("phone", fingerprint[1])
+    fingerprints = await created_bookings.get(phone_key) or []
+    await created_bookings.set(phone_key, [*fingerprints, fingerprint][-BOOKING_DEDUP_PHONE_JOBS:])
+
+async def submit_journaled_booking(booking_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a journaled booking in Cabee (the write-behind drain); raises to retry later"""
+    
+    admission.set_priority(admission.HIGH)
+    client = http_clients.get_client("cabee")
+    response = await client.post(
+        f"{CABEE_API_BASE}/Job/CreateOnlineJob",
+        headers={
+            "accept": "text/plain",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {get_jwt_token()}"
+        },
+        json=booking_data
+    )
+    if 400 <= response.status_code < 500 and response.status_code not in (401, 403, 408, 429):
+        raise BookingRejected(f"{response.status_code} - {response.text[:500]}")
+    response.raise_for_status()
+    return response.json()
+
+async def find_journaled_booking(booking_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The job an unanswered CreateOnlineJob may have made for a journaled booking; raises to retry later"""
+    
+    admission.set_priority(admission.HIGH)
+    client = http_clients.get_client("cabee")
+    response = await client.get(
+        f"{CABEE_API_BASE}/Job/GetOnlineJobs?phoneNumber={booking_data['passengerPhone']}",
+        headers={"accept": "text/plain", "Authorization": f"Bearer {get_jwt_token()}"}
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    for job in booked_jobs({"data": response.json()}):
+        # Same pickup minute and journey: the phone's other bookings differ in at least one
+        if (str(job.get("date") or "")[:16] == str(booking_data.get("date") or "")[:16]
+                and normalize_text(job.get("origin") or "") == normalize_text(booking_data.get("origin") or "")
+                and normalize_text(job.get("destination") or "") == normalize_text(booking_data.get("destination") or "")):
+            return job
+    return None
+
+async def handle_provisional_booking(request: BookingRequest, provisional: Dict[str, Any]):
+    """Answer an operation on a journaled booking that Cabee had not created when it was looked up"""
+    
+    ref = clean_reference(request.jobNO)
+    logger.info("Booking %s is %s in the write-behind journal", ref, provisional["status"], extra={"job_no": ref})
+    if provisional["status"] == "created":
+        # Cabee created the job while this change waited for it, so make the change there
+        request.jobNO = provisional["job_no"]
+        if request.operation == "cancelBooking":
+            return await handle_cancel_booking(request, get_jwt_token(), generate_call_id())
+        return await handle_update_booking(request, get_jwt_token(), generate_call_id())
+    if provisional["status"] in ("rejected", "failed"):
+        return {
+            "status": "error",
+            "booking_status": "failed",
+            "error": "This booking could not be confirmed, please book again",
+            "data": {"jobNO": ref}
+        }
+    if provisional["status"] == "cancelled":
+        if request.operation in ("getBooking", "cancelBooking"):
+            return {"status": "success", "booking_status": "cancelled", "error": None, "data": {"jobNO": ref}}
+        return {"status": "error", "booking_status": "cancelled", "error": "Booking has been cancelled", "data": None}
+    
+    if request.operation == "getBooking":
+        return {"status": "success", "booking_status": "found", "error": None, "data": provisional["reply"]["data"]}
+    if request.operation == "getDriverLocation":
+        return {
+            "status": "error",
+            "booking_status": "driver_not_found",
+            "error": "Driver location not available or not assigned yet",
+            "data": None
+        }
+    if not provisional["local"]:
+        # Journaled by another worker, which is the only one that may change it
+        return {
+            "status": "error",
+            "booking_status": "pending",
+            "error": "Booking is still being confirmed, please try again in a moment",
+            "data": None
+        }
+    if request.operation == "cancelBooking":
+        state = await booking_journal.cancel(ref)
+        return await handle_provisional_booking(request, dict(state, local=True))
+    
+    changes = {
+        "passengerName": request.passengerName,
+        "passengerPhone": request.Phone,
+        "passengerMobile": request.Phone,
+        "passengerEmail": request.passengerEmail,
+        "passengers": int(request.passengers) if request.passengers else None,
+        "date": request.date,
+        "origin": request.origin,
+        "destination": request.destination,
+        "note": request.note
+    }
+    state = await booking_journal.update(ref, {k: v for k, v in changes.items() if v is not None})
+    if state["status"] != "pending":
+        return await handle_provisional_booking(request, dict(state, local=True))
+    return {"status": "success", "booking_status": "updated", "error": None, "data": state["reply"]["data"]}
 
 async def handle_get_booking(request: BookingRequest, jwt_token: str, call_id: str):
     """Handle getting booking details with job number cleaning"""
     
-    print(f"📋 === GET BOOKING OPERATION ===")
-    
     # Clean job number by removing dashes (A2-62 → A262)
     clean_job_no = None
     if request.jobNO:
         clean_job_no = request.jobNO.replace("-", "")
         if clean_job_no != request.jobNO:
-            print(f"🔧 CLEANED JOB NUMBER: {request.jobNO} → {clean_job_no}")
+            logger.info("Cleaned job number: %s → %s", request.jobNO, clean_job_no)
         url = f"{CABEE_API_BASE}/Job/GetOnlineJobs?jobNO={clean_job_no}"
     elif request.Phone:
         url = f"{CABEE_API_BASE}/Job/GetOnlineJobs?phoneNumber={request.Phone}"
@@ -477,55 +978,139 @@ async def handle_get_booking(request: BookingRequest, jwt_token: str, call_id: s
             "data": None
         }
     
-    print(f"📤 GET BOOKING REQUEST: {url}")
+    lookup_key = ("job", clean_job_no) if clean_job_no else ("phone", normalize_phone(request.Phone))
+    cached = await booking_lookups.get(lookup_key)
+    if cached is not None:
+        logger.info("Booking lookup served from cache", extra={"job_no": clean_job_no})
+        return cached
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url,
-            headers={
-                "accept": "text/plain",
-                "Authorization": f"Bearer {jwt_token}"
-            },
-            timeout=30.0
-        )
-        
-        print(f"📡 Get Response Status: {response.status_code}")
-        
-        if response.status_code == 404:
-            return {
-                "status": "error",
-                "booking_status": "not_found",
-                "error": "Booking not found",
-                "data": None
-            }
-        
-        if not response.is_success:
-            error_text = response.text
-            print(f"❌ GET BOOKING ERROR: {error_text}")
-            
-            # Return user-friendly error instead of HTTP exception
-            return {
-                "status": "error",
-                "booking_status": "api_error",
-                "error": "Unable to retrieve booking at the moment",
-                "data": None
-            }
-        
-        result = response.json()
-        print(f"✅ GET BOOKING SUCCESS: {json.dumps(result, indent=2)}")
+    # Identical concurrent lookups share one upstream request
+    asked_at = time.time()
+    fetched_at, result = await booking_flights.do(("getBooking", url), lambda: fetch_booking_at(url, jwt_token))
+    if fetched_at < (await booking_invalidations.get(lookup_key) or 0.0) <= asked_at:
+        # Joined a lookup that started before an update or cancellation this caller came after
+        fetched_at, result = await fetch_booking_at(url, jwt_token)
+    if result.get("booking_status") == "found":
+        await remember_bookings(result, lookup_key, fetched_at)
+    return result
+
+def booked_jobs(result: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The job records in a getBooking result (Cabee returns a list, or a single job)"""
+    
+    data = (result or {}).get("data")
+    if isinstance(data, dict):
+        return [data]
+    return [job for job in data or [] if isinstance(job, dict)]
+
+async def remember_bookings(result: Dict[str, Any], lookup_key: Optional[tuple] = None,
+                            fetched_at: Optional[float] = None):
+    """
+    Cache a getBooking result under its lookup and each of its jobs under their
+    job number, skipping whatever was updated or cancelled since the fetch
+    started at fetched_at
+    """
+    
+    async def changed(key: tuple) -> bool:
+        return fetched_at is not None and (await booking_invalidations.get(key) or 0.0) >= fetched_at
+    
+    jobs = {str(job.get("jobNO") or "").replace("-", ""): job for job in booked_jobs(result)}
+    changed_jobs = {job_no for job_no in jobs if job_no and await changed(("job", job_no))}
+    if lookup_key is not None:
+        if changed_jobs or await changed(lookup_key):
+            logger.info("Not caching booking lookup %s: it changed while being fetched", lookup_key)
+        else:
+            await booking_lookups.set(lookup_key, result)
+    for job_no, job in jobs.items():
+        if job_no and job_no not in changed_jobs and lookup_key != ("job", job_no):
+            await booking_lookups.set(("job", job_no), dict(result, data=[job]))
+
+async def drop_booking_lookup(key: tuple):
+    """Forget a cached getBooking result, and that any lookup in flight may have read it stale"""
+    
+    await booking_invalidations.set(key, time.time())
+    await booking_lookups.delete(key)
+
+async def forget_booking(request: BookingRequest, reference: Optional[str] = None):
+    """Drop cached lookups and duplicate-booking records that an update or cancellation makes stale"""
+    
+    # The job may have been booked as a provisional reference and changed under its real number
+    for job_no in {clean_reference(job_no) for job_no in (request.jobNO, reference) if job_no}:
+        fingerprint = await created_bookings.get(("job", job_no))
+        if fingerprint is not None:
+            await created_bookings.delete(tuple(fingerprint))
+            await created_bookings.delete(("job", job_no))
+    if request.Phone and not request.jobNO:
+        # Cancelled by phone: any of that phone's bookings may be the one that went
+        phone_key = ("phone", normalize_phone(request.Phone))
+        for fingerprint in await created_bookings.get(phone_key) or []:
+            await created_bookings.delete(tuple(fingerprint))
+        await created_bookings.delete(phone_key)
+    
+    phones = {normalize_phone(request.Phone)} if request.Phone else set()
+    if request.jobNO:
+        job_key = ("job", request.jobNO.replace("-", ""))
+        phones.update(normalize_phone(job.get("passengerPhone")) for job in booked_jobs(await booking_lookups.get(job_key)))
+        await drop_booking_lookup(job_key)
+    for phone in phones - {""}:
+        # Cancelling by phone cancels one of that phone's jobs, so drop all of them
+        for job in booked_jobs(await booking_lookups.get(("phone", phone))):
+            await drop_booking_lookup(("job", str(job.get("jobNO") or "").replace("-", "")))
+        await drop_booking_lookup(("phone", phone))
+
+async def fetch_booking_at(url: str, jwt_token: str):
+    """fetch_booking, with the time it started"""
+    
+    fetched_at = time.time()
+    return fetched_at, await fetch_booking(url, jwt_token)
+
+async def fetch_booking(url: str, jwt_token: str):
+    """Fetch bookings from Cabee by job number or phone URL"""
+    
+    client = http_clients.get_client("cabee")
+    response = await client.get(
+        url,
+        headers={
+            "accept": "text/plain",
+            "Authorization": f"Bearer {jwt_token}"
+        },
+        extensions={"hedge": True}
+    )
+    
+    logger.info("Get booking responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    if response.status_code == 404:
+        return {
+            "status": "error",
+            "booking_status": "not_found",
+            "error": "Booking not found",
+            "data": None
+        }
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Get booking error: %s", error_text)
         
+        # Return user-friendly error instead of HTTP exception
         return {
-            "status": "success",
-            "booking_status": "found",
-            "error": None,
-            "data": result
+            "status": "error",
+            "booking_status": "api_error",
+            "error": "Unable to retrieve booking at the moment",
+            "data": None
         }
+    
+    result = response.json()
+    logger.debug("Get booking response: %s", lazy_json(result))
+    
+    return {
+        "status": "success",
+        "booking_status": "found",
+        "error": None,
+        "data": result
+    }
 
 async def handle_update_booking(request: BookingRequest, jwt_token: str, call_id: str):
     """Handle booking updates"""
     
-    print(f"✏️ === UPDATE BOOKING OPERATION ===")
-    
     update_data = {
         "id": request.jobNO,
         "companyId": 99,
@@ -542,56 +1127,56 @@ async def handle_update_booking(request: BookingRequest, jwt_token: str, call_id
     # Remove None values
     update_data = {k: v for k, v in update_data.items() if v is not None}
     
-    print(f"📤 UPDATE REQUEST: {json.dumps(update_data, indent=2)}")
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.put(
-            f"{CABEE_API_BASE}/Job/UpdateJob",
-            headers={
-                "accept": "text/plain",
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {jwt_token}"
-            },
-            json=update_data,
-            timeout=30.0
+    logger.debug("Update booking payload: %s", lazy_json(update_data))
+    
+    client = http_clients.get_client("cabee")
+    response = await client.put(
+        f"{CABEE_API_BASE}/Job/UpdateJob",
+        headers={
+            "accept": "text/plain",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {jwt_token}"
+        },
+        json=update_data
+    )
+    
+    logger.info("Update booking responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Update booking error: %s", error_text)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Update booking API error: {response.status_code} - {error_text}"
         )
-        
-        print(f"📡 Update Response Status: {response.status_code}")
-        
-        if not response.is_success:
-            error_text = response.text
-            print(f"❌ UPDATE ERROR: {error_text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Update booking API error: {response.status_code} - {error_text}"
-            )
-        
-        result = response.json()
-        print(f"✅ UPDATE SUCCESS: {json.dumps(result, indent=2)}")
-        
-        return {
-            "status": "success",
-            "booking_status": "updated",
-            "error": None,
-            "data": result
-        }
+    
+    result = response.json()
+    logger.debug("Update booking response: %s", lazy_json(result))
+    
+    if request.origin and request.jobNO:
+        # Driver ETAs are measured to the new pickup, or not at all if it was not validated
+        await pickup_locations.delete(request.jobNO.replace("-", ""))
+        await remember_pickup(request.jobNO, request.origin)
+    
+    return {
+        "status": "success",
+        "booking_status": "updated",
+        "error": None,
+        "data": result
+    }
 
 async def handle_cancel_booking(request: BookingRequest, jwt_token: str, call_id: str):
     """Handle booking cancellation with job number cleaning"""
     
-    print(f"❌ === CANCEL BOOKING OPERATION ===")
-    
     # Clean job number by removing dashes (A2-62 → A262)
     clean_job_no = None
     if request.jobNO:
         clean_job_no = request.jobNO.replace("-", "")
         if clean_job_no != request.jobNO:
-            print(f"� eCLEANED JOB NUMBER: {request.jobNO} → {clean_job_no}")
+            logger.info("Cleaned job number: %s → %s", request.jobNO, clean_job_no)
         url = f"{CABEE_API_BASE}/Job/CancelJob?jobNo={clean_job_no}&companyId=99"
-        print(f"🔍 Cancelling by job number: {clean_job_no}")
     elif request.Phone:
         url = f"{CABEE_API_BASE}/Job/CancelJob?mobile={request.Phone}&companyId=99"
-        print(f"🔍 Cancelling by phone: {request.Phone}")
     else:
         return {
             "status": "error",
@@ -600,63 +1185,60 @@ async def handle_cancel_booking(request: BookingRequest, jwt_token: str, call_id
             "data": None
         }
     
-    print(f"📤 CANCEL REQUEST URL: {url}")
+    logger.info("Cancelling booking by %s", "job number" if clean_job_no else "phone", extra={"job_no": clean_job_no})
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            url,
-            headers={
-                "accept": "text/plain",
-                "Authorization": f"Bearer {jwt_token}"
-            },
-            content="",
-            timeout=30.0
-        )
-        
-        print(f"📡 Cancel Response Status: {response.status_code}")
-        
-        if not response.is_success:
-            error_text = response.text
-            print(f"❌ CANCEL ERROR: {error_text}")
-            
-            # Return user-friendly error instead of HTTP exception
-            return {
-                "status": "error",
-                "booking_status": "api_error",
-                "error": "Unable to cancel booking at the moment",
-                "data": None
-            }
-        
-        cancel_result = response.text
-        print(f"✅ CANCEL RESPONSE TEXT: {cancel_result}")
-        
-        # Determine if cancellation was successful
-        if any(phrase in cancel_result.lower() for phrase in ["not found", "notfound", "error"]):
-            booking_status = "not_found"
-            status = "error"
-            error = "Booking not found"
-        else:
-            booking_status = "cancelled"
-            status = "success"
-            error = None
-        
-        print(f"🎯 FINAL STATUS: {status}, BOOKING_STATUS: {booking_status}")
+    client = http_clients.get_client("cabee")
+    response = await client.post(
+        url,
+        headers={
+            "accept": "text/plain",
+            "Authorization": f"Bearer {jwt_token}"
+        },
+        content=""
+    )
+    
+    logger.info("Cancel booking responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Cancel booking error: %s", error_text)
         
+        # Return user-friendly error instead of HTTP exception
         return {
-            "status": status,
-            "booking_status": booking_status,
-            "error": error,
-            "data": {
-                "jobNO": clean_job_no or request.jobNO,
-                "result": cancel_result
-            }
+            "status": "error",
+            "booking_status": "api_error",
+            "error": "Unable to cancel booking at the moment",
+            "data": None
+        }
+    
+    cancel_result = response.text
+    logger.debug("Cancel response text: %s", cancel_result)
+    
+    # Determine if cancellation was successful
+    if any(phrase in cancel_result.lower() for phrase in ["not found", "notfound", "error"]):
+        booking_status = "not_found"
+        status = "error"
+        error = "Booking not found"
+    else:
+        booking_status = "cancelled"
+        status = "success"
+        error = None
+    
+    logger.info("Cancel booking result: %s", booking_status, extra={"booking_status": booking_status})
+    
+    return {
+        "status": status,
+        "booking_status": booking_status,
+        "error": error,
+        "data": {
+            "jobNO": clean_job_no or request.jobNO,
+            "result": cancel_result
         }
+    }
 
 async def handle_get_driver_location(request: BookingRequest, jwt_token: str, call_id: str):
     """Handle getting driver location with job number cleaning"""
     
-    print(f"📍 === GET DRIVER LOCATION OPERATION ===")
-    
     if not request.jobNO:
         return {
             "status": "error",
@@ -668,51 +1250,134 @@ async def handle_get_driver_location(request: BookingRequest, jwt_token: str, ca
     # Clean job number by removing dashes (A2-62 → A262)
     clean_job_no = request.jobNO.replace("-", "")
     if clean_job_no != request.jobNO:
-        print(f"🔧 CLEANED JOB NUMBER: {request.jobNO} → {clean_job_no}")
-    
-    print(f"📤 LOCATION REQUEST: Job {clean_job_no}")
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{CABEE_API_BASE}/Job/GetDriverCurrentLocationForJob/{clean_job_no}",
-            headers={
-                "accept": "text/plain",
-                "Authorization": f"Bearer {jwt_token}"
-            },
-            timeout=30.0
+        logger.info("Cleaned job number: %s → %s", request.jobNO, clean_job_no)
+    
+    result = await driver_locations.get(clean_job_no) if DRIVER_LOCATION_CACHE_TTL > 0 else None
+    if result is None:
+        # Identical concurrent lookups share one upstream request
+        result = await booking_flights.do(
+            ("getDriverLocation", clean_job_no),
+            lambda: fetch_driver_location(clean_job_no, jwt_token)
         )
+    return await with_eta(clean_job_no, result)
+
+async def with_eta(clean_job_no: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the driver's distance from the pickup and a rough ETA, when both positions are known"""
+    
+    if result.get("booking_status") != "driver_located":
+        return result
+    driver = coordinates(result["data"].get("location"))
+    pickup = await pickup_locations.get(clean_job_no)
+    if driver is None or pickup is None:
+        return result
+    distance_km = haversine_km(*driver, *pickup["point"])
+    return dict(result, data=dict(
+        result["data"],
+        pickup=pickup["address"],
+        distanceKm=round(distance_km, 1),
+        etaMinutes=eta_minutes(distance_km)
+    ))
+
+@router.get("/driverLocation/{job_no}/stream")
+async def stream_driver_location(job_no: str, phone: str = ""):
+    """
+    Server-Sent Events feed of a job's driver location, from one shared poller
+    per job. Only for whoever knows the booking's phone number as well as its
+    job number; ends with an "end" event after LOCATION_STREAM_MAX_SECONDS.
+    """
+    
+    jwt_token = get_jwt_token()
+    if location_feed.full:
+        raise HTTPException(status_code=503, detail="System temporarily unavailable", headers={"Retry-After": "30"})
+    
+    clean_job_no = job_no.replace("-", "")
+    provisional = await booking_journal.lookup(clean_job_no)
+    if provisional is not None and provisional["status"] == "created":
+        clean_job_no = provisional["job_no"]
+    # The same answer for an unknown job and a wrong phone, so neither can be probed
+    if not normalize_phone(phone) or normalize_phone(phone) not in await booking_phones(clean_job_no, provisional, jwt_token):
+        raise HTTPException(status_code=404, detail="No booking with that job number and phone number")
+    
+    async def fetch(job: str):
+        # Shares the upstream request with concurrent getDriverLocation tool calls
+        result = await booking_flights.do(("getDriverLocation", job), lambda: fetch_driver_location(job, jwt_token))
+        return await with_eta(job, result)
+    
+    async def events():
+        yield "retry: 5000\n\n"
+        async for update in location_feed.stream(clean_job_no, fetch):
+            if update is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: location\ndata: {json.dumps(update, separators=(',', ':'))}\n\n"
+        # Out of time: the page must not reconnect on its own
+        yield "event: end\ndata: {}\n\n"
+    
+    logger.info("Driver location stream opened", extra={"job_no": clean_job_no})
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def booking_phones(clean_job_no: str, provisional: Optional[Dict[str, Any]], jwt_token: str) -> Set[str]:
+    """Normalized phone numbers a job was booked under (none if there is no such job)"""
+    
+    if provisional is not None and provisional["status"] != "created":
+        return {normalize_phone(provisional["reply"]["data"].get("phoneNumber"))} - {""}
+    lookup = await handle_get_booking(BookingRequest(operation="getBooking", jobNO=clean_job_no), jwt_token, "")
+    if lookup.get("booking_status") != "found":
+        return set()
+    return {normalize_phone(job.get("passengerPhone") or job.get("phoneNumber")) for job in booked_jobs(lookup)} - {""}
+
+async def fetch_driver_location(clean_job_no: str, jwt_token: str):
+    """Fetch the assigned driver's current location for a job from Cabee"""
+    
+    client = http_clients.get_client("cabee")
+    response = await client.get(
+        f"{CABEE_API_BASE}/Job/GetDriverCurrentLocationForJob/{clean_job_no}",
+        headers={
+            "accept": "text/plain",
+            "Authorization": f"Bearer {jwt_token}"
+        },
+        extensions={"hedge": True}
+    )
+    
+    logger.info("Driver location responded %s", response.status_code, extra={"status_code": response.status_code})
+    
+    if response.status_code == 404:
+        location = {
+            "status": "error",
+            "booking_status": "driver_not_found",
+            "error": "Driver location not available or not assigned yet",
+            "data": None
+        }
+        await driver_locations.set(clean_job_no, location)
+        return location
+    
+    if not response.is_success:
+        error_text = response.text
+        logger.warning("Driver location error: %s", error_text)
         
-        print(f"📡 Location Response Status: {response.status_code}")
-        
-        if response.status_code == 404:
-            return {
-                "status": "error",
-                "booking_status": "driver_not_found",
-                "error": "Driver location not available or not assigned yet",
-                "data": None
-            }
-        
-        if not response.is_success:
-            error_text = response.text
-            print(f"❌ LOCATION ERROR: {error_text}")
-            
-            # Return user-friendly error instead of HTTP exception
-            return {
-                "status": "error",
-                "booking_status": "api_error",
-                "error": "Unable to get driver location at the moment",
-                "data": None
-            }
-        
-        result = response.json()
-        print(f"✅ LOCATION SUCCESS: {json.dumps(result, indent=2)}")
-        
+        # Return user-friendly error instead of HTTP exception
         return {
-            "status": "success",
-            "booking_status": "driver_located",
-            "error": None,
-            "data": {
-                "jobNO": clean_job_no,
-                "location": result
-            }
-        }
\ No newline at end of file
+            "status": "error",
+            "booking_status": "api_error",
+            "error": "Unable to get driver location at the moment",
+            "data": None
+        }
+    
+    result = response.json()
+    logger.debug("Driver location response: %s", lazy_json(result))
+    
+    location = {
+        "status": "success",
+        "booking_status": "driver_located",
+        "error": None,
+        "data": {
+            "jobNO": clean_job_no,
+            "location": result
+        }
+    }
+    await driver_locations.set(clean_job_no, location)
+    return location
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, HTTPException
+from config.agent_store import agent_store
+from config.logging_config import logging_stats
+from services import admission, http_clients
+from services.booking_journal import booking_journal
+from services.call_pool import warm_pool
+from services.capture import capture_stats
+from services.draining import drain
+from services.location_feed import location_feed
+from services.cache import cache_stats
+from services.pending_quotes import pending_quotes
+from services.singleflight import flight_stats
+from services.tracing import tracer
+
+router = APIRouter()
+
+@router.get("/pools")
+async def get_pool_stats():
+    """Open/idle upstream connections per host, for sizing the client pools"""
+    return http_clients.pool_stats()
+
+@router.get("/caches")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process caches"""
+    return cache_stats()
+
+@router.get("/quotes")
+async def get_pending_quote_stats():
+    """Pricing requests waiting for an asynchronous Make.com callback"""
+    return pending_quotes.stats()
+
+@router.get("/flights")
+async def get_flight_stats():
+    """How many identical concurrent upstream lookups were coalesced"""
+    return flight_stats()
+
+@router.get("/upstreams")
+async def get_upstream_stats():
+    """Circuit breaker state, latency percentiles and current timeout per upstream"""
+    return http_clients.upstream_stats()
+
+@router.get("/admission")
+async def get_admission_stats():
+    """Slots in use, queued and shed requests per route and upstream limiter"""
+    return admission.stats()
+
+@router.get("/agent-config")
+async def get_agent_config_stats():
+    """Active agent config version, available versions and reload errors"""
+    return agent_store.stats()
+
+@router.get("/warm-calls")
+async def get_warm_call_stats():
+    """Pre-created Ultravox calls ready to hand out and how many were created"""
+    return warm_pool.stats()
+
+@router.get("/drain")
+async def get_drain_stats():
+    """Booking writes in flight in this worker, and whether it is shutting down"""
+    return drain.stats()
+
+@router.get("/booking-journal")
+async def get_booking_journal_stats():
+    """Write-behind bookings waiting for Cabee: queue depth, lag and retry state"""
+    return booking_journal.stats()
+
+@router.get("/location-streams")
+async def get_location_stream_stats():
+    """Open driver-location streams and each job's shared poller"""
+    return location_feed.stats()
+
+@router.get("/logging")
+async def get_logging_stats():
+    """Log queue depth and records dropped because the writer fell behind"""
+    return logging_stats()
+
+@router.get("/capture")
+async def get_capture_stats():
+    """Traffic capture file and how many records were written or dropped"""
+    return capture_stats()
+
+@router.get("/traces")
+async def get_recent_traces(limit: int = 50):
+    """Most recently active conversations and the tools they called"""
+    return {"stats": tracer.stats(), "conversations": tracer.recent(limit)}
+
+@router.get("/traces/{conversation_id}")
+async def get_conversation_trace(conversation_id: str):
+    """Timeline of one conversation's tool calls: start, duration, upstream wait and outcome"""
+    timeline = tracer.timeline(conversation_id)
+    if timeline is None:
+        raise HTTPException(status_code=404, detail="No trace for this conversation")
+    return timeline
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import httpx
+import logging
 import os
 from datetime import datetime
 from dotenv import load_dotenv
-from config.agent_config import ULTRAVOX_WEB_CALL_CONFIG
+from services import admission, call_payload, http_clients, metrics
+from services.call_pool import warm_pool
+from services.tracing import bind_conversation
 
 # Ensure environment variables are loaded
 load_dotenv()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+ULTRAVOX_API_BASE = os.getenv("ULTRAVOX_API_BASE", "https://api.ultravox.ai/api")
 
 # Pydantic models
 class CallConfig(BaseModel):
@@ -31,100 +37,112 @@ class UltravoxCallResponse(BaseModel):
     systemPrompt: str
     temperature: float
     joinUrl: str
+    agentConfigVersion: Optional[str] = None
 
 @router.post("/ultravox", response_model=UltravoxCallResponse)
 async def create_ultravox_call(call_config: CallConfig):
     """Create a new Ultravox call with web-specific configuration"""
     
-    ultravox_api_key = os.getenv("ULTRAVOX_API_KEY")
-    print(f"🔑 API Key loaded: {ultravox_api_key[:10] if ultravox_api_key else 'None'}...")
+    return await metrics.instrument("/api/ultravox", None, admission.admit(
+        "ultravox", admission.NORMAL, lambda: handle_create_ultravox_call(call_config), call_overloaded
+    ))
+
+def call_overloaded():
+    raise HTTPException(status_code=503, detail="System temporarily unavailable", headers={"Retry-After": "5"})
+
+async def handle_create_ultravox_call(call_config: CallConfig):
+    """Create the call via the Ultravox API, or hand out a pre-created one"""
     
-    if not ultravox_api_key:
-        raise HTTPException(status_code=500, detail="ULTRAVOX_API_KEY not configured")
+    # The web-specific configuration, pre-encoded, with any provided overrides spliced in
+    payload = call_payload.current()
+    overrides = {
+        "model": call_config.model,
+        "voice": call_config.voice,
+        "temperature": call_config.temperature,
+        "maxDuration": call_config.maxDuration,
+        "timeExceededMessage": call_config.timeExceededMessage,
+    }
+    settings = payload.settings(overrides)
+    
+    # The browser echoes the defaults from /api/config, so only real overrides miss the pool
+    result = None
+    if settings == payload.defaults:
+        result = warm_pool.take(payload)
+    else:
+        warm_pool.bypass()
+    
+    if result is None:
+        # Log the configuration being sent
+        logger.info(
+            "Creating Ultravox call (config %s, model %s, voice %s, temperature %s, %d tools)",
+            payload.version, settings.get('model'), settings.get('voice'), settings.get('temperature'),
+            payload.tool_count
+        )
+        result = await post_call(payload.body(overrides))
     
-    # Use the web-specific configuration
-    config_data = ULTRAVOX_WEB_CALL_CONFIG.copy()
+    # The tool requests of this conversation will arrive with this call ID
+    bind_conversation(result.get("callId"))
+    logger.info("Ultravox call created: %s", result.get('callId'),
+                extra={"ultravox_call_id": result.get('callId'), "agent_config_version": payload.version})
     
-    # Override with any provided config
-    if call_config.model:
-        config_data["model"] = call_config.model
-    if call_config.voice:
-        config_data["voice"] = call_config.voice
-    if call_config.temperature is not None:
-        config_data["temperature"] = call_config.temperature
-    if call_config.maxDuration:
-        config_data["maxDuration"] = call_config.maxDuration
-    if call_config.timeExceededMessage:
-        config_data["timeExceededMessage"] = call_config.timeExceededMessage
+    return UltravoxCallResponse(
+        callId=result["callId"],
+        created=datetime.fromisoformat(result["created"].replace("Z", "+00:00")),
+        ended=datetime.fromisoformat(result["ended"].replace("Z", "+00:00")) if result.get("ended") else None,
+        model=result["model"],
+        systemPrompt=result["systemPrompt"],
+        temperature=result["temperature"],
+        joinUrl=result["joinUrl"],
+        agentConfigVersion=payload.version
+    )
+
+async def post_call(body: bytes) -> Dict[str, Any]:
+    """POST a pre-encoded call body to Ultravox and return the created call"""
     
-    # Log the configuration being sent
-    print(f"🤖 Creating Ultravox call with config:")
-    print(f"   Model: {config_data.get('model')}")
-    print(f"   Voice: {config_data.get('voice')}")
-    print(f"   Temperature: {config_data.get('temperature')}")
-    print(f"   Tools count: {len(config_data.get('selectedTools', []))}")
+    ultravox_api_key = os.getenv("ULTRAVOX_API_KEY")
+    if not ultravox_api_key:
+        logger.error("ULTRAVOX_API_KEY not configured")
+        raise HTTPException(status_code=500, detail="ULTRAVOX_API_KEY not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.ultravox.ai/api/calls",
-                headers={
-                    "X-API-Key": ultravox_api_key,
-                    "Content-Type": "application/json"
-                },
-                json=config_data,
-                timeout=30.0
-            )
-            
-            print(f"📡 Ultravox API Response Status: {response.status_code}")
-            
-            if response.status_code not in [200, 201]:
-                error_text = response.text
-                print(f"❌ Ultravox API Error: {response.status_code}")
-                print(f"❌ Error Response: {error_text}")
-                
-                error_detail = f"Ultravox API error: {response.status_code}"
-                try:
-                    error_data = response.json()
-                    error_detail += f" - {error_data}"
-                except:
-                    error_detail += f" - {error_text}"
-                raise HTTPException(status_code=response.status_code, detail=error_detail)
-            
-            result = response.json()
-            print(f"✅ Ultravox call created successfully: {result.get('callId')}")
-            
-            return UltravoxCallResponse(
-                callId=result["callId"],
-                created=datetime.fromisoformat(result["created"].replace("Z", "+00:00")),
-                ended=datetime.fromisoformat(result["ended"].replace("Z", "+00:00")) if result.get("ended") else None,
-                model=result["model"],
-                systemPrompt=result["systemPrompt"],
-                temperature=result["temperature"],
-                joinUrl=result["joinUrl"]
-            )
+        client = http_clients.get_client("ultravox")
+        response = await client.post(
+            f"{ULTRAVOX_API_BASE}/calls",
+            headers={
+                "X-API-Key": ultravox_api_key,
+                "Content-Type": "application/json"
+            },
+            content=body
+        )
+        
+        logger.info("Ultravox API responded %s", response.status_code, extra={"status_code": response.status_code})
+        
+        if response.status_code not in [200, 201]:
+            error_text = response.text
+            logger.warning("Ultravox API error: %s - %s", response.status_code, error_text)
             
+            error_detail = f"Ultravox API error: {response.status_code}"
+            try:
+                error_data = response.json()
+                error_detail += f" - {error_data}"
+            except:
+                error_detail += f" - {error_text}"
+            raise HTTPException(status_code=response.status_code, detail=error_detail)
+        
+        return response.json()
+        
     except httpx.RequestError as e:
-        print(f"❌ HTTP Request Error: {str(e)}")
+        logger.warning("Ultravox request error: %s", e)
         raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
     except Exception as e:
-        print(f"❌ Unexpected Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error creating Ultravox call")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 @router.get("/config")
-async def get_web_config():
-    """Get the web-specific agent configuration"""
-    return {
-        "title": "Cromwell Cars Web Dispatcher",
-        "overview": "Independent web interface for Cromwell Cars AI Dispatcher. This service has its own agent configuration separate from the Twilio phone service.",
-        "callConfig": {
-            "systemPrompt": ULTRAVOX_WEB_CALL_CONFIG["systemPrompt"],
-            "model": ULTRAVOX_WEB_CALL_CONFIG["model"],
-            "languageHint": "en",
-            "selectedTools": ULTRAVOX_WEB_CALL_CONFIG["selectedTools"],
-            "voice": ULTRAVOX_WEB_CALL_CONFIG["voice"],
-            "temperature": ULTRAVOX_WEB_CALL_CONFIG["temperature"]
-        }
-    }
\ No newline at end of file
+async def get_web_config(if_none_match: Optional[str] = Header(None)):
+    """Get the web-specific agent configuration (conditional GET via ETag)"""
+    payload = call_payload.current()
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache"}
+    if payload.not_modified(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.config_body, media_type="application/json", headers=headers)
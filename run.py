@@ -2,44 +2,121 @@
 """
 Cromwell Cars Web Dispatcher - Python Service
 Independent web interface for Cromwell Cars AI Dispatcher
+
+Production entry point: WORKERS uvicorn worker processes (each with its own
+upstream pools, caches, metrics and traces), uvloop and httptools when they
+are installed, and a graceful shutdown that finishes in-flight booking writes.
+Set RELOAD=true for auto-reload during development (single process only).
 """
 
 import os
+import subprocess
 import sys
+import time
 import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+WORKERS = int(os.getenv("WORKERS", 1))
+RELOAD = os.getenv("RELOAD", "false").lower() == "true"
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+# Seconds uvicorn waits for open requests on shutdown before cancelling them
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", 30))
+ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() == "true"
+# Run the shared cache daemon (services/shared_cache.py) alongside the workers
+CACHE_SERVER = os.getenv("CACHE_SERVER", "false").lower() == "true"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+
+try:
+    import uvloop  # noqa: F401  (only needed for the uvloop event loop)
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    import httptools  # noqa: F401  (only needed for the httptools HTTP parser)
+    HTTPTOOLS_AVAILABLE = True
+except ImportError:
+    HTTPTOOLS_AVAILABLE = False
+
+
+def select_loop() -> str:
+    if SERVER_LOOP != "auto":
+        return SERVER_LOOP
+    return "uvloop" if UVLOOP_AVAILABLE and sys.platform != "win32" else "asyncio"
+
+
+def select_http() -> str:
+    if SERVER_HTTP != "auto":
+        return SERVER_HTTP
+    return "httptools" if HTTPTOOLS_AVAILABLE else "h11"
+
+
+def start_cache_server() -> subprocess.Popen:
+    """Start the cache daemon and wait until its socket accepts connections"""
+    cache_url = os.getenv("CACHE_URL", "unix:///tmp/cromwell-cache.sock")
+    socket_path = cache_url[len("unix://"):] if cache_url.startswith("unix://") else None
+    if socket_path and os.path.exists(socket_path):
+        os.unlink(socket_path)
+    process = subprocess.Popen([sys.executable, "-m", "services.shared_cache", "serve"])
+    deadline = time.monotonic() + 10
+    while socket_path and not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("cache daemon did not start")
+        time.sleep(0.05)
+    return process
+
+
 def main():
     """Main entry point"""
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
-    
+    workers = 1 if RELOAD else max(1, WORKERS)
+    loop, http = select_loop(), select_http()
+    if workers > 1 and CACHE_BACKEND != "shared":
+        # A Make.com pricing callback must reach the worker waiting for it
+        print("❌ WORKERS > 1 needs CACHE_BACKEND=shared (with CACHE_SERVER=true or a CACHE_URL) "
+              "so pricing callbacks reach the worker waiting for them")
+        sys.exit(1)
+
     print("🚖 ===== CROMWELL CARS WEB DISPATCHER =====")
     print(f"🐍 Python FastAPI Service")
     print(f"🌐 Independent from Twilio Service")
     print(f"🤖 Same Agent Prompt & Tools")
+    print(f"⚙️  {workers} worker(s), {loop} loop, {http} parser{', auto-reload' if RELOAD else ''}")
     print(f"📱 Web Interface: http://{host}:{port}")
     print(f"🔧 API Documentation: http://{host}:{port}/docs")
     print(f"❤️  Health Check: http://{host}:{port}/health")
     print("=" * 45)
-    
+
+    cache_server = None
     try:
+        if CACHE_SERVER:
+            cache_server = start_cache_server()
         uvicorn.run(
             "main:app",
             host=host,
             port=port,
-            reload=True,
+            workers=workers,
+            reload=RELOAD,
+            loop=loop,
+            http=http,
+            timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
             log_level="info",
-            access_log=True
+            access_log=ACCESS_LOG
         )
     except KeyboardInterrupt:
         print("\n👋 Shutting down Cromwell Cars Web Dispatcher...")
     except Exception as e:
         print(f"❌ Error starting server: {e}")
         sys.exit(1)
+    finally:
+        if cache_server is not None:
+            cache_server.terminate()
+            cache_server.wait(timeout=10)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
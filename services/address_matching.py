@@ -0,0 +1,247 @@
+"""
+Speech-to-text tolerant address matching.
+
+Voice transcriptions turn "HA1 2TH" into things like "ha one two tee aitch" or
+"HA1 tooth". This module turns spoken postcodes back into canonical form and
+ranks misheard landmark and street names against the gazetteer with a trigram
+index plus edit-distance re-ranking, so most addresses resolve on the first
+tool call.
+"""
+
+import itertools
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.addresses import flatten_address_lines, normalize_postcode, normalize_text
+from services.gazetteer import LANDMARK, STREET, Gazetteer, in_outward_code, landmark_queries
+
+logger = logging.getLogger(__name__)
+
+FUZZY_THRESHOLD = float(os.getenv("ADDRESS_FUZZY_THRESHOLD", 0.82))
+# Street names are corrected in place and forwarded upstream, so be stricter
+STREET_THRESHOLD = float(os.getenv("ADDRESS_STREET_THRESHOLD", 0.9))
+
+FULL_POSTCODE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$")
+OUTWARD_CODE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?$")
+
+# Spoken forms of postcode characters; ambiguous words list every reading
+SPOKEN_CHARACTERS: Dict[str, Tuple[str, ...]] = {
+    "zero": ("0",), "nought": ("0",), "nil": ("0",), "oh": ("0", "O"), "o": ("O", "0"),
+    "one": ("1",), "won": ("1",), "two": ("2",), "to": ("2",), "too": ("2",),
+    "three": ("3",), "free": ("3",), "four": ("4",), "for": ("4",), "fore": ("4",),
+    "five": ("5",), "six": ("6",), "seven": ("7",), "eight": ("8",), "ate": ("8",),
+    "nine": ("9",), "ten": ("10",), "eleven": ("11",), "twelve": ("12",),
+    "thirteen": ("13",), "fourteen": ("14",), "fifteen": ("15",), "sixteen": ("16",),
+    "seventeen": ("17",), "eighteen": ("18",), "nineteen": ("19",), "twenty": ("20",),
+    "ay": ("A",), "eh": ("A",), "bee": ("B",), "be": ("B",), "see": ("C",), "sea": ("C",),
+    "cee": ("C",), "dee": ("D",), "ee": ("E",), "ef": ("F",), "eff": ("F",), "gee": ("G",),
+    "aitch": ("H",), "haitch": ("H",), "eye": ("I",), "jay": ("J",), "kay": ("K",),
+    "el": ("L",), "ell": ("L",), "em": ("M",), "en": ("N",), "pee": ("P",), "pea": ("P",),
+    "queue": ("Q",), "cue": ("Q",), "are": ("R",), "ar": ("R",), "es": ("S",), "ess": ("S",),
+    "tee": ("T",), "tea": ("T",), "you": ("U",), "yew": ("U",), "vee": ("V",),
+    "ex": ("X",), "why": ("Y",), "wye": ("Y",), "zed": ("Z",), "zee": ("Z",),
+    # Whole-group mishearings of common inward codes
+    "tooth": ("2TH",),
+}
+
+MULTIPLIERS = {"double": 2, "triple": 3, "treble": 3}
+MAX_READINGS = 512
+
+
+def _spoken_tokens(text: str) -> Optional[List[Tuple[str, ...]]]:
+    """Map each spoken word to its possible postcode characters"""
+    words = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    tokens: List[Tuple[str, ...]] = []
+    index = 0
+    while index < len(words):
+        word = words[index]
+        following = words[index + 1] if index + 1 < len(words) else None
+        if word == "double" and following in ("u", "you"):
+            tokens.append(("W",))
+            index += 2
+            continue
+        if word in MULTIPLIERS and following is not None:
+            readings = SPOKEN_CHARACTERS.get(following) or (following.upper(),)
+            tokens.append(tuple(r * MULTIPLIERS[word] for r in readings))
+            index += 2
+            continue
+        if word in SPOKEN_CHARACTERS:
+            tokens.append(SPOKEN_CHARACTERS[word])
+        elif word.isalnum() and len(word) <= 4:
+            tokens.append((word.upper(),))
+        else:
+            return None
+        index += 1
+    return tokens
+
+
+def normalize_spoken_postcode(text: Optional[str]) -> Optional[str]:
+    """
+    Canonical postcode ("HA1 2TH") from a typed or spoken form, or None if no
+    reading of the words forms a valid full postcode or outward code.
+    """
+    if not text:
+        return None
+    direct = normalize_postcode(text)
+    if FULL_POSTCODE.match(direct):
+        return f"{direct[:-3]} {direct[-3:]}"
+    tokens = _spoken_tokens(text)
+    if not tokens:
+        return None
+    for readings in itertools.islice(itertools.product(*tokens), MAX_READINGS):
+        code = "".join(readings)
+        if FULL_POSTCODE.match(code):
+            return f"{code[:-3]} {code[-3:]}"
+    for readings in itertools.islice(itertools.product(*tokens), MAX_READINGS):
+        code = "".join(readings)
+        if OUTWARD_CODE.match(code):
+            return code
+    return None
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance using the bit-parallel (Myers/Hyyrö) algorithm"""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    # Bit vectors are indexed by position in the shorter string
+    match_masks: Dict[str, int] = {}
+    for position, char in enumerate(b):
+        match_masks[char] = match_masks.get(char, 0) | (1 << position)
+    mask = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+    positive, negative, distance = mask, 0, len(b)
+    for char in a:
+        match = match_masks.get(char, 0)
+        vertical = match | negative
+        horizontal = ((((match & positive) + positive) & mask) ^ positive) | match
+        horizontal_positive = (negative | ~(horizontal | positive)) & mask
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = ((horizontal_positive << 1) | 1) & mask
+        horizontal_negative = (horizontal_negative << 1) & mask
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & mask
+        negative = horizontal_positive & vertical
+    return distance
+
+
+def similarity(a: str, b: str, minimum: float = 0.0) -> float:
+    """1.0 for identical strings, falling with edit distance (0.0 below minimum)"""
+    if a == b:
+        return 1.0
+    longest = max(len(a), len(b))
+    # The length difference alone is a lower bound on the distance
+    if 1.0 - abs(len(a) - len(b)) / longest < minimum:
+        return 0.0
+    score = 1.0 - levenshtein(a, b) / longest
+    return score if score >= minimum else 0.0
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text.replace(' ', '')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Trigram index over names, re-ranked by edit distance"""
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self._compact = [name.replace(" ", "") for name in names]
+        self._sizes = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for name_id, name in enumerate(names):
+            grams = _trigrams(name)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(name_id)
+
+    def search(self, query: str, limit: int = 3, shortlist: int = 4,
+               minimum: float = 0.0) -> List[Tuple[str, float]]:
+        """Best matching names for a normalized query, with scores in [minimum, 1]"""
+        grams = _trigrams(query)
+        if not grams:
+            return []
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for name_id in self._postings.get(gram, ()):
+                overlap[name_id] += 1
+        dice = sorted(
+            overlap.items(),
+            key=lambda item: 2 * item[1] / (len(grams) + self._sizes[item[0]]),
+            reverse=True,
+        )[:shortlist]
+        compact_query = query.replace(" ", "")
+        ranked = []
+        for name_id, _ in dice:
+            score = similarity(compact_query, self._compact[name_id], minimum)
+            if score >= minimum and score > 0.0:
+                ranked.append((self.names[name_id], score))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+
+class AddressMatcher:
+    """Fuzzy landmark and street matching backed by the gazetteer"""
+
+    def __init__(self, gazetteer: Gazetteer, threshold: float = FUZZY_THRESHOLD,
+                 street_threshold: float = STREET_THRESHOLD):
+        self.gazetteer = gazetteer
+        self.threshold = threshold
+        self.street_threshold = street_threshold
+        self.landmarks = FuzzyIndex([key[len(LANDMARK):] for key in gazetteer.keys(LANDMARK)])
+        self.streets = FuzzyIndex([key[len(STREET):] for key in gazetteer.keys(STREET)])
+
+    def match_landmark(self, address_lines: Any, postcode: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Gazetteer candidates for a misheard landmark name that is the whole
+        address (see gazetteer.landmark_queries), if one matches well enough
+        """
+        code = normalize_postcode(postcode)
+        lines = [normalize_text(line) for line in flatten_address_lines(address_lines)]
+        lines = [line for line in lines if line and normalize_postcode(line) != code]
+        for query in landmark_queries(lines):
+            for name, score in self.landmarks.search(query, limit=1, minimum=self.threshold):
+                candidates = self.gazetteer.lookup(LANDMARK + name) or []
+                if code:
+                    candidates = [c for c in candidates if in_outward_code(c, code)]
+                if candidates:
+                    return [dict(c, match_score=round(score, 3)) for c in candidates]
+        return None
+
+    def correct_street(self, line: str) -> str:
+        """Replace a misheard street name with its canonical spelling, keeping the house number"""
+        match = re.match(r"^\s*(\d+[a-zA-Z]?\s+|flat \d+\s+)?(.*)$", str(line), re.IGNORECASE)
+        number, street = (match.group(1) or ""), match.group(2)
+        normalized = normalize_text(street)
+        if not normalized:
+            return line
+        for name, score in self.streets.search(normalized, limit=1, minimum=self.street_threshold):
+            if name != normalized:
+                return f"{number}{name.title()}"
+        return line
+
+
+_matcher: Optional[AddressMatcher] = None
+
+
+def load_matcher(gazetteer: Optional[Gazetteer]) -> Optional[AddressMatcher]:
+    """Build the fuzzy indexes over the loaded gazetteer"""
+    global _matcher
+    _matcher = AddressMatcher(gazetteer) if gazetteer is not None else None
+    if _matcher is not None:
+        logger.info("Address matcher ready: %d landmarks, %d streets",
+                    len(_matcher.landmarks.names), len(_matcher.streets.names))
+    return _matcher
+
+
+def get_matcher() -> Optional[AddressMatcher]:
+    """Return the loaded address matcher, if any"""
+    return _matcher
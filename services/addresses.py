@@ -0,0 +1,77 @@
+"""
+Address and phone normalization helpers shared by the tools.
+"""
+
+import re
+from typing import Any, List, Optional, Tuple
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGITS = re.compile(r"\D")
+_FULL_POSTCODE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$")
+_POSTCODE_IN_TEXT = re.compile(r"\b([A-Z]{1,2}[0-9][A-Z0-9]?) ?([0-9][A-Z]{2})\b")
+
+
+def flatten_address_lines(address_lines: Any) -> List[str]:
+    """Flatten nested address line lists into a flat list of strings"""
+    if not isinstance(address_lines, list):
+        return [str(address_lines)]
+    flattened = []
+    for line in address_lines:
+        if isinstance(line, list):
+            flattened.extend(flatten_address_lines(line))
+        elif line is not None:
+            flattened.append(str(line))
+    return flattened
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace"""
+    text = _APOSTROPHES.sub("", str(text).casefold())
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalize_postcode(postcode: Optional[str]) -> str:
+    """Canonical postcode without spaces, upper-cased (e.g. 'ha1 2th' -> 'HA12TH')"""
+    if not postcode:
+        return ""
+    return re.sub(r"[^A-Z0-9]", "", str(postcode).upper())
+
+
+def outward_code(postcode: Optional[str]) -> str:
+    """Outward code of a full postcode or an outward code ('sw1v 1ju' or 'SW1V' -> 'SW1V')"""
+    code = normalize_postcode(postcode)
+    return code[:-3] if _FULL_POSTCODE.match(code) else code
+
+
+def find_postcode(text: Optional[str]) -> str:
+    """The last full postcode written in free text, normalized ('' if none)"""
+    matches = _POSTCODE_IN_TEXT.findall(str(text or "").upper())
+    return "".join(matches[-1]) if matches else ""
+
+
+def address_key(address_lines: Any, postcode: Optional[str]) -> Tuple[Tuple[str, ...], str]:
+    """Cache key for an address lookup that ignores formatting differences"""
+    lines = tuple(
+        normalized
+        for normalized in (normalize_text(line) for line in flatten_address_lines(address_lines))
+        if normalized
+    )
+    return lines, normalize_postcode(postcode)
+
+
+def journey_key(source: str, destination: str) -> Tuple[str, str]:
+    """Cache key for a quote between two addresses"""
+    return normalize_text(source), normalize_text(destination)
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """UK phone number as national digits (e.g. '+44 7700 900123' -> '07700900123')"""
+    digits = _NON_DIGITS.sub("", str(phone or ""))
+    if digits.startswith("0044"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("44") and len(digits) == 12:
+        digits = "0" + digits[2:]
+    return digits
@@ -0,0 +1,245 @@
+"""
+Admission control and load shedding for the tool routes and their upstreams.
+
+Each tool route and each upstream has a concurrency limit with a bounded wait
+queue in front of it. Queued requests are admitted in priority order (FIFO
+within a priority), so booking writes overtake driver-location polls and
+background prefetches. When the queue is full, a new request either displaces
+the lowest-priority waiter or, if nothing queued ranks below it, is turned away
+at once; a request that has waited ADMISSION_QUEUE_TIMEOUT is turned away too.
+
+A request turned away at a route gets that route's usual "System temporarily
+unavailable" response straight away instead of timing out in front of the
+caller. One turned away at an upstream raises UpstreamOverloadedError, an
+httpx.TransportError, which the handlers already answer with their friendly
+error shapes; it is not counted against the upstream's circuit breaker.
+
+Limits come from ADMISSION_ROUTE_LIMIT / ADMISSION_UPSTREAM_LIMIT and the
+matching _QUEUE variables, and can be set per limiter with ADMISSION_LIMITS,
+e.g. "bookCab=40:80,cabee=30" (limit, optionally ":queue").
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from services import metrics
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ROUTE_LIMIT = int(os.getenv("ADMISSION_ROUTE_LIMIT", 100))
+ROUTE_QUEUE = int(os.getenv("ADMISSION_ROUTE_QUEUE", 200))
+UPSTREAM_LIMIT = int(os.getenv("ADMISSION_UPSTREAM_LIMIT", os.getenv("HTTP_POOL_MAX_CONNECTIONS", 100)))
+UPSTREAM_QUEUE = int(os.getenv("ADMISSION_UPSTREAM_QUEUE", 200))
+# Longest a request may wait for a slot before it is shed (seconds)
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 3.0))
+LIMIT_OVERRIDES = os.getenv("ADMISSION_LIMITS", "")
+
+# Lower numbers are admitted first
+CRITICAL = 0    # booking creation and cancellation
+HIGH = 1        # other booking writes
+NORMAL = 2      # interactive lookups: addresses, pricing, bookings, new calls
+LOW = 3         # repeatable polls and background prefetches
+PRIORITY_NAMES = {CRITICAL: "critical", HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+logger = logging.getLogger(__name__)
+
+# Priority of the tool request being handled, inherited by its upstream calls
+_priority: ContextVar[int] = ContextVar("admission_priority", default=NORMAL)
+
+shed_requests = metrics.Counter(
+    "admission_shed_total",
+    "Requests turned away by admission control",
+    ("limiter", "priority", "reason"),
+)
+queue_wait = metrics.Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent queued for a slot",
+    ("limiter",),
+)
+in_use_gauge = metrics.Gauge(
+    "admission_in_use",
+    "Slots currently held",
+    ("limiter",),
+)
+queued_gauge = metrics.Gauge(
+    "admission_queued",
+    "Requests waiting for a slot",
+    ("limiter",),
+)
+
+
+class OverloadedError(Exception):
+    """Raised when a limiter turns a request away"""
+
+    def __init__(self, limiter: str, reason: str):
+        super().__init__(f"{limiter} overloaded ({reason})")
+        self.limiter = limiter
+        self.reason = reason
+
+
+class UpstreamOverloadedError(httpx.TransportError):
+    """Raised instead of calling an upstream whose limiter turned the request away"""
+
+
+def _parse_overrides(spec: str) -> Dict[str, Tuple[int, Optional[int]]]:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        limit, _, queue = value.partition(":")
+        try:
+            overrides[name.strip()] = (int(limit), int(queue) if queue else None)
+        except ValueError:
+            logger.warning("Ignoring malformed ADMISSION_LIMITS entry %r", item)
+    return overrides
+
+
+_overrides = _parse_overrides(LIMIT_OVERRIDES)
+
+
+class PriorityLimiter:
+    """Concurrency limit with a bounded, priority-ordered wait queue"""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float = QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        # Sorted (priority, sequence, future): best first, the one to displace last
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.shed = 0
+
+    def _update_gauges(self):
+        in_use_gauge.set(self.in_use, self.name)
+        queued_gauge.set(len(self._waiters), self.name)
+
+    def _shed(self, priority: int, reason: str) -> OverloadedError:
+        self.shed += 1
+        shed_requests.inc(self.name, PRIORITY_NAMES.get(priority, priority), reason)
+        return OverloadedError(self.name, reason)
+
+    async def acquire(self, priority: int = NORMAL):
+        """Take a slot, queueing by priority; raises OverloadedError when shed"""
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            self.admitted += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            if not self._waiters or self._waiters[-1][0] <= priority:
+                raise self._shed(priority, "queue_full")
+            displaced_priority, _, displaced = self._waiters.pop()
+            displaced.set_exception(self._shed(displaced_priority, "displaced"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        bisect.insort(self._waiters, entry)
+        self._update_gauges()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise self._shed(priority, "timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as the caller went away
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+        self.admitted += 1
+        queue_wait.observe(time.monotonic() - start, self.name)
+
+    def _remove(self, entry: Tuple[int, int, asyncio.Future]):
+        index = bisect.bisect_left(self._waiters, entry)
+        if index < len(self._waiters) and self._waiters[index] is entry:
+            del self._waiters[index]
+            self._update_gauges()
+
+    def release(self):
+        """Return a slot, handing it straight to the best waiter if there is one"""
+        while self._waiters:
+            _, _, future = self._waiters.pop(0)
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.in_use -= 1
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_use": self.in_use,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+_limiters: Dict[str, PriorityLimiter] = {}
+
+
+def get_limiter(name: str, limit: int = ROUTE_LIMIT, queue_size: int = ROUTE_QUEUE) -> PriorityLimiter:
+    """The limiter for a route or upstream, created on first use"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        override_limit, override_queue = _overrides.get(name, (limit, queue_size))
+        limiter = _limiters[name] = PriorityLimiter(
+            name, override_limit, queue_size if override_queue is None else override_queue
+        )
+    return limiter
+
+
+def upstream_limiter(upstream: str) -> PriorityLimiter:
+    return get_limiter(upstream, UPSTREAM_LIMIT, UPSTREAM_QUEUE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def set_priority(priority: int):
+    """Set the priority of the current task's upstream calls (e.g. for background work)"""
+    _priority.set(priority)
+
+
+async def admit(name: str, priority: int, fn: Callable[[], Awaitable[Any]], overloaded: Callable[[], Any]) -> Any:
+    """
+    Run fn() once the named route limiter admits it, or return overloaded()
+    straight away if the request is shed. fn is only called once admitted.
+    """
+    if not ADMISSION_ENABLED:
+        return await fn()
+    limiter = get_limiter(name)
+    try:
+        await limiter.acquire(priority)
+    except OverloadedError as e:
+        logger.warning("Shedding %s request (%s priority): %s", name, PRIORITY_NAMES.get(priority), e.reason)
+        return overloaded()
+    token = _priority.set(priority)
+    try:
+        return await fn()
+    finally:
+        _priority.reset(token)
+        limiter.release()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "queue_timeout": QUEUE_TIMEOUT,
+        "limiters": {name: limiter.stats() for name, limiter in sorted(_limiters.items())},
+    }
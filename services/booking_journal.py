@@ -0,0 +1,604 @@
+"""
+Write-behind booking queue backed by a durable local journal.
+
+With BOOKING_WRITE_BEHIND=true a cabBooking is not sent to Cabee while the
+caller waits. It is appended to an append-only journal, acknowledged to the
+agent with a provisional reference (e.g. P482913) once it is on disk, and
+sent to Job/CreateOnlineJob by a background drain, oldest first. A booking
+that fails is retried with its own exponential backoff and moves to the back
+of the queue, so it does not hold up the others; after
+BOOKING_DRAIN_MAX_ATTEMPTS failures it is marked failed.
+
+CreateOnlineJob is not idempotent, so a "sending" record is journaled before
+each attempt. Only a failure that proves the request never reached Cabee
+(connection refused, circuit open, shed before sending) is retried blindly.
+After any other failure (a timeout, a 5xx), and after a restart that
+interrupted an attempt, Cabee is first searched for the job (by phone, pickup
+time and addresses) and it is only sent again if it is not there.
+
+The journal is JSON lines, one record per state change:
+
+    {"op": "queued", "ref": ..., "ts": ..., "booking": {...}, "reply": {...}}
+    {"op": "updated", "ref": ..., "ts": ..., "changes": {...}}
+    {"op": "sending", "ref": ..., "ts": ...}
+    {"op": "unsent", "ref": ..., "ts": ...}
+    {"op": "cancelled", "ref": ..., "ts": ...}
+    {"op": "created", "ref": ..., "ts": ..., "jobNO": ..., "id": ...}
+    {"op": "rejected", "ref": ..., "ts": ..., "error": ...}
+    {"op": "failed", "ref": ..., "ts": ..., "error": ...}
+
+Appends are group-committed: records that arrive while an fsync is running
+are written and fsynced together in the next batch, and nothing is
+acknowledged before its fsync returns. In-memory state is only changed by
+replaying records, at startup from the file and afterwards as each batch is
+written, so the file and memory always agree. The journal is compacted on
+startup and whenever it grows past BOOKING_JOURNAL_COMPACT_BYTES, keeping
+pending bookings and BOOKING_JOURNAL_RETAIN seconds of finished ones (so a
+provisional reference can still be looked up).
+
+Each worker process holds its own journal slot, bookings-<n>.jsonl in
+BOOKING_JOURNAL_DIR, claimed with a lock file, so workers never drain each
+other's bookings and a restarted worker picks its slot's backlog up again.
+Every BOOKING_JOURNAL_ADOPT_INTERVAL seconds (and at startup) a worker also
+takes over any slot whose lock nobody holds, such as one left by a worker
+that died or by a deployment that reduced WORKERS, moving its bookings into
+its own journal.
+The state of each provisional reference is also published to the
+"provisional_bookings" cache, so with CACHE_BACKEND=shared any worker can
+look it up.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from services import metrics
+from services.admission import UpstreamOverloadedError
+from services.cache import make_cache
+from services.draining import drain
+from services.resilience import CircuitOpenError
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker, no slot locking
+    fcntl = None
+
+BOOKING_WRITE_BEHIND = os.getenv("BOOKING_WRITE_BEHIND", "false").lower() == "true"
+BOOKING_JOURNAL_DIR = os.getenv("BOOKING_JOURNAL_DIR", "data/journal")
+BOOKING_JOURNAL_RETAIN = float(os.getenv("BOOKING_JOURNAL_RETAIN", 86400))
+BOOKING_JOURNAL_COMPACT_BYTES = int(os.getenv("BOOKING_JOURNAL_COMPACT_BYTES", 4 * 1024 * 1024))
+BOOKING_DRAIN_BACKOFF_MIN = float(os.getenv("BOOKING_DRAIN_BACKOFF_MIN", 1))
+BOOKING_DRAIN_BACKOFF_MAX = float(os.getenv("BOOKING_DRAIN_BACKOFF_MAX", 60))
+BOOKING_DRAIN_MAX_ATTEMPTS = int(os.getenv("BOOKING_DRAIN_MAX_ATTEMPTS", 20))
+BOOKING_JOURNAL_ADOPT_INTERVAL = float(os.getenv("BOOKING_JOURNAL_ADOPT_INTERVAL", 60))
+MAX_SLOTS = 64
+
+# Provisional reference -> {"status", "job_no", "reply"} for lookups from any worker
+references = make_cache("provisional_bookings", maxsize=4096, ttl=BOOKING_JOURNAL_RETAIN)
+
+logger = logging.getLogger(__name__)
+
+journal_pending = metrics.Gauge(
+    "booking_journal_pending",
+    "Journaled bookings not yet created upstream",
+)
+journal_submissions = metrics.Counter(
+    "booking_journal_submissions_total",
+    "Attempts to create a journaled booking upstream",
+    ("result",),
+)
+journal_lag = metrics.Histogram(
+    "booking_journal_lag_seconds",
+    "Time from acknowledging a booking to creating it upstream",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+)
+journal_fsync = metrics.Histogram(
+    "booking_journal_fsync_seconds",
+    "Time to write and fsync one batch of journal records",
+)
+
+PROVISIONAL_REFERENCE = re.compile(r"^P\d{6}$")
+
+# Sends a booking payload to Job/CreateOnlineJob and returns Cabee's job
+SubmitBooking = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# Returns the job Cabee already holds for a booking payload, or None
+FindBooking = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+# Failures that prove a CreateOnlineJob never reached Cabee, so sending it again cannot duplicate it
+NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, CircuitOpenError, UpstreamOverloadedError)
+
+
+class BookingRejected(Exception):
+    """Cabee refused the booking itself; retrying would not help"""
+
+
+def clean_reference(reference: Optional[str]) -> str:
+    return str(reference or "").replace("-", "").replace(" ", "").upper()
+
+
+class BookingJournal:
+    """Durable queue of bookings acknowledged to the caller but not yet created upstream"""
+
+    def __init__(self, directory: str = BOOKING_JOURNAL_DIR):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._submit: Optional[SubmitBooking] = None
+        self._find: Optional[FindBooking] = None
+        self._file = None
+        self._lock_file = None
+        self._writes: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._write_ready = asyncio.Event()
+        self._work_ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._adopter: Optional[asyncio.Task] = None
+        self._attempt: Optional[asyncio.Task] = None
+        # Pending references being changed, which the drain must not send meanwhile
+        self._held: Set[str] = set()
+        self._writing = False
+        self._compacted_size = 0
+        self.in_flight: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.created = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retries = 0
+        self.found = 0
+        self.adopted = 0
+        self.batches = 0
+        self.records_written = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._writer is not None
+
+    # Replay
+
+    def _apply(self, record: Dict[str, Any]):
+        """Apply one journal record to the in-memory state"""
+        ref, op = record["ref"], record["op"]
+        if op == "queued":
+            self.entries[ref] = {
+                "status": "pending",
+                "queued_at": record["ts"],
+                "booking": record["booking"],
+                "reply": record["reply"],
+                "attempts": 0,
+                "next_attempt_at": 0.0,
+                # An attempt may have reached Cabee without an answer
+                "unconfirmed": False,
+            }
+            self._pending[ref] = None
+            self._work_ready.set()
+            journal_pending.set(len(self._pending))
+            return
+        entry = self.entries.get(ref)
+        if entry is None:
+            return
+        if op in ("sending", "unsent"):
+            entry["unconfirmed"] = op == "sending"
+            return
+        if op == "updated":
+            entry["booking"].update(record["changes"])
+            entry["reply"]["data"].update(
+                {key: value for key, value in record["changes"].items() if key in entry["reply"]["data"]}
+            )
+            return
+        entry["status"] = op
+        entry["finished_at"] = record["ts"]
+        if op == "created":
+            entry["job_no"] = record.get("jobNO")
+            entry["booking_id"] = record.get("id")
+        elif op in ("rejected", "failed"):
+            entry["error"] = record.get("error")
+        self._pending.pop(ref, None)
+        journal_pending.set(len(self._pending))
+
+    def _claim_slot(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        for slot in range(MAX_SLOTS if fcntl else 1):
+            lock_file = open(os.path.join(self.directory, f"bookings-{slot}.lock"), "a")
+            if fcntl:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    continue
+            self._lock_file = lock_file
+            return os.path.join(self.directory, f"bookings-{slot}.jsonl")
+        raise RuntimeError(f"all {MAX_SLOTS} booking journal slots in {self.directory} are in use")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    # A torn final write from a crash; everything before it was fsynced
+                    logger.warning("Skipping unreadable booking journal record %s:%d (%s)", self.path, number, e)
+
+    def _records(self) -> List[Dict[str, Any]]:
+        """Records that recreate the current state, dropping long-finished bookings"""
+        horizon = time.time() - BOOKING_JOURNAL_RETAIN
+        records = []
+        for ref, entry in list(self.entries.items()):
+            if entry["status"] != "pending" and entry["finished_at"] < horizon:
+                del self.entries[ref]
+                continue
+            records.append({"op": "queued", "ref": ref, "ts": entry["queued_at"],
+                            "booking": entry["booking"], "reply": entry["reply"]})
+            if entry["status"] == "pending":
+                if entry["unconfirmed"]:
+                    records.append({"op": "sending", "ref": ref, "ts": entry["queued_at"]})
+                continue
+            final = {"op": entry["status"], "ref": ref, "ts": entry["finished_at"]}
+            if entry["status"] == "created":
+                final.update(jobNO=entry.get("job_no"), id=entry.get("booking_id"))
+            elif entry["status"] in ("rejected", "failed"):
+                final["error"] = entry.get("error")
+            records.append(final)
+        return records
+
+    def _snapshot(self) -> bytes:
+        return b"".join(_encode(record) for record in self._records())
+
+    def _compact_sync(self, snapshot: bytes):
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, "ab")
+        self._compacted_size = len(snapshot)
+
+    # Writing
+
+    def _write_sync(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def _write_loop(self):
+        for ref in list(self.entries):
+            await self._publish(ref)
+        while True:
+            await self._write_ready.wait()
+            self._write_ready.clear()
+            batch, self._writes = self._writes, []
+            if not batch:
+                continue
+            self._writing = True
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write_sync, b"".join(_encode(record) for record, _ in batch))
+            except Exception as e:
+                self._writing = False
+                logger.exception("Booking journal write failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            journal_fsync.observe(time.perf_counter() - start)
+            self.batches += 1
+            self.records_written += len(batch)
+            for record, future in batch:
+                self._apply(record)
+                await self._publish(record["ref"])
+                if not future.done():
+                    future.set_result(None)
+            # Compact once finished bookings, not a large backlog, make up most of the file
+            if self._file.tell() > max(BOOKING_JOURNAL_COMPACT_BYTES, 2 * self._compacted_size):
+                await asyncio.to_thread(self._compact_sync, self._snapshot())
+            self._writing = False
+
+    @staticmethod
+    def _view(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": entry["status"], "job_no": entry.get("job_no"), "reply": entry["reply"]}
+
+    async def _publish(self, ref: str):
+        entry = self.entries.get(ref)
+        if entry is not None:
+            await references.set(ref, self._view(entry))
+
+    async def _append(self, record: Dict[str, Any]):
+        """Append a record and wait until it is fsynced (and applied)"""
+        await self._append_all([record])
+
+    async def _append_all(self, records: List[Dict[str, Any]]):
+        """Append records in order, in one batch, and wait until they are fsynced (and applied)"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for record in records:
+            record.setdefault("ts", time.time())
+            futures.append(loop.create_future())
+            self._writes.append((record, futures[-1]))
+        self._write_ready.set()
+        await asyncio.gather(*futures)
+
+    # Draining
+
+    def _next_due(self) -> Tuple[Optional[str], Optional[float]]:
+        """The oldest booking due for an attempt, or None and when the next one is due"""
+        now = time.time()
+        wake_at = None
+        for ref in self._pending:
+            if ref in self._held:
+                continue
+            due_at = self.entries[ref]["next_attempt_at"]
+            if due_at <= now:
+                return ref, None
+            wake_at = due_at if wake_at is None else min(wake_at, due_at)
+        return None, wake_at
+
+    async def _drain_loop(self):
+        while True:
+            ref, wake_at = self._next_due()
+            if ref is None or drain.draining:
+                self._work_ready.clear()
+                timeout = None if wake_at is None or drain.draining else max(0.0, wake_at - time.time())
+                try:
+                    await asyncio.wait_for(self._work_ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._attempt = asyncio.ensure_future(self._send(ref))
+            # Protected so shutdown waits for a create already sent to be journaled
+            await drain.protect(self._attempt)
+
+    async def _send(self, ref: str):
+        self.in_flight = ref
+        try:
+            await self._attempt_create(ref)
+        finally:
+            # Only now: changes to the booking wait until its outcome is journaled
+            self.in_flight = None
+
+    async def _attempt_create(self, ref: str):
+        entry = self.entries[ref]
+        submitting = False
+        try:
+            # An earlier attempt may have created the job without us hearing back
+            result = await self._find(dict(entry["booking"])) if entry["unconfirmed"] else None
+            if result is not None:
+                self.found += 1
+                logger.warning("Journaled booking %s was already created by an earlier attempt", ref)
+            elif entry["attempts"] >= BOOKING_DRAIN_MAX_ATTEMPTS:
+                # Out of attempts, and now known not to have been created
+                await self._fail(ref, entry)
+                return
+            else:
+                await self._append({"op": "sending", "ref": ref})
+                submitting = True
+                result = await self._submit(dict(entry["booking"]))
+        except BookingRejected as e:
+            journal_submissions.inc("rejected")
+            logger.error("Journaled booking %s rejected by Cabee: %s", ref, e)
+            await self._append({"op": "rejected", "ref": ref, "error": str(e)})
+            self.rejected += 1
+            return
+        except Exception as e:
+            entry["attempts"] += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            if submitting and isinstance(e, NOT_SENT):
+                # Cabee never saw it (and any earlier attempt was looked for first)
+                await self._append({"op": "unsent", "ref": ref})
+            if entry["attempts"] >= BOOKING_DRAIN_MAX_ATTEMPTS and not entry["unconfirmed"]:
+                await self._fail(ref, entry)
+                return
+            self.retries += 1
+            backoff = min(BOOKING_DRAIN_BACKOFF_MAX, BOOKING_DRAIN_BACKOFF_MIN * 2 ** (entry["attempts"] - 1))
+            entry["next_attempt_at"] = time.time() + backoff * random.uniform(0.5, 1.0)
+            # To the back of the queue, so the bookings behind it are not held up
+            self._pending.move_to_end(ref)
+            journal_submissions.inc("retry")
+            logger.warning("Journaled booking %s not created (attempt %d%s), retrying in %.0fs: %s",
+                           ref, entry["attempts"], ", checking Cabee first" if entry["unconfirmed"] else "",
+                           backoff, self.last_error)
+            return
+        await self._append({"op": "created", "ref": ref, "jobNO": result.get("jobNO"), "id": result.get("id")})
+        self.created += 1
+        journal_submissions.inc("created")
+        journal_lag.observe(time.time() - entry["queued_at"])
+        logger.info("Journaled booking %s created as %s", ref, result.get("jobNO"), extra={"job_no": result.get("jobNO")})
+
+    async def _fail(self, ref: str, entry: Dict[str, Any]):
+        journal_submissions.inc("failed")
+        logger.error("Journaled booking %s not created after %d attempts, giving up: %s",
+                     ref, entry["attempts"], self.last_error)
+        await self._append({"op": "failed", "ref": ref, "error": self.last_error})
+        self.failed += 1
+
+    # Orphaned slots
+
+    async def _adopt_loop(self):
+        while True:
+            try:
+                await self._adopt_orphans()
+            except Exception:
+                logger.exception("Taking over orphaned booking journals failed")
+            await asyncio.sleep(BOOKING_JOURNAL_ADOPT_INTERVAL)
+
+    async def _adopt_orphans(self):
+        """Take over every slot journal with bookings that no live worker holds the lock for"""
+        if fcntl is None:
+            return
+        for slot in range(MAX_SLOTS):
+            path = os.path.join(self.directory, f"bookings-{slot}.jsonl")
+            if path == self.path or not os.path.exists(path) or os.path.getsize(path) == 0:
+                continue
+            lock_file = open(os.path.join(self.directory, f"bookings-{slot}.lock"), "a")
+            try:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # a live worker's slot
+                if os.path.exists(path):
+                    await self._adopt(path)
+            finally:
+                lock_file.close()
+
+    async def _adopt(self, path: str):
+        """Move a locked orphan journal's bookings into this one, then delete it"""
+        orphan = BookingJournal(self.directory)
+        orphan.path = path
+        orphan._replay()
+        records = orphan._records()
+        for ref, entry in orphan.entries.items():
+            mine = self.entries.get(ref)
+            # The same queued_at means an earlier takeover was interrupted before the delete
+            if mine is not None and mine["queued_at"] != entry["queued_at"]:
+                logger.error("Cannot take over booking journal %s: reference %s is also in %s", path, ref, self.path)
+                return
+        records = [record for record in records if record["ref"] not in self.entries]
+        if records:
+            await self._append_all(records)
+        os.unlink(path)
+        adopted = sum(1 for entry in orphan.entries.values() if entry["status"] == "pending")
+        self.adopted += adopted
+        journal_pending.set(len(self._pending))
+        logger.warning("Took over booking journal %s (%d pending)", path, adopted)
+
+    # Public interface
+
+    def start(self, submit: SubmitBooking, find: FindBooking):
+        """Replay this worker's journal and start draining it (FastAPI startup hook)"""
+        if not BOOKING_WRITE_BEHIND:
+            return
+        self._submit = submit
+        self._find = find
+        self.path = self._claim_slot()
+        self._replay()
+        self._compact_sync(self._snapshot())
+        journal_pending.set(len(self._pending))
+        self._writer = asyncio.create_task(self._write_loop(), name="booking-journal-writer")
+        self._drainer = asyncio.create_task(self._drain_loop(), name="booking-journal-drain")
+        self._adopter = asyncio.create_task(self._adopt_loop(), name="booking-journal-adopt")
+        logger.info("Write-behind bookings enabled (%s, %d pending)", self.path, len(self._pending))
+
+    async def stop(self):
+        """Stop draining and close the journal (FastAPI shutdown hook, after drain.wait)"""
+        if self._drainer is None:
+            return
+        self._adopter.cancel()
+        self._drainer.cancel()
+        if self._attempt is not None and not self._attempt.done():
+            await asyncio.wait({self._attempt}, timeout=BOOKING_DRAIN_BACKOFF_MAX)
+        while self._writes or self._writing:
+            await asyncio.sleep(0.01)
+        self._writer.cancel()
+        self._file.close()
+        self._lock_file.close()
+        self._writer = self._drainer = self._adopter = None
+
+    async def enqueue(self, booking: Dict[str, Any], reply_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Journal a booking and return the confirmation to give the agent"""
+        ref = "P" + str(100000 + secrets.randbelow(900000))
+        while ref in self.entries:
+            ref = "P" + str(100000 + secrets.randbelow(900000))
+        reply = {
+            "status": "success",
+            "booking_status": "confirmed",
+            "error": None,
+            "data": dict(reply_data, jobNO=ref, bookingId=None, provisional=True),
+        }
+        await self._append({"op": "queued", "ref": ref, "booking": booking, "reply": reply})
+        logger.info("Booking journaled as %s (%d pending)", ref, len(self._pending), extra={"job_no": ref})
+        return reply
+
+    async def lookup(self, reference: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        {"status", "job_no", "reply", "local"} for a provisional reference, or
+        None if it is not one. If this worker is sending that booking to Cabee
+        right now, wait for the outcome so the caller acts on its final state.
+        "local" is False for another worker's booking, which this one can
+        read but not change.
+        """
+        ref = clean_reference(reference)
+        if not PROVISIONAL_REFERENCE.match(ref):
+            return None
+        entry = self.entries.get(ref)
+        if entry is None:
+            view = await references.get(ref)
+            return dict(view, local=False) if view is not None else None
+        await self._settle(ref)
+        return dict(self._view(entry), local=True)
+
+    async def _settle(self, ref: str):
+        """Wait while this worker is sending the booking to Cabee"""
+        while self.in_flight == ref and self._attempt is not None and not self._attempt.done():
+            await asyncio.wait({self._attempt})
+
+    async def _change(self, reference: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        ref = clean_reference(reference)
+        entry = self.entries[ref]
+        await self._settle(ref)
+        if entry["status"] == "pending":
+            # Held back from the drain until the change is on disk
+            self._held.add(ref)
+            try:
+                await self._append(dict(record, ref=ref))
+            finally:
+                self._held.discard(ref)
+                self._work_ready.set()
+        return self._view(entry)
+
+    async def update(self, reference: str, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Change a booking that is still pending (it is sent with the changes
+        applied) and return its state. A booking that has meanwhile been
+        created or has failed is left alone: the caller must check the status.
+        """
+        return await self._change(reference, {"op": "updated", "changes": changes})
+
+    async def cancel(self, reference: str) -> Dict[str, Any]:
+        """
+        Drop a booking that is still pending, so it is never sent, and return
+        its state. As with update, a booking Cabee has already created is left
+        for the caller to cancel there.
+        """
+        return await self._change(reference, {"op": "cancelled"})
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = min(self._pending, key=lambda ref: self.entries[ref]["queued_at"], default=None)
+        _, wake_at = self._next_due()
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "pending": len(self._pending),
+            "lag_seconds": round(time.time() - self.entries[oldest]["queued_at"], 3) if oldest else 0.0,
+            "in_flight": self.in_flight,
+            "next_attempt_in": round(max(0.0, wake_at - time.time()), 3) if wake_at else 0.0,
+            "created": self.created,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retries": self.retries,
+            "found_after_failure": self.found,
+            "adopted": self.adopted,
+            "last_error": self.last_error,
+            "fsync_batches": self.batches,
+            "records_written": self.records_written,
+            "journal_bytes": self._file.tell() if self._file is not None and not self._file.closed else 0,
+        }
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+booking_journal = BookingJournal()
@@ -0,0 +1,122 @@
+"""
+Small in-process caches with TTL expiry and LRU eviction.
+
+Caches register themselves by name so their hit/miss/eviction counters can be
+reported from the status endpoints.
+
+The tool routes use the async interface from ``make_cache``: with
+CACHE_BACKEND=local (the default) it is a TTLCache private to the worker
+process; with CACHE_BACKEND=shared it is a SharedCache (services/shared_cache.py)
+kept in a local cache daemon or Redis at CACHE_URL, so every worker sees the
+same entries.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+
+_registry: Dict[str, Any] = {}
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        register(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class LocalCache:
+    """The async cache interface over a TTLCache in this process"""
+
+    backend = "local"
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.ttl = ttl
+        self._cache = TTLCache(name, maxsize, ttl)
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._cache.get(key, default)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: Hashable) -> bool:
+        return self._cache.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def make_cache(name: str, maxsize: int = 1024, ttl: float = 300.0):
+    """A cache on the configured backend (CACHE_BACKEND=local or shared)"""
+    if CACHE_BACKEND == "shared":
+        from services.shared_cache import SharedCache
+        return SharedCache(name, maxsize, ttl)
+    if CACHE_BACKEND != "local":
+        raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+    return LocalCache(name, maxsize, ttl)
+
+
+def register(name: str, cache: Any):
+    _registry[name] = cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Counters for every registered cache"""
+    return {name: cache.stats() for name, cache in _registry.items()}
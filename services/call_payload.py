@@ -0,0 +1,106 @@
+"""
+Ultravox call-creation payload and /api/config document, serialized once.
+
+The web call config is dominated by the system prompt and the tool schemas,
+which never change between calls, so they are encoded to JSON bytes once per
+agent config. Each call only encodes its small set of overrides (model,
+voice, temperature, ...) and splices them in front of the invariant bytes.
+The /api/config document is likewise kept as bytes with an ETag so browsers
+can revalidate it with a 304.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from config.agent_config import ULTRAVOX_WEB_CALL_CONFIG
+
+# Call settings that may differ per call (joinTimeout is set for warm-pool calls)
+OVERRIDE_FIELDS = ("model", "voice", "temperature", "maxDuration", "timeExceededMessage", "joinTimeout")
+
+# Version name of the config in config/agent_config.py
+BUILTIN_VERSION = "builtin"
+
+CONFIG_TITLE = "Cromwell Cars Web Dispatcher"
+CONFIG_OVERVIEW = (
+    "Independent web interface for Cromwell Cars AI Dispatcher. This service has its own "
+    "agent configuration separate from the Twilio phone service."
+)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def config_document(config: Dict[str, Any], version: str = BUILTIN_VERSION) -> Dict[str, Any]:
+    """What /api/config tells the browser about the agent"""
+    return {
+        "title": CONFIG_TITLE,
+        "overview": CONFIG_OVERVIEW,
+        "version": version,
+        "callConfig": {
+            "systemPrompt": config["systemPrompt"],
+            "model": config["model"],
+            "languageHint": "en",
+            "selectedTools": config["selectedTools"],
+            "voice": config["voice"],
+            "temperature": config["temperature"],
+        },
+    }
+
+
+class CallPayload:
+    """Pre-encoded call-creation body and config document for one agent config version"""
+
+    def __init__(self, config: Dict[str, Any], version: str = BUILTIN_VERSION):
+        self.config = config
+        self.version = version
+        self.defaults = {field: config[field] for field in OVERRIDE_FIELDS if field in config}
+        self.tool_count = len(config.get("selectedTools", []))
+        invariant = {key: value for key, value in config.items() if key not in OVERRIDE_FIELDS}
+        # Recorded on the call itself, so every Ultravox call shows which version it ran
+        invariant["metadata"] = dict(config.get("metadata") or {}, agentConfigVersion=version)
+        # Without the closing brace's opening counterpart: b'"systemPrompt":...}' or b'}'
+        self._invariant_tail = _dumps(invariant)[1:]
+        self.default_body = self.body()
+        self.config_body = _dumps(config_document(config, version))
+        self.etag = '"' + hashlib.sha256(self.config_body).hexdigest()[:20] + '"'
+
+    def settings(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Overridable settings for a call: the defaults, replaced by any non-empty override"""
+        settings = dict(self.defaults)
+        for field, value in (overrides or {}).items():
+            if field in OVERRIDE_FIELDS and value not in (None, ""):
+                settings[field] = value
+        return settings
+
+    def body(self, overrides: Optional[Dict[str, Any]] = None) -> bytes:
+        """JSON request body for POST /calls with the overrides applied"""
+        head = _dumps(self.settings(overrides))
+        if head == b"{}":
+            return b"{" + self._invariant_tail
+        if self._invariant_tail == b"}":
+            return head
+        return head[:-1] + b"," + self._invariant_tail
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header already names the current config document"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+_current = CallPayload(ULTRAVOX_WEB_CALL_CONFIG)
+
+
+def current() -> CallPayload:
+    """Payload for the active agent config"""
+    return _current
+
+
+def rebuild(config: Dict[str, Any], version: str = BUILTIN_VERSION) -> CallPayload:
+    """Encode a new agent config version and make it the active one"""
+    global _current
+    _current = CallPayload(config, version)
+    return _current
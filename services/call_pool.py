@@ -0,0 +1,168 @@
+"""
+Warm pool of pre-created Ultravox calls.
+
+Creating a call is a round trip to api.ultravox.ai that the browser has to
+wait for before it can join. With ULTRAVOX_WARM_POOL_SIZE set, a background
+task keeps that many calls created ahead of time with the default web call
+config, and a call request without overrides is handed one immediately.
+
+Pooled calls are created with a longer joinTimeout (Ultravox ends a call
+nobody joined in time) and are only handed out while the caller still has
+ULTRAVOX_WARM_POOL_MARGIN seconds left to join. Calls that expire in the pool,
+or were created for an agent config that has since changed, are wasted.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from services import call_payload, metrics
+from services.call_payload import CallPayload
+
+ULTRAVOX_WARM_POOL_SIZE = int(os.getenv("ULTRAVOX_WARM_POOL_SIZE", 0))
+ULTRAVOX_WARM_POOL_JOIN_TIMEOUT = float(os.getenv("ULTRAVOX_WARM_POOL_JOIN_TIMEOUT", 300))
+ULTRAVOX_WARM_POOL_MARGIN = float(os.getenv("ULTRAVOX_WARM_POOL_MARGIN", 30))
+ULTRAVOX_WARM_POOL_RETRY = float(os.getenv("ULTRAVOX_WARM_POOL_RETRY", 5))
+
+logger = logging.getLogger(__name__)
+
+pool_requests = metrics.Counter(
+    "ultravox_warm_pool_requests_total",
+    "Call requests answered from the warm pool (hit), created on demand (miss) "
+    "or not eligible because they carried overrides (bypass)",
+    ("result",),
+)
+pool_wasted = metrics.Counter(
+    "ultravox_warm_pool_wasted_total",
+    "Pre-created calls thrown away unused",
+    ("reason",),
+)
+pool_ready = metrics.Gauge(
+    "ultravox_warm_pool_ready",
+    "Pre-created calls waiting to be handed out",
+)
+
+CreateCall = Callable[[bytes], Awaitable[Dict[str, Any]]]
+
+
+class WarmCallPool:
+    """Pre-created calls for the current agent config, refilled in the background"""
+
+    def __init__(self, size: int = ULTRAVOX_WARM_POOL_SIZE, join_timeout: float = ULTRAVOX_WARM_POOL_JOIN_TIMEOUT,
+                 margin: float = ULTRAVOX_WARM_POOL_MARGIN):
+        self.size = size
+        self.join_timeout = join_timeout
+        self.margin = margin
+        # (hand out until, payload it was created from, Ultravox response)
+        self._calls: Deque[Tuple[float, CallPayload, Dict[str, Any]]] = deque()
+        self._create: Optional[CreateCall] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self._task is not None
+
+    def start(self, create: CreateCall):
+        """Start refilling with create(body) -> Ultravox call response (FastAPI startup hook)"""
+        if self.size <= 0:
+            return
+        self._create = create
+        self._task = asyncio.create_task(self._refill(), name="ultravox-warm-pool")
+        logger.info("Warm Ultravox call pool enabled (%d calls, %.0fs join timeout)", self.size, self.join_timeout)
+
+    async def stop(self):
+        """Stop refilling (FastAPI shutdown hook); pooled calls are left to time out"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._discard_all("shutdown")
+
+    def take(self, payload: CallPayload) -> Optional[Dict[str, Any]]:
+        """A ready call created from this payload, or None to create one on demand"""
+        if not self.enabled:
+            return None
+        self._purge(payload)
+        call = None
+        if self._calls:
+            call = self._calls.popleft()[2]
+            pool_ready.dec()
+        pool_requests.inc("hit" if call else "miss")
+        self._wake.set()
+        return call
+
+    def bypass(self):
+        """Count a call request that had to be created on demand because of its overrides"""
+        if self.enabled:
+            pool_requests.inc("bypass")
+
+    def _discard(self, reason: str):
+        self._calls.popleft()
+        pool_wasted.inc(reason)
+        pool_ready.dec()
+
+    def _discard_all(self, reason: str):
+        while self._calls:
+            self._discard(reason)
+
+    def _purge(self, payload: CallPayload):
+        now = time.monotonic()
+        # Calls are queued oldest first, so expired ones are at the front
+        while self._calls and self._calls[0][0] <= now:
+            self._discard("expired")
+        stale = sum(1 for _, created_from, _ in self._calls if created_from is not payload)
+        if stale:
+            self._calls = deque(entry for entry in self._calls if entry[1] is payload)
+            pool_wasted.inc("config_changed", amount=stale)
+            pool_ready.dec(amount=stale)
+
+    async def _refill(self):
+        while True:
+            self._purge(call_payload.current())
+            if len(self._calls) >= self.size:
+                self._wake.clear()
+                # Wake on take(), or when the oldest call is about to expire
+                timeout = self._calls[0][0] - time.monotonic() if self._calls else None
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            payload = call_payload.current()
+            body = payload.body({"joinTimeout": f"{int(self.join_timeout)}s"})
+            started = time.monotonic()
+            try:
+                call = await self._create(body)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Could not pre-create Ultravox call: %s", e)
+                await asyncio.sleep(ULTRAVOX_WARM_POOL_RETRY)
+                continue
+            self.created += 1
+            self._calls.append((started + self.join_timeout - self.margin, payload, call))
+            pool_ready.inc()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "ready": len(self._calls),
+            "created": self.created,
+            "failures": self.failures,
+            "oldest_expires_in": round(self._calls[0][0] - now, 1) if self._calls else None,
+        }
+
+
+warm_pool = WarmCallPool()
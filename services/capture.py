@@ -0,0 +1,385 @@
+"""
+Opt-in capture of real tool traffic for replay.
+
+With CAPTURE_PATH set, every inbound tool request, the upstream exchanges it
+caused and its outcome are appended to a JSON Lines file (gzip-compressed when
+the path ends in .gz) by a background writer thread. Passenger names, phone
+numbers, emails, notes and addresses (including every field of an address
+validation candidate) are replaced with stable pseudonyms, request headers
+(and so the Cabee JWT) are never recorded. Replay matches exchanges by
+request ID rather than body, so pseudonyms do not affect it.
+
+Record kinds, with short keys to keep captures compact:
+
+    {"k": "req", "id", "t", "r": route, "c": conversation, "b": body}
+    {"k": "up",  "id", "t", "u": upstream, "m": method, "p": path, "q": body,
+                 "s": status, "ct": content type, "b": body, "e": elapsed, "x": error}
+    {"k": "res", "id", "t", "o": outcome, "e": elapsed}
+
+ReplayTransport answers upstream requests from a capture so that
+benchmarks/replay_capture.py can feed the recorded traffic back through the
+tool routes deterministically.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+CAPTURE_PATH = os.getenv("CAPTURE_PATH")
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", 10000))
+# Keep the same salt across restarts to keep pseudonyms stable between capture files
+CAPTURE_SALT = os.getenv("CAPTURE_SALT") or os.urandom(16).hex()
+
+PHONE_FIELDS = {"Phone", "passengerPhone", "passengerMobile", "phoneNumber", "mobile", "phone"}
+EMAIL_FIELDS = {"passengerEmail", "email"}
+NAME_FIELDS = {"passengerName", "driverName", "name"}
+TEXT_FIELDS = {"note"}
+ADDRESS_FIELDS = {
+    "origin", "destination", "sourceAddress", "destinationAddress", "address_lines", "postcode",
+    "building", "formatted", "address", "pickup",
+}
+SCRUBBED_FIELDS = PHONE_FIELDS | EMAIL_FIELDS | NAME_FIELDS | TEXT_FIELDS | ADDRESS_FIELDS
+# Address validation candidates are scrubbed whole, apart from these
+CANDIDATE_KEPT_FIELDS = {"source", "match_score"}
+
+logger = logging.getLogger(__name__)
+
+# Capture record ID of the tool request currently being handled
+_request_id: ContextVar[Optional[int]] = ContextVar("capture_request_id", default=None)
+
+
+def _digest(value: Any) -> str:
+    return hmac.new(CAPTURE_SALT.encode(), str(value).encode(), hashlib.sha256).hexdigest()
+
+
+def pseudonym(field: str, value: Any) -> Any:
+    """Stable stand-in for a PII value, keeping its rough shape"""
+    if value in (None, ""):
+        return value
+    digest = _digest(value)
+    if field in PHONE_FIELDS:
+        return "07" + str(int(digest[:12], 16))[:9].rjust(9, "0")
+    if field in EMAIL_FIELDS:
+        return f"user-{digest[:8]}@example.invalid"
+    if field in NAME_FIELDS:
+        return f"Passenger {digest[:6]}"
+    if field in ADDRESS_FIELDS:
+        return f"Address {digest[:8]}"
+    return "[scrubbed]"
+
+
+def _pseudonymize_all(field: str, value: Any) -> Any:
+    """value with every scalar in it pseudonymized as field (e.g. a list of address lines)"""
+    if isinstance(value, dict):
+        return {key: _pseudonymize_all(field, item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_pseudonymize_all(field, item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Coordinates and house numbers; there is no useful stand-in
+        return None
+    return pseudonym(field, value)
+
+
+def _scrub_candidate(candidate: Any) -> Any:
+    if not isinstance(candidate, dict):
+        return scrub(candidate)
+    return {
+        key: item if key in CANDIDATE_KEPT_FIELDS else _pseudonymize_all("address", item)
+        for key, item in candidate.items()
+    }
+
+
+def scrub(value: Any) -> Any:
+    """Copy of a JSON-like value with PII fields pseudonymized"""
+    if isinstance(value, dict):
+        scrubbed = {}
+        for key, item in value.items():
+            if key == "candidates" and isinstance(item, list):
+                scrubbed[key] = [_scrub_candidate(candidate) for candidate in item]
+            elif key in ADDRESS_FIELDS:
+                scrubbed[key] = _pseudonymize_all(key, item)
+            elif key in SCRUBBED_FIELDS and not isinstance(item, (dict, list)):
+                scrubbed[key] = pseudonym(key, item)
+            else:
+                scrubbed[key] = scrub(item)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+def scrub_path(url: httpx.URL) -> str:
+    """Request path plus query, with PII query parameters pseudonymized"""
+    if not url.query:
+        return url.path
+    params = [(key, pseudonym(key, value) if key in PHONE_FIELDS | EMAIL_FIELDS else value)
+              for key, value in parse_qsl(url.query.decode(), keep_blank_values=True)]
+    return f"{url.path}?{urlencode(params)}"
+
+
+def _body(content: bytes, content_type: str) -> Any:
+    if not content:
+        return None
+    if "json" in content_type:
+        try:
+            return scrub(json.loads(content))
+        except ValueError:
+            pass
+    return content.decode("utf-8", "replace")
+
+
+class CaptureWriter:
+    """Append-only capture file fed through a queue by a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path.replace("{pid}", str(os.getpid()))
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=CAPTURE_QUEUE_SIZE)
+        self._ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+        logger.info("Capturing tool traffic to %s", self.path)
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def put(self, record: Dict[str, Any]):
+        record["t"] = round(time.time(), 4)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "at", encoding="utf-8") as out:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                out.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str))
+                out.write("\n")
+                self.written += 1
+                if self._queue.empty():
+                    out.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "written": self.written, "dropped": self.dropped,
+                "queued": self._queue.qsize()}
+
+
+_writer: Optional[CaptureWriter] = CaptureWriter(CAPTURE_PATH) if CAPTURE_PATH else None
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+def start():
+    """Start the writer thread (FastAPI startup hook)"""
+    if _writer is not None:
+        _writer.start()
+
+
+def stop():
+    """Flush and close the capture file (FastAPI shutdown hook)"""
+    if _writer is not None:
+        _writer.stop()
+
+
+def record_request(route: str, body: Any, conversation_id: Optional[str] = None):
+    """Record an inbound tool request; upstream exchanges made while handling it are tied to it"""
+    if _writer is None:
+        return
+    request_id = _writer.next_id()
+    _request_id.set(request_id)
+    _writer.put({"k": "req", "id": request_id, "r": route, "c": conversation_id, "b": scrub(body)})
+
+
+async def record_exchange(upstream: str, request: httpx.Request, response: Optional[httpx.Response],
+                          elapsed: float, error: Optional[str] = None):
+    """Record one upstream request/response pair made for a tool request (reads the response body)"""
+    request_id = _request_id.get()
+    if _writer is None or request_id is None:
+        return
+    record: Dict[str, Any] = {
+        "k": "up",
+        "id": request_id,
+        "u": upstream,
+        "m": request.method,
+        "p": scrub_path(request.url),
+        "q": _body(request.content, request.headers.get("content-type", "")),
+        "e": round(elapsed, 4),
+    }
+    if response is not None:
+        content_type = response.headers.get("content-type", "")
+        await response.aread()
+        record.update({"s": response.status_code, "ct": content_type, "b": _body(response.content, content_type)})
+    if error:
+        record["x"] = error
+    _writer.put(record)
+
+
+def record_result(outcome: str, elapsed: float):
+    """Record how the current tool request ended"""
+    request_id = _request_id.get()
+    if _writer is None or request_id is None:
+        return
+    _writer.put({"k": "res", "id": request_id, "o": outcome, "e": round(elapsed, 4)})
+
+
+def capture_stats() -> Dict[str, Any]:
+    return _writer.stats() if _writer is not None else {"enabled": False}
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a capture file, tolerating a truncated final line or gzip member"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as source:
+        try:
+            for line in source:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+def _endpoint(path: str) -> str:
+    """
+    Base-independent name of an upstream endpoint: the last path segment that
+    is not an ID, so /api/Job/GetDriverCurrentLocationForJob/A2100 and
+    /cabee/Job/GetDriverCurrentLocationForJob/A2107 are the same endpoint
+    """
+    segments = [segment for segment in path.split("?")[0].split("/")
+                if segment and not any(char.isdigit() for char in segment)]
+    return segments[-1] if segments else ""
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers upstream requests with recorded responses, after the recorded
+    upstream latency divided by speed (0 means no delay).
+
+    Exchanges are matched to the replayed tool request that made them, in
+    recorded order per method, so a capture taken against one set of base
+    URLs replays against another. If caching or coalescing makes the replay
+    call upstream where the original did not, it falls back to recorded
+    exchanges for the same method and endpoint, or the same method when the
+    upstream has a single endpoint (the pricing webhook).
+    """
+
+    def __init__(self, upstream: str, exchanges: List[Dict[str, Any]], speed: float = 1.0):
+        self.upstream = upstream
+        self.speed = speed
+        self._by_request: Dict[Tuple[Any, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_endpoint: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._by_method: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for exchange in exchanges:
+            if exchange.get("u") != upstream:
+                continue
+            self._by_request[(exchange.get("id"), exchange["m"])].append(exchange)
+            self._by_endpoint[(exchange["m"], _endpoint(exchange["p"]))].append(exchange)
+            self._by_method[exchange["m"]].append(exchange)
+        self._fallback_index: Dict[Any, int] = defaultdict(int)
+        # Recorded correlationId -> live correlationId, for replaying pricing callbacks
+        self.correlations: Dict[str, str] = {}
+        self.matched = 0
+        self.fallbacks = 0
+        self.missing = 0
+
+    def _find(self, method: str, path: str) -> Optional[Dict[str, Any]]:
+        queued = self._by_request.get((_request_id.get(), method))
+        if queued:
+            self.matched += 1
+            return queued.popleft()
+        key: Any = (method, _endpoint(path))
+        candidates = self._by_endpoint.get(key)
+        if not candidates and len({_endpoint(e["p"]) for e in self._by_method.get(method, ())}) == 1:
+            key, candidates = method, self._by_method[method]
+        if not candidates:
+            self.missing += 1
+            return None
+        self.fallbacks += 1
+        index = self._fallback_index[key]
+        self._fallback_index[key] = index + 1
+        return candidates[index % len(candidates)]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = self._find(request.method, request.url.path)
+        if exchange is None:
+            return httpx.Response(502, json={"error": "no recorded response"}, request=request)
+        if self.speed > 0 and exchange.get("e"):
+            await asyncio.sleep(exchange["e"] / self.speed)
+        if isinstance(exchange.get("q"), dict) and exchange["q"].get("correlationId"):
+            try:
+                live = json.loads(request.content).get("correlationId")
+            except ValueError:
+                live = None
+            if live:
+                self.correlations[exchange["q"]["correlationId"]] = live
+        error = exchange.get("x")
+        if error == "timeout":
+            raise httpx.ReadTimeout("recorded upstream timeout", request=request)
+        if error and "s" not in exchange:
+            raise httpx.ConnectError(f"recorded upstream error: {error}", request=request)
+        body = exchange.get("b")
+        content_type = exchange.get("ct") or ""
+        if isinstance(body, (dict, list)):
+            content = json.dumps(body).encode()
+        else:
+            content = (body or "").encode()
+        return httpx.Response(
+            exchange.get("s", 200),
+            headers={"content-type": content_type} if content_type else None,
+            stream=httpx.ByteStream(content),
+            request=request,
+        )
+
+
+def bind_replay_request(request_id: Optional[int]):
+    """Tie upstream calls made by the current task to a recorded tool request"""
+    _request_id.set(request_id)
+
+
+def load_capture(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """Split a capture into inbound requests, upstream exchanges and results by request ID"""
+    requests, exchanges, results = [], [], {}
+    for record in read_capture(path):
+        kind = record.get("k")
+        if kind == "req":
+            requests.append(record)
+        elif kind == "up":
+            exchanges.append(record)
+        elif kind == "res":
+            results[record["id"]] = record
+    requests.sort(key=lambda record: record["t"])
+    return requests, exchanges, results
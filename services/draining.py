@@ -0,0 +1,70 @@
+"""
+Graceful draining of booking writes on shutdown.
+
+On SIGTERM uvicorn stops accepting connections and waits for open requests,
+cancelling any still running after GRACEFUL_TIMEOUT. A booking that is
+created, updated or cancelled upstream must not be cut off halfway, so those
+handlers run as shielded tasks: cancelling the request only abandons the
+response, and the shutdown hook waits up to DRAIN_TIMEOUT for the writes
+themselves to finish before the upstream clients are closed.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict, Set
+
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 25))
+
+logger = logging.getLogger(__name__)
+
+
+class Drain:
+    """In-flight work that shutdown waits for"""
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.draining = False
+        self.completed = 0
+        self.abandoned = 0
+
+    async def protect(self, work: Awaitable[Any]) -> Any:
+        """Await work so that cancelling the caller does not cancel it"""
+        task = asyncio.ensure_future(work)
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return await asyncio.shield(task)
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self.completed += 1
+        if not task.cancelled() and task.exception() is not None and self.draining:
+            logger.warning("Drained task failed: %s", task.exception())
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def wait(self, timeout: float = DRAIN_TIMEOUT):
+        """Wait for protected work to finish (FastAPI shutdown hook, before closing clients)"""
+        self.draining = True
+        if not self._tasks:
+            return
+        logger.info("Draining %d in-flight booking operation(s)", len(self._tasks))
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            self.abandoned += len(pending)
+            logger.error("%d booking operation(s) still running after %.0fs drain", len(pending), timeout)
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "abandoned": self.abandoned,
+        }
+
+
+drain = Drain()
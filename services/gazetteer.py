@@ -0,0 +1,284 @@
+"""
+Local UK postcode and landmark gazetteer.
+
+The gazetteer is compiled from a CSV into a compact binary index that is
+memory-mapped at startup, so the most common pickups (airport terminals,
+major stations) are answered without a round trip to the Cromwell address API.
+
+Index layout (little-endian):
+
+    header   magic "GZT1", version u16, reserved u16, entry count u32,
+             strings offset u32, records offset u32
+    entries  count x (key offset u32, key length u32,
+                      record offset u32, record length u32), sorted by key
+    strings  UTF-8 keys, prefixed with their kind ("L:", "S:", "P:", "O:")
+    records  compact JSON candidate lists
+
+Build it with:
+
+    python -m services.gazetteer build data/gazetteer.csv data/gazetteer.idx
+"""
+
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.addresses import flatten_address_lines, normalize_postcode, normalize_text, outward_code
+
+MAGIC = b"GZT1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+ENTRY = struct.Struct("<IIII")
+
+LANDMARK = "L:"
+STREET = "S:"
+POSTCODE = "P:"
+OUTWARD = "O:"
+
+GAZETTEER_CSV = os.getenv("GAZETTEER_CSV", "data/gazetteer.csv")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "data/gazetteer.idx")
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() == "true"
+
+# Words that make an address line a street address rather than a place name
+STREET_WORDS = {
+    "street", "st", "road", "rd", "lane", "ln", "avenue", "ave", "close", "drive", "dr", "way",
+    "place", "pl", "gardens", "crescent", "terrace", "court", "square", "grove", "mews", "row",
+    "walk", "parade", "flat", "apartment", "house",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def is_street_line(line: str) -> bool:
+    """Whether a normalized address line has a house number or street in it"""
+    return any(char.isdigit() for char in line) or not STREET_WORDS.isdisjoint(line.split())
+
+
+def landmark_queries(lines: List[str]) -> List[str]:
+    """
+    Forms of an address (normalized lines, postcode removed) that may name a
+    landmark: all of its lines together, or one line when no other line is a
+    street address. A locality line of a house address ("221B Baker Street",
+    "Marylebone") is not the pickup, even though it names a station.
+    """
+    queries = [" ".join(lines)] if lines else []
+    if len(lines) > 1:
+        queries.extend(
+            line for index, line in enumerate(lines)
+            if not any(is_street_line(other) for other in lines[:index] + lines[index + 1:])
+        )
+    return queries
+
+
+def in_outward_code(candidate: Dict[str, Any], code: str) -> bool:
+    """Whether a candidate lies in the outward code of a full or partial postcode"""
+    return outward_code(candidate.get("postcode")) == outward_code(code)
+
+
+def _candidate(row: Dict[str, str]) -> Dict[str, Any]:
+    """Candidate in the same shape the Cromwell address API returns"""
+    candidate: Dict[str, Any] = {
+        "formatted": row["formatted"].strip(),
+        "postcode": row["postcode"].strip().upper(),
+        "source": "local",
+    }
+    if row.get("latitude") and row.get("longitude"):
+        candidate["latitude"] = float(row["latitude"])
+        candidate["longitude"] = float(row["longitude"])
+    return candidate
+
+
+def _row_keys(row: Dict[str, str]) -> List[str]:
+    """Index keys a CSV row is reachable under"""
+    kind = row["kind"].strip().lower()
+    keys = []
+    if kind in ("landmark", "street"):
+        prefix = LANDMARK if kind == "landmark" else STREET
+        names = [row["name"]] + [alias for alias in (row.get("aliases") or "").split("|")]
+        keys.extend(prefix + normalize_text(name) for name in names if normalize_text(name))
+    elif kind == "outward":
+        keys.append(OUTWARD + normalize_postcode(row["name"] or row["postcode"]))
+    elif kind != "postcode":
+        raise ValueError(f"Unknown gazetteer row kind: {row['kind']}")
+
+    postcode = normalize_postcode(row.get("postcode"))
+    if len(postcode) >= 5:
+        keys.append(POSTCODE + postcode)
+    return keys
+
+
+def build_index(csv_path: str, index_path: str) -> int:
+    """Compile a gazetteer CSV into a binary index, returning the key count"""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            candidate = _candidate(row)
+            for key in _row_keys(row):
+                candidates = grouped.setdefault(key, [])
+                if candidate not in candidates:
+                    candidates.append(candidate)
+
+    keys = sorted(grouped, key=lambda k: k.encode("utf-8"))
+    strings = bytearray()
+    records = bytearray()
+    entries = bytearray()
+    for key in keys:
+        key_bytes = key.encode("utf-8")
+        record = json.dumps(grouped[key], separators=(",", ":")).encode("utf-8")
+        entries += ENTRY.pack(len(strings), len(key_bytes), len(records), len(record))
+        strings += key_bytes
+        records += record
+
+    strings_offset = HEADER.size + len(entries)
+    records_offset = strings_offset + len(strings)
+    # A private temporary file, since workers starting together may all rebuild the index
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(index_path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(index_path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(keys), strings_offset, records_offset))
+            f.write(entries)
+            f.write(strings)
+            f.write(records)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(keys)
+
+
+class Gazetteer:
+    """Read-only, memory-mapped view over a compiled gazetteer index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self._strings, self._records = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a gazetteer index (version {VERSION})")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _entry(self, index: int):
+        return ENTRY.unpack_from(self._map, HEADER.size + index * ENTRY.size)
+
+    def _key(self, entry) -> bytes:
+        start = self._strings + entry[0]
+        return self._map[start:start + entry[1]]
+
+    def lookup(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Binary-search the index for an exact (kind-prefixed) key"""
+        target = key.encode("utf-8")
+        low, high = 0, self.count - 1
+        while low <= high:
+            mid = (low + high) // 2
+            entry = self._entry(mid)
+            current = self._key(entry)
+            if current == target:
+                start = self._records + entry[2]
+                return json.loads(self._map[start:start + entry[3]])
+            if current < target:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return None
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        """Iterate over keys, optionally restricted to one kind prefix"""
+        for index in range(self.count):
+            key = self._key(self._entry(index)).decode("utf-8")
+            if key.startswith(prefix):
+                yield key
+
+    def match_address(self, address_lines: Any, postcode: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer an address validation locally when it is unambiguous: a known
+        landmark that is the whole address (in the postcode's outward code, if
+        one was given), or a bare postcode/outward code with no other address
+        lines.
+        """
+        code = normalize_postcode(postcode)
+        lines = [normalize_text(line) for line in flatten_address_lines(address_lines)]
+        lines = [line for line in lines if line and normalize_postcode(line) != code]
+
+        for name in landmark_queries(lines):
+            candidates = self.lookup(LANDMARK + name)
+            if candidates is None:
+                continue
+            if code:
+                candidates = [c for c in candidates if in_outward_code(c, code)]
+            if candidates:
+                return candidates
+
+        if code and not lines:
+            return self.lookup(POSTCODE + code) or self.lookup(OUTWARD + code)
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def load_gazetteer() -> Optional[Gazetteer]:
+    """Open the configured index, compiling it from the CSV if it is missing or stale"""
+    global _gazetteer
+    if not GAZETTEER_ENABLED:
+        return None
+    if _gazetteer is not None:
+        return _gazetteer
+    try:
+        if os.path.exists(GAZETTEER_CSV) and (
+            not os.path.exists(GAZETTEER_PATH)
+            or os.path.getmtime(GAZETTEER_PATH) < os.path.getmtime(GAZETTEER_CSV)
+        ):
+            count = build_index(GAZETTEER_CSV, GAZETTEER_PATH)
+            logger.info("Compiled gazetteer %s → %s (%d keys)", GAZETTEER_CSV, GAZETTEER_PATH, count)
+        if os.path.exists(GAZETTEER_PATH):
+            _gazetteer = Gazetteer(GAZETTEER_PATH)
+            logger.info("Gazetteer loaded: %d keys", _gazetteer.count)
+    except (OSError, ValueError) as e:
+        logger.warning("Gazetteer unavailable: %s", e)
+        _gazetteer = None
+    return _gazetteer
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Return the loaded gazetteer, if any"""
+    return _gazetteer
+
+
+def close_gazetteer():
+    global _gazetteer
+    if _gazetteer is not None:
+        _gazetteer.close()
+        _gazetteer = None
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) == 3 and argv[0] == "build":
+        count = build_index(argv[1], argv[2])
+        print(f"Compiled {argv[1]} → {argv[2]} ({count} keys, {os.path.getsize(argv[2])} bytes)")
+        return 0
+    if len(argv) >= 3 and argv[0] == "lookup":
+        gazetteer = Gazetteer(argv[1])
+        postcode = argv[3] if len(argv) > 3 else None
+        print(json.dumps({"candidates": gazetteer.match_address([argv[2]], postcode)}, indent=2))
+        gazetteer.close()
+        return 0
+    print("Usage: python -m services.gazetteer build <csv> <index>")
+    print("       python -m services.gazetteer lookup <index> <address line> [postcode]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
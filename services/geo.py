@@ -0,0 +1,44 @@
+"""
+Straight-line distance and rough driving ETA between two coordinates.
+
+Good enough for "your driver is about six minutes away": the great-circle
+distance is stretched by ROAD_FACTOR for real roads and divided by a typical
+urban speed. It needs no upstream call.
+"""
+
+import math
+import os
+from typing import Any, Optional, Tuple
+
+ETA_SPEED_KMH = float(os.getenv("ETA_SPEED_KMH", 25))
+ROAD_FACTOR = float(os.getenv("ETA_ROAD_FACTOR", 1.3))
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(lon2 - lon1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def eta_minutes(distance_km: float) -> int:
+    """Rough driving time for a straight-line distance, never less than a minute"""
+    return max(1, round(distance_km * ROAD_FACTOR / ETA_SPEED_KMH * 60))
+
+
+def coordinates(value: Any) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) from a dict using any of the usual key spellings"""
+    if not isinstance(value, dict):
+        return None
+    latitude = next((value[key] for key in ("latitude", "lat", "Latitude") if value.get(key) is not None), None)
+    longitude = next((value[key] for key in ("longitude", "lng", "lon", "Longitude") if value.get(key) is not None), None)
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
@@ -0,0 +1,265 @@
+"""
+Application-lifetime HTTP client registry.
+
+Every upstream the dispatcher talks to (Cromwell address API, Cabee jobs API,
+Make.com pricing webhook, Ultravox) gets one pooled ``httpx.AsyncClient`` that
+is created on FastAPI startup and closed on shutdown, so tool calls reuse warm
+TCP/TLS connections instead of paying a fresh handshake per request.
+
+Each client's transport also enforces that upstream's circuit breaker and
+admission limit, applies a timeout derived from its observed latency and, for
+requests marked with ``extensions={"hedge": True}``, optionally hedges slow
+reads. Writes (resilience.is_write) get a fixed UPSTREAM_WRITE_TIMEOUT
+instead, since a write that times out may still have happened upstream.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+
+from services import admission, capture, metrics
+from services.resilience import (
+    CircuitBreaker, CircuitOpenError, HedgeBudget, LatencyTracker, is_write,
+    HEDGE_PERCENTILE, HEDGING_ENABLED, LATENCY_MIN_SAMPLES, TIMEOUT_MAX, WRITE_TIMEOUT,
+)
+
+try:
+    import h2  # noqa: F401  (only needed to enable HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Upstream name -> whether it is known to speak HTTP/2
+UPSTREAMS: Dict[str, bool] = {
+    "cromwell": True,
+    "cabee": False,
+    "make": True,
+    "ultravox": True,
+}
+
+# Pool configuration (overridable from the environment)
+POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", 100))
+POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", 20))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", 30.0))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+breakers: Dict[str, CircuitBreaker] = {name: CircuitBreaker(name) for name in UPSTREAMS}
+latencies: Dict[str, LatencyTracker] = {name: LatencyTracker() for name in UPSTREAMS}
+hedge_budgets: Dict[str, HedgeBudget] = {name: HedgeBudget() for name in UPSTREAMS}
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Pooled transport guarded by a circuit breaker, an admission limit and an adaptive timeout"""
+
+    def __init__(self, upstream: str, inner: httpx.AsyncBaseTransport):
+        self.upstream = upstream
+        self.inner = inner
+        self.breaker = breakers[upstream]
+        self.latency = latencies[upstream]
+        self.hedge_budget = hedge_budgets[upstream]
+        self.limiter = admission.upstream_limiter(upstream)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not admission.ADMISSION_ENABLED:
+            return await self._send(request)
+        try:
+            await self.limiter.acquire(admission.current_priority())
+        except admission.OverloadedError as e:
+            metrics.record_upstream(self.upstream, 0.0, "shed")
+            raise admission.UpstreamOverloadedError(
+                f"{self.upstream} is overloaded ({e.reason})", request=request
+            ) from None
+        try:
+            return await self._send(request)
+        finally:
+            self.limiter.release()
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        try:
+            self.breaker.before_request()
+        except CircuitOpenError:
+            metrics.record_upstream(self.upstream, 0.0, "circuit_open")
+            raise
+        self.hedge_budget.deposit()
+        # Writes neither use nor feed the latency window learned from reads
+        write = is_write(request)
+        timeout = WRITE_TIMEOUT if write else self.latency.timeout()
+        request.extensions["timeout"] = {"connect": timeout, "read": timeout, "write": timeout, "pool": timeout}
+        start = time.monotonic()
+        try:
+            if HEDGING_ENABLED and request.extensions.get("hedge"):
+                send = self._send_hedged(request)
+            else:
+                send = self.inner.handle_async_request(request)
+            response = await asyncio.wait_for(send, timeout)
+        except asyncio.TimeoutError:
+            if not write:
+                self.latency.observe(timeout)
+            self.breaker.record(False)
+            metrics.record_upstream(self.upstream, time.monotonic() - start, "timeout")
+            if capture.enabled():
+                await capture.record_exchange(self.upstream, request, None, time.monotonic() - start, "timeout")
+            raise httpx.ReadTimeout(f"{self.upstream} did not respond within {timeout:.2f}s", request=request)
+        except httpx.TransportError as e:
+            elapsed = time.monotonic() - start
+            if not write:
+                self.latency.observe(elapsed)
+            self.breaker.record(False)
+            metrics.record_upstream(self.upstream, elapsed, "error")
+            if capture.enabled():
+                await capture.record_exchange(self.upstream, request, None, elapsed, type(e).__name__)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        elapsed = time.monotonic() - start
+        if not write:
+            self.latency.observe(elapsed)
+        metrics.record_upstream(self.upstream, elapsed, str(response.status_code))
+        if capture.enabled():
+            await capture.record_exchange(self.upstream, request, response, elapsed)
+        self.breaker.record(response.status_code < 500 and response.status_code != 429)
+        return response
+
+    async def _send_hedged(self, request: httpx.Request) -> httpx.Response:
+        """
+        Send the request; if it is still outstanding after the recent latency
+        percentile, send an identical copy (budget permitting) and take
+        whichever answers first, cancelling the other.
+        """
+        primary = asyncio.ensure_future(self.inner.handle_async_request(request))
+        if len(self.latency) < LATENCY_MIN_SAMPLES:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=self.latency.percentile(HEDGE_PERCENTILE))
+        if done or not self.hedge_budget.try_spend():
+            return await primary
+
+        duplicate = httpx.Request(
+            request.method, request.url, headers=request.headers,
+            content=request.content, extensions=dict(request.extensions),
+        )
+        secondary = asyncio.ensure_future(self.inner.handle_async_request(duplicate))
+        pending = {primary, secondary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                if winners:
+                    if winners[0] is secondary:
+                        self.hedge_budget.hedges_won += 1
+                    for extra in winners[1:]:
+                        await extra.result().aclose()
+                    return winners[0].result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def _build_client(upstream: str) -> httpx.AsyncClient:
+    """Create a pooled client for one upstream"""
+    limits = httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+    use_http2 = HTTP2_ENABLED and HTTP2_AVAILABLE and UPSTREAMS.get(upstream, False)
+    transport = ResilientTransport(upstream, httpx.AsyncHTTPTransport(limits=limits, http2=use_http2))
+    return httpx.AsyncClient(transport=transport, timeout=TIMEOUT_MAX)
+
+
+def get_client(upstream: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it lazily if needed"""
+    if upstream not in UPSTREAMS:
+        raise KeyError(f"Unknown upstream: {upstream}")
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        client = _build_client(upstream)
+        _clients[upstream] = client
+    return client
+
+
+async def startup():
+    """Create all upstream clients (FastAPI startup hook)"""
+    for upstream in UPSTREAMS:
+        get_client(upstream)
+    logger.info("HTTP client pools ready: %s (max=%d, keepalive=%d, http2=%s)",
+                ", ".join(UPSTREAMS), POOL_MAX_CONNECTIONS, POOL_MAX_KEEPALIVE,
+                HTTP2_ENABLED and HTTP2_AVAILABLE)
+
+
+async def shutdown():
+    """Close all upstream clients (FastAPI shutdown hook)"""
+    for upstream, client in list(_clients.items()):
+        await client.aclose()
+    _clients.clear()
+    logger.info("HTTP client pools closed")
+
+
+def _connection_pool(client: httpx.AsyncClient) -> Optional[Any]:
+    """Dig the httpcore connection pool out of a client's transport"""
+    transport = getattr(client, "_transport", None)
+    transport = getattr(transport, "inner", transport)
+    return getattr(transport, "_pool", None)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Open/idle connection counts per upstream and per remote host"""
+    stats: Dict[str, Any] = {}
+    for upstream, client in _clients.items():
+        pool = _connection_pool(client)
+        connections = list(getattr(pool, "connections", []) or [])
+        hosts: Dict[str, Dict[str, int]] = {}
+        for connection in connections:
+            origin = getattr(connection, "_origin", None)
+            host = origin.host.decode() if origin is not None else "unknown"
+            entry = hosts.setdefault(host, {"open": 0, "idle": 0, "http2": 0})
+            if connection.is_closed():
+                continue
+            entry["open"] += 1
+            if connection.is_idle():
+                entry["idle"] += 1
+            if "HTTP/2" in connection.info():
+                entry["http2"] += 1
+        stats[upstream] = {
+            "closed": client.is_closed,
+            "open": sum(h["open"] for h in hosts.values()),
+            "idle": sum(h["idle"] for h in hosts.values()),
+            "hosts": hosts,
+        }
+    return {
+        "limits": {
+            "max_connections": POOL_MAX_CONNECTIONS,
+            "max_keepalive_connections": POOL_MAX_KEEPALIVE,
+            "keepalive_expiry": POOL_KEEPALIVE_EXPIRY,
+            "http2": HTTP2_ENABLED and HTTP2_AVAILABLE,
+        },
+        "upstreams": stats,
+    }
+
+
+def upstream_stats() -> Dict[str, Any]:
+    """Circuit breaker state, admission limit and adaptive timeout per upstream"""
+    return {
+        upstream: {
+            "circuit": breakers[upstream].stats(),
+            "admission": admission.upstream_limiter(upstream).stats(),
+            "latency": latencies[upstream].stats(),
+            "hedging": hedge_budgets[upstream].stats(),
+        }
+        for upstream in UPSTREAMS
+    }
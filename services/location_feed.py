@@ -0,0 +1,192 @@
+"""
+Shared driver-location pollers behind the streaming location feed.
+
+Any number of subscribers (browser EventSource connections) can watch a job's
+driver location, and each job has at most one poller per worker no matter
+how many are watching. The poller fans each new location out to every
+subscriber, polls every LOCATION_POLL_MIN seconds while the driver is moving
+and backs off towards LOCATION_POLL_MAX while nothing changes (no driver
+assigned yet, driver waiting, or Cabee failing). It keeps polling for
+LOCATION_STREAM_LINGER seconds after the last subscriber leaves, so a
+reconnecting browser does not restart it, and then stops.
+
+Subscribers only ever hold the latest update: one that falls behind skips
+stale locations instead of queueing them. A subscription ends after
+LOCATION_STREAM_MAX_SECONDS, so a forgotten browser tab does not keep a
+poller running for ever.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from services import admission, metrics
+
+LOCATION_POLL_MIN = float(os.getenv("LOCATION_POLL_MIN", 2))
+LOCATION_POLL_MAX = float(os.getenv("LOCATION_POLL_MAX", 15))
+LOCATION_STREAM_LINGER = float(os.getenv("LOCATION_STREAM_LINGER", 10))
+LOCATION_STREAM_MAX = int(os.getenv("LOCATION_STREAM_MAX", 1000))
+LOCATION_STREAM_MAX_SECONDS = float(os.getenv("LOCATION_STREAM_MAX_SECONDS", 1800))
+# Seconds between keep-alives on an otherwise quiet stream
+LOCATION_STREAM_HEARTBEAT = 15.0
+BACKOFF_FACTOR = 1.5
+
+logger = logging.getLogger(__name__)
+
+location_subscribers = metrics.Gauge(
+    "driver_location_subscribers",
+    "Open driver-location streams",
+)
+location_polls = metrics.Counter(
+    "driver_location_polls_total",
+    "Upstream driver-location polls made for streams, by whether the location changed",
+    ("result",),
+)
+
+# job number -> the getDriverLocation tool result for it
+FetchLocation = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class JobPoller:
+    """Polls one job's driver location and fans updates out to its subscribers"""
+
+    def __init__(self, job_no: str, fetch: FetchLocation):
+        self.job_no = job_no
+        self._fetch = fetch
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.latest: Optional[Dict[str, Any]] = None
+        self.interval = LOCATION_POLL_MIN
+        self.polls = 0
+        self.idle_since = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self.idle_since = time.monotonic()
+
+    def _publish(self, update: Dict[str, Any]):
+        self.latest = update
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    async def run(self):
+        # Streams are a convenience, so their polls give way to tool calls under load
+        admission.set_priority(admission.LOW)
+        while self.subscribers or time.monotonic() - self.idle_since < LOCATION_STREAM_LINGER:
+            try:
+                result = await self._fetch(self.job_no)
+            except Exception as e:
+                logger.warning("Driver location poll for %s failed: %s", self.job_no, e, extra={"job_no": self.job_no})
+                result = {
+                    "status": "error",
+                    "booking_status": "api_error",
+                    "error": "Unable to get driver location at the moment",
+                    "data": None
+                }
+            self.polls += 1
+            if self.latest is None or result != self.latest["result"]:
+                location_polls.inc("changed")
+                self._publish({"result": result, "updated": time.time()})
+                # Poll quickly while the driver is moving, not while there is nothing to show
+                moving = result.get("booking_status") == "driver_located"
+                self.interval = LOCATION_POLL_MIN if moving else min(LOCATION_POLL_MAX, self.interval * BACKOFF_FACTOR)
+            else:
+                location_polls.inc("unchanged")
+                self.interval = min(LOCATION_POLL_MAX, self.interval * BACKOFF_FACTOR)
+            await asyncio.sleep(self.interval)
+
+
+class LocationFeed:
+    """One shared poller per job, started by the first subscriber"""
+
+    def __init__(self, max_subscribers: int = LOCATION_STREAM_MAX):
+        self.max_subscribers = max_subscribers
+        self._pollers: Dict[str, JobPoller] = {}
+        self.subscriptions = 0
+        self.expired = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(poller.subscribers) for poller in self._pollers.values())
+
+    @property
+    def full(self) -> bool:
+        return self.subscriber_count >= self.max_subscribers
+
+    def _poller(self, job_no: str, fetch: FetchLocation) -> JobPoller:
+        poller = self._pollers.get(job_no)
+        if poller is None or poller.task is None or poller.task.done():
+            poller = self._pollers[job_no] = JobPoller(job_no, fetch)
+            poller.task = asyncio.create_task(self._run(poller), name=f"driver-location-{job_no}")
+        return poller
+
+    async def _run(self, poller: JobPoller):
+        try:
+            await poller.run()
+        finally:
+            if self._pollers.get(poller.job_no) is poller:
+                del self._pollers[poller.job_no]
+
+    async def stream(self, job_no: str, fetch: FetchLocation) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield {"result": getDriverLocation result, "updated": epoch seconds}
+        whenever the job's location changes, and None as a keep-alive when
+        nothing has changed for LOCATION_STREAM_HEARTBEAT seconds. Ends after
+        LOCATION_STREAM_MAX_SECONDS.
+        """
+        poller = self._poller(job_no, fetch)
+        queue = poller.subscribe()
+        self.subscriptions += 1
+        location_subscribers.inc()
+        deadline = time.monotonic() + LOCATION_STREAM_MAX_SECONDS
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.expired += 1
+                    return
+                try:
+                    yield await asyncio.wait_for(queue.get(), min(LOCATION_STREAM_HEARTBEAT, remaining))
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            poller.unsubscribe(queue)
+            location_subscribers.dec()
+
+    async def stop(self):
+        """Stop all pollers (FastAPI shutdown hook)"""
+        for poller in list(self._pollers.values()):
+            poller.task.cancel()
+        await asyncio.gather(*(poller.task for poller in list(self._pollers.values())), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscriber_count,
+            "max_subscribers": self.max_subscribers,
+            "subscriptions": self.subscriptions,
+            "expired": self.expired,
+            "jobs": {
+                job_no: {
+                    "subscribers": len(poller.subscribers),
+                    "interval": round(poller.interval, 2),
+                    "polls": poller.polls,
+                    "last_update": poller.latest["updated"] if poller.latest else None,
+                }
+                for job_no, poller in self._pollers.items()
+            },
+        }
+
+
+location_feed = LocationFeed()
@@ -0,0 +1,226 @@
+"""
+Prometheus-style metrics for the tool routes and their upstreams.
+
+Each tool request is timed end to end, and the time spent waiting on
+upstreams (accumulated by the HTTP transport into a per-request contextvar)
+is reported separately from local processing. Everything is rendered in the
+Prometheus text exposition format by ``render()``.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+from config.logging_config import call_id_var
+from services import capture
+from services.tracing import conversation_id_var, tracer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+_registry: List["_Metric"] = []
+
+# Upstream name -> seconds waited, for the tool request currently being handled
+_upstream_wait: ContextVar[Optional[Dict[str, float]]] = ContextVar("upstream_wait", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _key(self, labels: Tuple[Any, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple("" if value is None else str(value) for value in labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: Any, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: Any):
+        self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: Any):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+tool_duration = Histogram(
+    "tool_request_duration_seconds",
+    "Total time spent handling a tool request",
+    ("route", "operation"),
+)
+tool_local_duration = Histogram(
+    "tool_local_duration_seconds",
+    "Time spent in this service (tool request time minus upstream wait)",
+    ("route", "operation"),
+)
+tool_upstream_duration = Histogram(
+    "tool_upstream_wait_seconds",
+    "Time a tool request spent waiting on each upstream",
+    ("route", "operation", "upstream"),
+)
+tool_requests = Counter(
+    "tool_requests_total",
+    "Tool requests by outcome (booking_status for bookCab)",
+    ("route", "operation", "outcome"),
+)
+tool_in_flight = Gauge(
+    "tool_requests_in_flight",
+    "Tool requests currently being handled",
+    ("route",),
+)
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds",
+    "Upstream HTTP request latency as seen by the shared clients",
+    ("upstream",),
+)
+upstream_requests = Counter(
+    "upstream_requests_total",
+    "Upstream HTTP requests by response status (or error)",
+    ("upstream", "status"),
+)
+
+
+def record_upstream(upstream: str, seconds: float, status: str):
+    """Called by the HTTP transport after every upstream request"""
+    upstream_duration.observe(seconds, upstream)
+    upstream_requests.inc(upstream, status)
+    waits = _upstream_wait.get()
+    if waits is not None:
+        waits[upstream] = waits.get(upstream, 0.0) + seconds
+
+
+def outcome_of(result: Any) -> str:
+    """Outcome label for a tool response, matching the fields the routes already return"""
+    if not isinstance(result, dict):
+        return "success"
+    if result.get("booking_status"):
+        return str(result["booking_status"])
+    if result.get("success") is False:
+        return str(result.get("status") or "error")
+    if "candidates" in result:
+        return "found" if result["candidates"] else "not_found"
+    if result.get("status"):
+        return str(result["status"])
+    return "success"
+
+
+async def instrument(route: str, operation: Optional[str], handler: Awaitable[Any]) -> Any:
+    """
+    Await a tool handler, recording its latency split, outcome and in-flight
+    count, and adding it as a span to its conversation's trace if it has one.
+    """
+    waits: Dict[str, float] = {}
+    token = _upstream_wait.set(waits)
+    tool_in_flight.inc(route)
+    outcome = "exception"
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        result = await handler
+        outcome = outcome_of(result)
+        return result
+    except Exception as e:
+        status_code = getattr(e, "status_code", None)
+        if status_code is not None:
+            outcome = f"http_{status_code}"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _upstream_wait.reset(token)
+        tool_in_flight.dec(route)
+        tool_requests.inc(route, operation, outcome)
+        tool_duration.observe(elapsed, route, operation)
+        tool_local_duration.observe(max(0.0, elapsed - sum(waits.values())), route, operation)
+        for upstream, seconds in waits.items():
+            tool_upstream_duration.observe(seconds, route, operation, upstream)
+        capture.record_result(outcome, elapsed)
+        # Handlers bind these themselves, so read them after the handler ran
+        conversation_id = conversation_id_var.get()
+        if conversation_id:
+            tracer.record(conversation_id, route, operation, started, elapsed, waits, outcome, call_id_var.get())
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
@@ -0,0 +1,133 @@
+"""
+Pending pricing quotes awaiting an asynchronous Make.com callback.
+
+When the pricing webhook answers "Accepted", the finished quote is posted back
+to us later. Each request registers a future under a correlation ID; the
+callback endpoint resolves it and the waiting tool call wakes up immediately.
+
+The callback can reach a different worker from the one waiting. With
+CACHE_BACKEND=shared each correlation ID's journey key is also registered in
+the shared cache, a callback for another worker's request is handed over
+through it, and the waiting worker polls for it every PENDING_QUOTE_POLL
+seconds. With the local backend callbacks only work with a single worker,
+which run.py enforces.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from services.cache import CACHE_BACKEND, make_cache
+
+PENDING_QUOTE_TTL = float(os.getenv("PENDING_QUOTE_TTL", 300))
+PENDING_QUOTE_MAX = int(os.getenv("PENDING_QUOTE_MAX", 1024))
+PENDING_QUOTE_POLL = float(os.getenv("PENDING_QUOTE_POLL", 0.2))
+SHARED = CACHE_BACKEND == "shared"
+
+# Correlation ID -> journey key, and correlation ID -> quote delivered to another worker
+quote_keys = make_cache("pending_quote_keys", maxsize=PENDING_QUOTE_MAX, ttl=PENDING_QUOTE_TTL)
+delivered_quotes = make_cache("delivered_quotes", maxsize=PENDING_QUOTE_MAX, ttl=PENDING_QUOTE_TTL)
+
+
+class PendingQuotes:
+    """Correlation ID -> future for quotes that have not landed yet"""
+
+    def __init__(self, ttl: float = PENDING_QUOTE_TTL, maxsize: int = PENDING_QUOTE_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._pending: Dict[str, Tuple[float, Hashable, asyncio.Future]] = {}
+        self.resolved = 0
+        self.expired = 0
+        self.unknown = 0
+        self.forwarded = 0
+
+    def _purge(self):
+        now = time.monotonic()
+        for correlation_id, (expires_at, _, future) in list(self._pending.items()):
+            if expires_at <= now or future.done():
+                del self._pending[correlation_id]
+                if not future.done():
+                    future.cancel()
+                    self.expired += 1
+        # Drop the oldest requests if callbacks never arrive
+        while len(self._pending) >= self.maxsize:
+            oldest = next(iter(self._pending))
+            self._pending.pop(oldest)[2].cancel()
+            self.expired += 1
+
+    async def create(self, quote_key: Hashable) -> Tuple[str, asyncio.Future]:
+        """Register a new pending quote and return its correlation ID and future"""
+        self._purge()
+        correlation_id = f"quote_{int(time.time())}_{os.urandom(6).hex()}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[correlation_id] = (time.monotonic() + self.ttl, quote_key, future)
+        if SHARED:
+            await quote_keys.set(correlation_id, quote_key)
+        return correlation_id, future
+
+    def _deliver(self, correlation_id: str, quote: Any) -> Optional[Hashable]:
+        entry = self._pending.pop(correlation_id, None)
+        if entry is None:
+            return None
+        _, quote_key, future = entry
+        if not future.done():
+            future.set_result(quote)
+        return quote_key
+
+    async def resolve(self, correlation_id: str, quote: Any) -> Optional[Hashable]:
+        """Deliver a quote; returns its journey key, or None if nobody asked for it"""
+        quote_key = self._deliver(correlation_id, quote)
+        if quote_key is not None:
+            self.resolved += 1
+            return quote_key
+        quote_key = await quote_keys.get(correlation_id) if SHARED else None
+        if quote_key is None:
+            self.unknown += 1
+            return None
+        # Another worker's request: it picks the quote up from the shared cache
+        await delivered_quotes.set(correlation_id, quote)
+        await quote_keys.delete(correlation_id)
+        self.forwarded += 1
+        return tuple(quote_key)
+
+    async def wait(self, correlation_id: str, future: asyncio.Future, timeout: float) -> Any:
+        """
+        Wait up to timeout seconds for a pending quote (asyncio.TimeoutError if
+        it has not landed). The future is shielded, so a late callback still
+        resolves it.
+        """
+        if not SHARED:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            quote = await delivered_quotes.get(correlation_id)
+            if quote is not None:
+                await delivered_quotes.delete(correlation_id)
+                self._deliver(correlation_id, quote)
+                self.resolved += 1
+                return quote
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), min(remaining, PENDING_QUOTE_POLL))
+            except asyncio.TimeoutError:
+                pass
+
+    def discard(self, correlation_id: str):
+        entry = self._pending.pop(correlation_id, None)
+        if entry is not None and not entry[2].done():
+            entry[2].cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "resolved": self.resolved,
+            "expired": self.expired,
+            "unknown": self.unknown,
+            "forwarded": self.forwarded,
+        }
+
+
+pending_quotes = PendingQuotes()
@@ -0,0 +1,201 @@
+"""
+Per-upstream circuit breakers, latency-derived timeouts and hedging budgets.
+
+A sick upstream should fail fast into the routes' friendly error responses
+instead of holding every voice call for a fixed 30 seconds.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", 5))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 15.0))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", 1))
+
+TIMEOUT_MIN = float(os.getenv("UPSTREAM_TIMEOUT_MIN", 1.0))
+TIMEOUT_MAX = float(os.getenv("UPSTREAM_TIMEOUT_MAX", 30.0))
+TIMEOUT_PERCENTILE = float(os.getenv("UPSTREAM_TIMEOUT_PERCENTILE", 99))
+TIMEOUT_MULTIPLIER = float(os.getenv("UPSTREAM_TIMEOUT_MULTIPLIER", 3.0))
+LATENCY_WINDOW = int(os.getenv("UPSTREAM_LATENCY_WINDOW", 200))
+LATENCY_MIN_SAMPLES = int(os.getenv("UPSTREAM_LATENCY_MIN_SAMPLES", 20))
+# Fixed budget for writes that must not be cut short (see is_write)
+WRITE_TIMEOUT = float(os.getenv("UPSTREAM_WRITE_TIMEOUT", 30.0))
+
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", 0.05))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", 5))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+def is_write(request: httpx.Request) -> bool:
+    """
+    Whether a request changes upstream state and may not be safely repeated
+    (creating, updating or cancelling a job). A write that times out may
+    still have happened, so it gets WRITE_TIMEOUT rather than a timeout
+    learned from fast reads. Requests marked with extensions={"hedge": True}
+    or {"idempotent": True} are treated as reads whatever their method.
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return False
+    return not (request.extensions.get("hedge") or request.extensions.get("idempotent"))
+
+
+class LatencyTracker:
+    """Rolling window of upstream latencies with cached percentiles"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._sorted: Optional[list] = None
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * percentile / 100))
+        return self._sorted[index]
+
+    def timeout(self) -> float:
+        """Timeout derived from observed latency, clamped to [TIMEOUT_MIN, TIMEOUT_MAX]"""
+        if len(self._samples) < LATENCY_MIN_SAMPLES:
+            return TIMEOUT_MAX
+        observed = self.percentile(TIMEOUT_PERCENTILE) * TIMEOUT_MULTIPLIER
+        return max(TIMEOUT_MIN, min(TIMEOUT_MAX, observed))
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+        return {
+            "samples": len(self._samples),
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "timeout_s": round(self.timeout(), 3),
+        }
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the failure rate of recent requests"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may go through now"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < BREAKER_OPEN_SECONDS:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for upstream '{self.name}'")
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= BREAKER_HALF_OPEN_PROBES:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit half-open for upstream '{self.name}', probe in progress")
+            self._probes += 1
+
+    def record(self, success: bool):
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if success:
+                self._outcomes.clear()
+                self._transition(CLOSED)
+            else:
+                self._trip()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (self.state == CLOSED
+                and len(self._outcomes) >= BREAKER_MIN_REQUESTS
+                and failures / len(self._outcomes) >= BREAKER_FAILURE_RATE):
+            self._trip()
+
+    def release(self):
+        """Give back a half-open probe slot without recording an outcome"""
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def _trip(self):
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning("Circuit for upstream '%s': %s → %s", self.name, self.state, state,
+                           extra={"upstream": self.name, "circuit_state": state})
+            self.state = state
+            self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "window": len(self._outcomes),
+            "failures": self._outcomes.count(False),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of an upstream's traffic:
+    every request earns HEDGE_BUDGET tokens and every hedge spends one.
+    """
+
+    def __init__(self, ratio: float = HEDGE_BUDGET, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self.hedged = 0
+        self.hedges_won = 0
+        self.denied = 0
+
+    def deposit(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.hedged += 1
+            return True
+        self.denied += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": HEDGING_ENABLED,
+            "tokens": round(self.tokens, 3),
+            "hedged": self.hedged,
+            "hedges_won": self.hedges_won,
+            "denied": self.denied,
+        }
@@ -0,0 +1,342 @@
+"""
+Cache shared by all worker processes, over the Redis protocol (RESP).
+
+SharedCache stores entries in a cache daemon at CACHE_URL, either a Unix
+socket (unix:///path) or TCP (redis://host:port). The daemon can be Redis
+itself, or the small one in this module:
+
+    python -m services.shared_cache serve --socket /tmp/cromwell-cache.sock
+
+which keeps entries in memory with the same TTL and LRU semantics as TTLCache
+and only speaks the few commands used here (GET, SET with PX, DEL, PING,
+DBSIZE, FLUSHALL).
+
+Keys are "<namespace>:<cache name>:<compact JSON of the key>". Values are
+compact JSON, zlib-compressed when they exceed CACHE_COMPRESS_MIN bytes,
+behind a one-byte format tag. If the daemon is unreachable a lookup is a
+miss and a store is skipped, so the tools keep working uncached.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from services.cache import register
+
+CACHE_URL = os.getenv("CACHE_URL", "unix:///tmp/cromwell-cache.sock")
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "cromwell")
+CACHE_POOL_SIZE = int(os.getenv("CACHE_POOL_SIZE", 16))
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", 0.05))
+CACHE_COMPRESS_MIN = int(os.getenv("CACHE_COMPRESS_MIN", 1024))
+CACHE_SERVER_MAXSIZE = int(os.getenv("CACHE_SERVER_MAXSIZE", 100000))
+
+JSON_TAG = b"j"
+ZLIB_TAG = b"z"
+
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """Error reply from the cache daemon"""
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def encode_value(value: Any) -> bytes:
+    data = _dumps(value)
+    if len(data) >= CACHE_COMPRESS_MIN:
+        return ZLIB_TAG + zlib.compress(data, 1)
+    return JSON_TAG + data
+
+
+def decode_value(data: bytes) -> Any:
+    tag, body = data[:1], data[1:]
+    if tag == ZLIB_TAG:
+        body = zlib.decompress(body)
+    elif tag != JSON_TAG:
+        raise ValueError(f"unknown cache value format {tag!r}")
+    return json.loads(body)
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("cache connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RespError(f"unexpected reply {line!r}")
+
+
+class RespClient:
+    """Pool of connections to a RESP server, one command in flight per connection"""
+
+    def __init__(self, url: str = CACHE_URL, pool_size: int = CACHE_POOL_SIZE, timeout: float = CACHE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.url.startswith("unix://"):
+            return await asyncio.open_unix_connection(self.url[len("unix://"):])
+        host_port = self.url.split("://", 1)[-1].split("/", 1)[0]
+        host, _, port = host_port.rpartition(":")
+        return await asyncio.open_connection(host or "127.0.0.1", int(port or 6379))
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                reader, writer = connection
+                writer.write(encode_command(*args))
+                reply = await asyncio.wait_for(read_reply(reader), self.timeout)
+            except RespError:
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                # A timed-out or cancelled command may still be answered later, so never reuse it
+                if connection is not None:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+_clients: Dict[str, RespClient] = {}
+
+
+def get_client(url: str = CACHE_URL) -> RespClient:
+    """The shared connection pool for a cache URL"""
+    client = _clients.get(url)
+    if client is None:
+        client = _clients[url] = RespClient(url)
+    return client
+
+
+async def close_clients():
+    """Close pooled cache connections (FastAPI shutdown hook)"""
+    for client in _clients.values():
+        await client.close()
+
+
+class SharedCache:
+    """The async cache interface over a cache daemon shared by all workers"""
+
+    backend = "shared"
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0, client: Optional[RespClient] = None):
+        self.name = name
+        self.ttl = ttl
+        # The daemon enforces its own size bound; maxsize is only reported
+        self.maxsize = maxsize
+        self._client = client or get_client()
+        self._prefix = f"{CACHE_NAMESPACE}:{name}:".encode()
+        self._failing = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        register(name, self)
+
+    def _key(self, key: Hashable) -> bytes:
+        return self._prefix + _dumps(key)
+
+    def _failed(self, e: BaseException):
+        self.errors += 1
+        if not self._failing:
+            self._failing = True
+            logger.warning("Shared cache %s unavailable, continuing uncached: %r", self._client.url, e)
+
+    def _ok(self):
+        if self._failing:
+            self._failing = False
+            logger.info("Shared cache %s reachable again", self._client.url)
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            data = await self._client.execute(b"GET", self._key(key))
+            value = default if data is None else decode_value(data)
+        except (OSError, asyncio.TimeoutError, RespError, ValueError) as e:
+            self._failed(e)
+            self.misses += 1
+            return default
+        self._ok()
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        milliseconds = max(1, int((self.ttl if ttl is None else ttl) * 1000))
+        try:
+            await self._client.execute(b"SET", self._key(key), encode_value(value), b"PX", milliseconds)
+        except (OSError, asyncio.TimeoutError, RespError) as e:
+            self._failed(e)
+            return
+        self._ok()
+
+    async def delete(self, key: Hashable) -> bool:
+        try:
+            return bool(await self._client.execute(b"DEL", self._key(key)))
+        except (OSError, asyncio.TimeoutError, RespError) as e:
+            self._failed(e)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "url": self._client.url,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+        }
+
+
+class CacheServer:
+    """Minimal in-memory RESP cache daemon with TTL expiry and LRU eviction"""
+
+    def __init__(self, maxsize: int = CACHE_SERVER_MAXSIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Tuple[float, bytes]]" = OrderedDict()
+        self.commands = 0
+        self.evictions = 0
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def _set(self, key: bytes, value: bytes, options: List[bytes]) -> bytes:
+        expires_at = float("inf")
+        if len(options) == 2 and options[0].upper() in (b"PX", b"EX"):
+            scale = 1000.0 if options[0].upper() == b"PX" else 1.0
+            expires_at = time.monotonic() + int(options[1]) / scale
+        elif options:
+            return b"-ERR syntax error\r\n"
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        return b"+OK\r\n"
+
+    def dispatch(self, args: List[bytes]) -> bytes:
+        self.commands += 1
+        command = args[0].upper() if args else b""
+        if command == b"GET" and len(args) == 2:
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET" and len(args) >= 3:
+            return self._set(args[1], args[2], args[3:])
+        if command == b"DEL" and len(args) >= 2:
+            return b":%d\r\n" % sum(self._data.pop(key, None) is not None for key in args[1:])
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"DBSIZE":
+            return b":%d\r\n" % len(self._data)
+        if command == b"FLUSHALL":
+            self._data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command or wrong number of arguments\r\n"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await read_reply(reader)
+                if not isinstance(args, list) or not args:
+                    break
+                writer.write(self.dispatch(args))
+                # Pipelined commands are answered together; only wait when the buffer fills
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, RespError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(socket_path: Optional[str], host: str, port: int, maxsize: int):
+    server_state = CacheServer(maxsize)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(server_state.handle, socket_path)
+        os.chmod(socket_path, 0o660)
+        where = f"unix://{socket_path}"
+    else:
+        server = await asyncio.start_server(server_state.handle, host, port)
+        where = f"redis://{host}:{port}"
+    print(f"Cache daemon listening on {where} (maxsize {maxsize})", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.shared_cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the cache daemon")
+    serve_parser.add_argument("--socket", help="Unix socket path (default: from CACHE_URL)")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, help="listen on TCP instead of a Unix socket")
+    serve_parser.add_argument("--maxsize", type=int, default=CACHE_SERVER_MAXSIZE)
+    args = parser.parse_args(argv)
+
+    socket_path = args.socket
+    if socket_path is None and args.port is None and CACHE_URL.startswith("unix://"):
+        socket_path = CACHE_URL[len("unix://"):]
+    try:
+        asyncio.run(serve(socket_path, args.host, args.port or 6379, args.maxsize))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""
+Request coalescing for identical concurrent upstream lookups.
+
+While a lookup for a key is in flight, further callers with the same key wait
+on the same task instead of issuing their own upstream request, and all of
+them receive its result (or its exception).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.deduplicated = 0
+        _registry[name] = self
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the call already running for it"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.deduplicated += 1
+        # Shielded so one caller going away does not cancel the others' lookup
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+        }
+
+
+def flight_stats() -> Dict[str, Any]:
+    """Counters for every registered single-flight group"""
+    return {name: group.stats() for name, group in _registry.items()}
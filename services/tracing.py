@@ -0,0 +1,127 @@
+"""
+Per-conversation timelines of tool calls.
+
+Ultravox sends the voice call's ID with every tool request (the
+X-Ultravox-Call-Id automatic parameter), so the address validations, pricing
+and booking operations of one conversation can be tied together. Every tool
+request becomes a span (tool, operation, start, duration, upstream wait,
+outcome) on that conversation's timeline, kept in memory for TRACE_TTL seconds.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+TRACE_MAX_CONVERSATIONS = int(os.getenv("TRACE_MAX_CONVERSATIONS", 1000))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 200))
+TRACE_TTL = float(os.getenv("TRACE_TTL", 7200))
+
+# Ultravox call ID of the conversation the current request belongs to
+conversation_id_var: ContextVar[Optional[str]] = ContextVar("conversation_id", default=None)
+
+
+def bind_conversation(conversation_id: Optional[str]):
+    """Attach the current request (its spans and log records) to a conversation"""
+    if conversation_id:
+        conversation_id_var.set(conversation_id)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class ConversationTracer:
+    """Bounded, expiring store of span timelines keyed by conversation ID"""
+
+    def __init__(self, max_conversations: int = TRACE_MAX_CONVERSATIONS,
+                 max_spans: int = TRACE_MAX_SPANS, ttl: float = TRACE_TTL):
+        self.max_conversations = max_conversations
+        self.max_spans = max_spans
+        self.ttl = ttl
+        # conversation ID -> (last activity, spans)
+        self._conversations: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.recorded = 0
+        self.dropped = 0
+
+    def _purge(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._conversations:
+            oldest, (last_seen, _) = next(iter(self._conversations.items()))
+            if last_seen > cutoff and len(self._conversations) <= self.max_conversations:
+                break
+            del self._conversations[oldest]
+
+    def record(self, conversation_id: str, tool: str, operation: Optional[str], started: float,
+               duration: float, upstream: Dict[str, float], outcome: str, call_id: Optional[str] = None):
+        """Append a finished tool request to its conversation's timeline"""
+        entry = self._conversations.pop(conversation_id, None)
+        spans = entry[1] if entry else []
+        self._conversations[conversation_id] = (time.monotonic(), spans)
+        if len(spans) >= self.max_spans:
+            self.dropped += 1
+        else:
+            upstream_total = sum(upstream.values())
+            spans.append({
+                "tool": tool,
+                "operation": operation,
+                "call_id": call_id,
+                "started": started,
+                "duration_ms": round(duration * 1000, 1),
+                "upstream_ms": {name: round(seconds * 1000, 1) for name, seconds in upstream.items()},
+                "local_ms": round(max(0.0, duration - upstream_total) * 1000, 1),
+                "outcome": outcome,
+            })
+            self.recorded += 1
+        self._purge()
+
+    def timeline(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Spans of one conversation in start order, with offsets and totals"""
+        self._purge()
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            return None
+        spans = sorted(entry[1], key=lambda span: span["started"])
+        first = spans[0]["started"] if spans else 0.0
+        upstream_totals: Dict[str, float] = {}
+        for span in spans:
+            for name, ms in span["upstream_ms"].items():
+                upstream_totals[name] = round(upstream_totals.get(name, 0.0) + ms, 1)
+        return {
+            "conversation_id": conversation_id,
+            "started": _iso(first) if spans else None,
+            "span_count": len(spans),
+            "tool_ms": round(sum(span["duration_ms"] for span in spans), 1),
+            "upstream_ms": upstream_totals,
+            "local_ms": round(sum(span["local_ms"] for span in spans), 1),
+            "spans": [
+                dict(span, started=_iso(span["started"]), offset_ms=round((span["started"] - first) * 1000, 1))
+                for span in spans
+            ],
+        }
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently active conversations with a one-line summary each"""
+        self._purge()
+        summaries = []
+        for conversation_id in reversed(list(self._conversations)[-limit:]):
+            spans = self._conversations[conversation_id][1]
+            summaries.append({
+                "conversation_id": conversation_id,
+                "started": _iso(min(span["started"] for span in spans)) if spans else None,
+                "span_count": len(spans),
+                "tools": [span["operation"] or span["tool"] for span in spans],
+            })
+        return summaries
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "conversations": len(self._conversations),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+        }
+
+
+tracer = ConversationTracer()
@@ -0,0 +1,32 @@
+import pytest
+
+from services.address_matching import AddressMatcher
+from services.gazetteer import Gazetteer, build_index
+
+
+@pytest.fixture(scope="module")
+def matcher(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("gazetteer") / "gazetteer.idx")
+    build_index("data/gazetteer.csv", path)
+    index = Gazetteer(path)
+    yield AddressMatcher(index)
+    index.close()
+
+
+@pytest.mark.parametrize("address_lines, postcode", [
+    (["221B Baker Street", "Marylebone"], None),
+    (["14 Praed Street", "Padington Station"], None),
+    (["14 Praed Street", "Padington Station"], "W2"),
+])
+def test_misheard_locality_line_of_a_street_address_is_not_a_landmark(matcher, address_lines, postcode):
+    assert matcher.match_landmark(address_lines, postcode) is None
+
+
+def test_misheard_landmark_that_is_the_whole_address_is_matched(matcher):
+    assert matcher.match_landmark(["Padington Station"], None)[0]["postcode"] == "W2 1HQ"
+    assert matcher.match_landmark(["Heathrow Terminal Fiv", "Hounslow"], "TW6")[0]["postcode"] == "TW6 2GA"
+
+
+def test_misheard_landmark_must_share_the_postcode_outward_code(matcher):
+    assert matcher.match_landmark(["Marylebone Staton"], "NW1") is not None
+    assert matcher.match_landmark(["Marylebone Staton"], "NW10") is None
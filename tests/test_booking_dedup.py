@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+
+from routes import cromwell_routes
+from routes.cromwell_routes import BookingRequest, handle_book_cab
+from services.tracing import bind_conversation
+
+
+def test_rebooking_after_cancel_creates_a_new_job(monkeypatch):
+    created = []
+
+    def cabee(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/Job/CreateOnlineJob"):
+            created.append(request)
+            return httpx.Response(200, json={"jobNO": f"A{len(created)}", "id": len(created)})
+        if "/Job/CancelJob" in request.url.path:
+            return httpx.Response(200, text="Cancelled")
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(cabee))
+    monkeypatch.setattr(cromwell_routes.http_clients, "get_client", lambda upstream: client)
+    monkeypatch.setenv("CABEE_JWT_TOKEN", "test")
+
+    trip = dict(passengerName="Ann", Phone="07700 900123", origin="Heathrow Terminal 5",
+                destination="10 Downing Street", date="2026-10-20T09:00:00")
+
+    async def scenario():
+        bind_conversation("conversation-1")
+        first = await handle_book_cab(BookingRequest(operation="cabBooking", **trip))
+        repeat = await handle_book_cab(BookingRequest(operation="cabBooking", **trip))
+        cancelled = await handle_book_cab(BookingRequest(operation="cancelBooking", jobNO=first["data"]["jobNO"]))
+        rebooked = await handle_book_cab(BookingRequest(operation="cabBooking", **trip))
+        return first, repeat, cancelled, rebooked
+
+    first, repeat, cancelled, rebooked = asyncio.run(scenario())
+
+    assert repeat["data"]["jobNO"] == first["data"]["jobNO"] == "A1"
+    assert cancelled["booking_status"] == "cancelled"
+    assert rebooked["booking_status"] == "confirmed"
+    assert rebooked["data"]["jobNO"] == "A2"
+    assert len(created) == 2
+
+
+def test_lookup_in_flight_during_a_cancel_is_not_cached(monkeypatch):
+    status = {"A7": "Booked"}
+    lookups = []
+    lookup_started, release_lookup = asyncio.Event(), asyncio.Event()
+
+    async def cabee(request: httpx.Request) -> httpx.Response:
+        if "/Job/CancelJob" in request.url.path:
+            status["A7"] = "Cancelled"
+            return httpx.Response(200, text="Cancelled")
+        if request.url.path.endswith("/Job/GetOnlineJobs"):
+            answer = [{"jobNO": "A7", "id": 7, "status": status["A7"], "passengerPhone": "07700900123"}]
+            lookups.append(answer[0]["status"])
+            if len(lookups) == 1:
+                lookup_started.set()
+                await release_lookup.wait()
+            return httpx.Response(200, json=answer)
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(cabee))
+    monkeypatch.setattr(cromwell_routes.http_clients, "get_client", lambda upstream: client)
+    monkeypatch.setenv("CABEE_JWT_TOKEN", "test")
+
+    async def scenario():
+        bind_conversation("conversation-2")
+        slow = asyncio.ensure_future(handle_book_cab(BookingRequest(operation="getBooking", jobNO="A7")))
+        await lookup_started.wait()
+        await handle_book_cab(BookingRequest(operation="cancelBooking", jobNO="A7"))
+        release_lookup.set()
+        await slow
+        return await handle_book_cab(BookingRequest(operation="getBooking", jobNO="A7"))
+
+    after = asyncio.run(scenario())
+
+    assert after["data"][0]["status"] == "Cancelled"
+    assert lookups == ["Booked", "Cancelled"]
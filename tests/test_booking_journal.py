@@ -0,0 +1,245 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from services import booking_journal as journal_module
+from services.booking_journal import BookingJournal
+
+
+@pytest.fixture(autouse=True)
+def write_behind(monkeypatch):
+    monkeypatch.setattr(journal_module, "BOOKING_WRITE_BEHIND", True)
+    monkeypatch.setattr(journal_module, "BOOKING_DRAIN_BACKOFF_MIN", 0.01)
+    monkeypatch.setattr(journal_module, "BOOKING_DRAIN_BACKOFF_MAX", 0.05)
+
+
+class FakeCabee:
+    """CreateOnlineJob and a GetOnlineJobs lookup, with scripted failures per passenger"""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.jobs = []
+        self.submitted = []
+        self.lookups = 0
+
+    async def submit(self, booking):
+        self.submitted.append(booking["passengerName"])
+        failure = self.failures.get(booking["passengerName"])
+        if failure == "connect":
+            raise httpx.ConnectError("connection refused")
+        job = dict(booking, jobNO=f"A{len(self.jobs) + 1}", id=len(self.jobs) + 1)
+        self.jobs.append(job)
+        if failure == "timeout":
+            # Created, but the answer never arrived
+            raise httpx.ReadTimeout("cabee did not respond")
+        return job
+
+    async def find(self, booking):
+        self.lookups += 1
+        return next((job for job in self.jobs if job["passengerName"] == booking["passengerName"]), None)
+
+
+def booking(name):
+    return {"passengerName": name, "passengerPhone": "07700900123", "date": "2026-10-20T09:00:00",
+            "origin": "Heathrow Terminal 5", "destination": "10 Downing Street"}
+
+
+async def enqueue(journal, name):
+    reply = await journal.enqueue(booking(name), {"passengerName": name})
+    return reply["data"]["jobNO"]
+
+
+async def settled(journal, *refs):
+    for _ in range(500):
+        if all(journal.entries[ref]["status"] != "pending" for ref in refs):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"still pending: {[ref for ref in refs if journal.entries[ref]['status'] == 'pending']}")
+
+
+def test_restart_replays_pending_bookings_and_keeps_outcomes(tmp_path):
+    first, second = FakeCabee({"Bob": "connect"}), FakeCabee()
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(first.submit, first.find)
+        ann, bob = await enqueue(journal, "Ann"), await enqueue(journal, "Bob")
+        await settled(journal, ann)
+        await journal.stop()
+
+        restarted = BookingJournal(str(tmp_path))
+        restarted.start(second.submit, second.find)
+        await settled(restarted, ann, bob)
+        states = await restarted.lookup(ann), await restarted.lookup(bob)
+        await restarted.stop()
+        return states
+
+    ann, bob = asyncio.run(scenario())
+
+    assert ann["status"] == bob["status"] == "created"
+    assert ann["job_no"] == "A1"
+    # Refused connections never reached Cabee, so Bob is resent without a lookup
+    assert second.submitted == ["Bob"]
+    assert second.lookups == 0
+
+
+def test_compaction_keeps_pending_bookings_and_drops_old_finished_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "BOOKING_JOURNAL_RETAIN", 0)
+    monkeypatch.setattr(journal_module, "BOOKING_JOURNAL_COMPACT_BYTES", 1)
+    cabee = FakeCabee({"Bob": "connect"})
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(cabee.submit, cabee.find)
+        refs = [await enqueue(journal, name) for name in ("Ann", "Bob", "Cat")]
+        # Finished bookings leave memory at the next compaction, so count them instead
+        while journal.created < 2:
+            await asyncio.sleep(0.01)
+        await journal.stop()
+
+        restarted = BookingJournal(str(tmp_path))
+        restarted.start(FakeCabee({"Bob": "connect"}).submit, cabee.find)
+        entries = dict(restarted.entries)
+        await restarted.stop()
+        return refs, entries
+
+    (ann, bob, cat), entries = asyncio.run(scenario())
+
+    assert list(entries) == [bob]
+    assert entries[bob]["status"] == "pending"
+    assert entries[bob]["booking"]["passengerName"] == "Bob"
+    with open(tmp_path / "bookings-0.jsonl") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_failing_booking_backs_off_without_holding_up_the_rest(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "BOOKING_DRAIN_MAX_ATTEMPTS", 3)
+    cabee = FakeCabee({"Bob": "connect"})
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(cabee.submit, cabee.find)
+        bob, ann = await enqueue(journal, "Bob"), await enqueue(journal, "Ann")
+        await settled(journal, ann, bob)
+        states = await journal.lookup(bob), await journal.lookup(ann)
+        stats = journal.stats()
+        await journal.stop()
+        return states, stats
+
+    (bob, ann), stats = asyncio.run(scenario())
+
+    assert ann["status"] == "created"
+    assert bob["status"] == "failed"
+    # Ann went out after Bob's first failure, not after his last
+    assert cabee.submitted.index("Ann") < cabee.submitted.count("Bob")
+    assert cabee.submitted.count("Bob") == 3
+    assert stats["retries"] == 2
+
+
+def test_timed_out_booking_is_looked_up_before_it_is_sent_again(tmp_path):
+    cabee = FakeCabee({"Ann": "timeout"})
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(cabee.submit, cabee.find)
+        ann = await enqueue(journal, "Ann")
+        await settled(journal, ann)
+        state = await journal.lookup(ann)
+        await journal.stop()
+        return state
+
+    state = asyncio.run(scenario())
+
+    assert state["status"] == "created"
+    assert state["job_no"] == "A1"
+    assert cabee.submitted == ["Ann"]
+    assert len(cabee.jobs) == 1
+
+
+def test_timed_out_booking_missing_from_cabee_is_sent_again(tmp_path):
+    cabee = FakeCabee()
+    attempts = []
+
+    async def submit(booking):
+        attempts.append(booking["passengerName"])
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout("cabee did not respond")
+        return await cabee.submit(booking)
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(submit, cabee.find)
+        ann = await enqueue(journal, "Ann")
+        await settled(journal, ann)
+        state = await journal.lookup(ann)
+        await journal.stop()
+        return state
+
+    state = asyncio.run(scenario())
+
+    assert state["status"] == "created"
+    assert attempts == ["Ann", "Ann"]
+    assert cabee.lookups == 1
+
+
+def test_unanswered_attempt_before_a_restart_is_looked_up_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "BOOKING_DRAIN_BACKOFF_MIN", 60)
+    monkeypatch.setattr(journal_module, "BOOKING_DRAIN_BACKOFF_MAX", 60)
+    first = FakeCabee({"Ann": "timeout"})
+
+    async def scenario():
+        journal = BookingJournal(str(tmp_path))
+        journal.start(first.submit, first.find)
+        ann = await enqueue(journal, "Ann")
+        while not first.submitted or journal.in_flight:
+            await asyncio.sleep(0.01)
+        await journal.stop()
+
+        # The new worker's Cabee already holds the job the timed-out attempt made
+        second = FakeCabee()
+        second.jobs = list(first.jobs)
+        restarted = BookingJournal(str(tmp_path))
+        restarted.start(second.submit, second.find)
+        await settled(restarted, ann)
+        state = await restarted.lookup(ann)
+        await restarted.stop()
+        return state, second
+
+    state, second = asyncio.run(scenario())
+
+    assert state["status"] == "created"
+    assert state["job_no"] == "A1"
+    assert second.submitted == []
+    assert second.lookups == 1
+
+
+def test_bookings_of_an_unlocked_slot_are_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "BOOKING_JOURNAL_ADOPT_INTERVAL", 0.05)
+    cabee = FakeCabee()
+
+    async def scenario():
+        dead = BookingJournal(str(tmp_path))
+        dead.start(FakeCabee({"Ann": "connect"}).submit, cabee.find)
+        survivor = BookingJournal(str(tmp_path))
+        survivor.start(cabee.submit, cabee.find)
+        ann = await enqueue(dead, "Ann")
+        # The worker goes away, releasing slot 0 with Ann still pending
+        await dead.stop()
+
+        for _ in range(500):
+            if ann in survivor.entries and survivor.entries[ann]["status"] != "pending":
+                break
+            await asyncio.sleep(0.01)
+        state = await survivor.lookup(ann)
+        stats = survivor.stats()
+        await survivor.stop()
+        return state, stats
+
+    state, stats = asyncio.run(scenario())
+
+    assert state["status"] == "created"
+    assert cabee.submitted == ["Ann"]
+    assert stats["adopted"] == 1
+    assert not os.path.exists(tmp_path / "bookings-0.jsonl")
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from routes import cromwell_routes
+from routes.cromwell_routes import stream_driver_location
+from services import location_feed
+
+
+@pytest.fixture
+def cabee(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/Job/GetOnlineJobs") and request.url.params.get("jobNO") == "A7":
+            return httpx.Response(200, json=[{"jobNO": "A7", "id": 7, "passengerPhone": "07700 900123"}])
+        if "/Job/GetDriverCurrentLocationForJob/A7" in request.url.path:
+            return httpx.Response(200, json={"latitude": 51.5, "longitude": -0.12})
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(cromwell_routes.http_clients, "get_client", lambda upstream: client)
+    monkeypatch.setenv("CABEE_JWT_TOKEN", "test")
+
+
+@pytest.mark.parametrize("job_no, phone", [("A7", ""), ("A7", "07700 900999"), ("A8", "07700 900123")])
+def test_stream_needs_the_booking_phone_number(cabee, job_no, phone):
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(stream_driver_location(job_no, phone))
+    assert refused.value.status_code == 404
+
+
+def test_stream_ends_after_its_time_limit(cabee, monkeypatch):
+    monkeypatch.setattr(location_feed, "LOCATION_STREAM_MAX_SECONDS", 0.2)
+
+    async def scenario():
+        response = await stream_driver_location("A7", "+44 7700 900123")
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(scenario())
+
+    assert any(chunk.startswith("event: location") for chunk in chunks)
+    assert chunks[-1].startswith("event: end")
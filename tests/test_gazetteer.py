@@ -0,0 +1,34 @@
+import pytest
+
+from services.gazetteer import Gazetteer, build_index
+
+
+@pytest.fixture(scope="module")
+def gazetteer(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("gazetteer") / "gazetteer.idx")
+    build_index("data/gazetteer.csv", path)
+    index = Gazetteer(path)
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("address_lines, postcode", [
+    (["221B Baker Street", "Marylebone"], None),
+    (["221B Baker Street", "Marylebone"], "NW1"),
+    (["14 Praed Street", "Paddington"], None),
+    (["Flat 3, 20 Belgrave Road", "Victoria", "London"], "SW1V"),
+])
+def test_locality_line_of_a_street_address_is_not_a_landmark(gazetteer, address_lines, postcode):
+    assert gazetteer.match_address(address_lines, postcode) is None
+
+
+def test_landmark_that_is_the_whole_address_is_answered_locally(gazetteer):
+    assert gazetteer.match_address(["Paddington Station"], None)[0]["postcode"] == "W2 1HQ"
+    assert gazetteer.match_address(["Victoria", "London"], "SW1V")[0]["postcode"] == "SW1V 1JU"
+
+
+def test_postcode_must_share_the_landmark_outward_code(gazetteer):
+    # Marylebone Station is NW1 6JJ: NW1 matches, NW10 must not
+    assert gazetteer.match_address(["Marylebone Station"], "NW1") is not None
+    assert gazetteer.match_address(["Marylebone Station"], "NW10") is None
+    assert gazetteer.match_address(["Marylebone Station"], "NW1 6JJ") is not None
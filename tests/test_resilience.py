@@ -0,0 +1,27 @@
+import asyncio
+
+import httpx
+
+from services.http_clients import ResilientTransport
+
+
+def test_slow_write_is_not_cut_short_by_the_read_timeout():
+    async def cabee(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            await asyncio.sleep(1.2)
+            return httpx.Response(200, json={"jobNO": "A1"})
+        return httpx.Response(200, json=[])
+
+    async def scenario():
+        transport = ResilientTransport("cabee", httpx.MockTransport(cabee))
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(25):
+                await client.get("https://cabee.test/api/Job/GetOnlineJobs")
+            read_timeout = transport.latency.timeout()
+            response = await client.post("https://cabee.test/api/Job/CreateOnlineJob", json={})
+        return read_timeout, response
+
+    read_timeout, response = asyncio.run(scenario())
+
+    assert read_timeout < 1.2
+    assert response.json() == {"jobNO": "A1"}